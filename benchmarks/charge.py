@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import datetime
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .executer import BASE_DIR, configurer_environnement, _commit_git
+
+# Script Streamlit piloté par chaque session simulée
+SCRIPT = str(BASE_DIR / "main.py")
+
+# Percentiles rapportés pour chaque étape du parcours
+PERCENTILES = [50, 90, 95, 99]
+
+def percentile(valeurs, p):
+    """Percentile par interpolation linéaire (valeurs non vides)"""
+    valeurs = sorted(valeurs)
+    position = (len(valeurs) - 1) * p / 100
+    bas = int(position)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (position - bas)
+
+def _erreurs(at):
+    """Messages des exceptions affichées par la dernière exécution du script"""
+    return [str(getattr(exception, 'message', exception)) for exception in at.exception]
+
+def _choisir(rng, widget):
+    """Sélectionne une option au hasard dans un selectbox (None s'il n'en propose aucune)"""
+    options = [option for option in widget.options if option]
+    return widget.set_value(rng.choice(options)) if options else None
+
+def _widget(elements, key):
+    """Widget identifié par sa clé, ou None s'il n'est pas affiché"""
+    for element in elements:
+        if getattr(element, 'key', None) == key:
+            return element
+    return None
+
+class Session:
+    """
+    Session d'un enseignant simulée avec AppTest : chaque action relance le script
+    comme le ferait le navigateur, et sa durée est mesurée
+    """
+
+    def __init__(self, numero, rng, delai_max):
+        from streamlit.testing.v1 import AppTest
+        self.numero = numero
+        self.rng = rng
+        self.at = AppTest.from_file(SCRIPT, default_timeout=delai_max)
+        self.mesures = []
+
+    def _executer(self, etape, action=None):
+        debut = time.perf_counter()
+        erreurs = []
+        try:
+            (action or self.at).run()
+            erreurs = _erreurs(self.at)
+        except Exception as e:  # délai dépassé, erreur du script...
+            erreurs = [str(e)]
+        self.mesures.append({
+            'session': self.numero,
+            'etape': etape,
+            'duree': time.perf_counter() - debut,
+            'erreurs': erreurs,
+        })
+
+    def parcourir(self):
+        """Ouvre le module Semestre 1, analyse une classe et une discipline, génère un rapport puis change de module"""
+        at = self.at
+        if not self.mesures:
+            at.query_params["menu"] = "Module Semestre 1"
+            self._executer("ouverture_semestre1")
+        else:
+            self._executer("menu_semestre1", at.sidebar.radio[0].set_value("Module Semestre 1"))
+
+        classe = _widget(at.selectbox, "classe_select_moyennes")
+        if classe is not None and _choisir(self.rng, classe) is not None:
+            self._executer("analyse_moyennes", classe)
+
+        discipline = _widget(at.selectbox, "discipline_select")
+        if discipline is not None and _choisir(self.rng, discipline) is not None:
+            self._executer("analyse_discipline", discipline)
+
+        boutons = [bouton for bouton in at.button if bouton.label == "Générer le rapport"]
+        if boutons:
+            self._executer("rapport_classe", boutons[0].click())
+
+        for menu, etape in [("Module Général", "menu_general"), ("Paramètres", "menu_parametres")]:
+            if at.sidebar.radio:
+                self._executer(etape, at.sidebar.radio[0].set_value(menu))
+
+def _ecrivain(classeur, donnees, arret, mesures):
+    """Réimporte une classe en boucle pour créer des écritures concurrentes des lectures"""
+    from src.utils.excel_utils import sauvegarder_dans_fichier_central
+    df_moyennes, df_final, _ = donnees
+    while not arret.is_set():
+        debut = time.perf_counter()
+        erreurs = []
+        try:
+            sauvegarder_dans_fichier_central(df_moyennes, df_final, classeur['niveau'], classeur['classe'], 1)
+        except Exception as e:
+            erreurs = [str(e)]
+        mesures.append({'session': 'ecrivain', 'etape': 'import', 'duree': time.perf_counter() - debut, 'erreurs': erreurs})
+
+def preparer(parametres, dossier):
+    """Génère les classeurs PLANETE et les importe dans la base de travail"""
+    configurer_environnement(dossier)
+    from .generateur_planete import generer_jeu
+    from .scenarios import preparer_base, lecture, importation
+
+    contexte = {'classeurs': generer_jeu(
+        os.path.join(dossier, "classeurs"), parametres['classes'], parametres['eleves'],
+        parametres['disciplines'], parametres['graine']
+    )}
+    preparer_base()
+    lecture(contexte)
+    importation(contexte)
+    return contexte
+
+def simuler(parametres, contexte):
+    """
+    Lance les sessions simultanées (et les écrivains éventuels) et collecte chaque mesure
+
+    Les sessions tournent dans des threads du même processus, comme celles d'un
+    serveur Streamlit : caches, connexions SQLite et GIL sont partagés.
+    """
+    from src.utils.trace_utils import vider_journal
+    vider_journal()
+
+    arret = threading.Event()
+    mesures_ecrivains = []
+    ecrivains = [
+        threading.Thread(target=_ecrivain, args=(classeur, donnees, arret, mesures_ecrivains), daemon=True)
+        for classeur, donnees in list(zip(contexte['classeurs'], contexte['donnees']))[:parametres['ecrivains']]
+    ]
+
+    def session(numero):
+        simulee = Session(numero, random.Random(parametres['graine'] + numero), parametres['delai_max'])
+        for _ in range(parametres['iterations']):
+            simulee.parcourir()
+        return simulee.mesures
+
+    debut = time.perf_counter()
+    for ecrivain in ecrivains:
+        ecrivain.start()
+    with ThreadPoolExecutor(max_workers=parametres['sessions']) as pool:
+        mesures = [mesure for resultat in pool.map(session, range(parametres['sessions'])) for mesure in resultat]
+    arret.set()
+    for ecrivain in ecrivains:
+        ecrivain.join()
+    return mesures + mesures_ecrivains, time.perf_counter() - debut
+
+def synthese(mesures, duree_totale):
+    """Percentiles de latence par étape, erreurs et contention sur le verrou SQLite"""
+    etapes = {}
+    for mesure in mesures:
+        etapes.setdefault(mesure['etape'], []).append(mesure)
+
+    resultat = {}
+    for etape, liste in etapes.items():
+        durees = [mesure['duree'] for mesure in liste]
+        erreurs = [erreur for mesure in liste for erreur in mesure['erreurs']]
+        resultat[etape] = {
+            'executions': len(liste),
+            'moyenne': round(sum(durees) / len(durees), 4),
+            **{f"p{p}": round(percentile(durees, p), 4) for p in PERCENTILES},
+            'max': round(max(durees), 4),
+            'erreurs': len(erreurs),
+            'base_verrouillee': sum("database is locked" in erreur for erreur in erreurs),
+        }
+
+    from src.utils.trace_utils import requetes_agregees
+    requetes = requetes_agregees(limite=10)
+    return {
+        'duree_totale': round(duree_totale, 2),
+        'actions_par_seconde': round(len(mesures) / duree_totale, 2) if duree_totale else None,
+        'etapes': resultat,
+        'requetes_les_plus_couteuses': [
+            {'requete': requete['requete'], 'executions': requete['executions'],
+             'duree_totale_ms': round(requete['duree_totale_ms'], 1), 'duree_max_ms': round(requete['duree_max_ms'], 1)}
+            for requete in requetes
+        ],
+    }
+
+def afficher(resume):
+    print(f"\nDurée totale : {resume['duree_totale']} s ({resume['actions_par_seconde']} actions/s)")
+    entete = " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES)
+    print(f"{'Étape':<22} {'n':>5} {entete} {'max':>8} {'erreurs':>8} {'verrou':>7}")
+    for etape, mesure in resume['etapes'].items():
+        valeurs = " ".join(f"{mesure[f'p{p}']:>7.3f}s" for p in PERCENTILES)
+        print(f"{etape:<22} {mesure['executions']:>5} {valeurs} {mesure['max']:>7.3f}s "
+              f"{mesure['erreurs']:>8} {mesure['base_verrouillee']:>7}")
+
+    print("\nRequêtes SQL les plus coûteuses :")
+    for requete in resume['requetes_les_plus_couteuses'][:5]:
+        print(f"  {requete['duree_totale_ms']:>10.1f} ms  x{requete['executions']:<5} {requete['requete'][:100]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de LCAMS : sessions Streamlit simultanées (AppTest)")
+    parser.add_argument("--sessions", type=int, default=15, help="Nombre de sessions simultanées")
+    parser.add_argument("--iterations", type=int, default=3, help="Nombre de parcours par session")
+    parser.add_argument("--ecrivains", type=int, default=0, help="Nombre de threads réimportant une classe en boucle")
+    parser.add_argument("--classes", type=int, default=14, help="Nombre de classes de la base")
+    parser.add_argument("--eleves", type=int, default=50, help="Nombre d'élèves par classe")
+    parser.add_argument("--disciplines", type=int, default=12, help="Nombre de disciplines")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du générateur (jeu et parcours reproductibles)")
+    parser.add_argument("--delai-max", type=float, default=120, help="Durée maximale d'une exécution du script (s)")
+    parser.add_argument("--json", help="Enregistrer les résultats dans ce fichier JSON")
+    parser.add_argument("--garder", action="store_true", help="Conserver le dossier de travail (classeurs et base)")
+    args = parser.parse_args()
+
+    parametres = {
+        'sessions': args.sessions,
+        'iterations': args.iterations,
+        'ecrivains': args.ecrivains,
+        'classes': args.classes,
+        'eleves': args.eleves,
+        'disciplines': args.disciplines,
+        'graine': args.graine,
+        'delai_max': args.delai_max,
+    }
+
+    dossier = tempfile.mkdtemp(prefix="lcams_charge_")
+    try:
+        contexte = preparer(parametres, dossier)
+        print(f"Base préparée : {args.classes} classes de {args.eleves} élèves. "
+              f"Lancement de {args.sessions} sessions ({args.ecrivains} écrivains)...")
+        mesures, duree_totale = simuler(parametres, contexte)
+    finally:
+        if args.garder:
+            print(f"Dossier de travail conservé : {dossier}")
+        else:
+            shutil.rmtree(dossier, ignore_errors=True)
+
+    resume = synthese(mesures, duree_totale)
+    afficher(resume)
+
+    if args.json:
+        from src.config import APP_VERSION
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'version': APP_VERSION,
+                'commit': _commit_git(),
+                'python': platform.python_version(),
+                'plateforme': platform.platform(),
+                'parametres': parametres,
+                **resume,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nRésultats enregistrés dans {os.path.abspath(args.json)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import datetime
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+# Racine du projet (les modules sont importés comme le fait main.py)
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+def _commit_git():
+    """Commit courant du dépôt, ou None hors d'un dépôt git"""
+    try:
+        resultat = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                  capture_output=True, text=True)
+    except OSError:
+        return None
+    return resultat.stdout.strip() or None
+
+def configurer_environnement(dossier):
+    """
+    Place la base et le fichier centralisé de l'application dans un dossier de travail
+
+    À appeler avant tout import des modules de l'application (la configuration est lue à l'import).
+    """
+    os.environ["LCAMS_DATA_DIR"] = os.path.join(dossier, "data")
+    os.environ["LCAMS_DB_PATH"] = os.path.join(dossier, "data", "lcams.db")
+
+def executer(parametres, dossier):
+    """
+    Génère le jeu de classeurs puis exécute chaque scénario sur une base de travail
+
+    La base et le fichier centralisé sont placés dans le dossier de travail
+    (voir configurer_environnement).
+
+    Args:
+        parametres: dict 'classes', 'eleves', 'disciplines', 'repetitions' et 'graine'
+        dossier: Dossier de travail (classeurs, base et fichier centralisé)
+
+    Returns:
+        dict : nom du scénario -> {'mesures' (secondes par répétition), 'min', 'mediane', 'max', 'elements'}
+    """
+    configurer_environnement(dossier)
+
+    from .generateur_planete import generer_jeu
+    from .scenarios import SCENARIOS, preparer_base
+
+    classeurs = generer_jeu(
+        os.path.join(dossier, "classeurs"), parametres['classes'], parametres['eleves'],
+        parametres['disciplines'], parametres['graine']
+    )
+
+    mesures = {nom: [] for nom, _ in SCENARIOS}
+    elements = {}
+    for repetition in range(parametres['repetitions']):
+        preparer_base()
+        contexte = {'classeurs': classeurs}
+        for nom, scenario in SCENARIOS:
+            debut = time.perf_counter()
+            elements[nom] = scenario(contexte)
+            mesures[nom].append(time.perf_counter() - debut)
+            print(f"[{repetition + 1}/{parametres['repetitions']}] {nom:<18} {mesures[nom][-1]:>9.3f} s")
+
+    return {
+        nom: {
+            'mesures': [round(m, 4) for m in valeurs],
+            'min': round(min(valeurs), 4),
+            'mediane': round(statistics.median(valeurs), 4),
+            'max': round(max(valeurs), 4),
+            'elements': elements[nom],
+        }
+        for nom, valeurs in mesures.items()
+    }
+
+def comparer(resultats, reference, seuil):
+    """
+    Compare les médianes à celles d'une exécution de référence
+
+    Args:
+        resultats: dict produit par main (clé 'scenarios')
+        reference: dict lu depuis un fichier de résultats antérieur
+        seuil: Écart relatif (en %) au-delà duquel un ralentissement est signalé
+
+    Returns:
+        list des scénarios en régression
+    """
+    if reference.get('parametres') != resultats['parametres']:
+        print("Attention : les paramètres de la référence diffèrent, la comparaison est indicative.")
+
+    regressions = []
+    print(f"\n{'Scénario':<18} {'Référence':>10} {'Actuel':>10} {'Écart':>9}")
+    for nom, mesure in resultats['scenarios'].items():
+        ancienne = reference.get('scenarios', {}).get(nom)
+        if not ancienne:
+            print(f"{nom:<18} {'-':>10} {mesure['mediane']:>9.3f}s {'nouveau':>9}")
+            continue
+        ecart = (mesure['mediane'] - ancienne['mediane']) / ancienne['mediane'] * 100 if ancienne['mediane'] else 0
+        alerte = "  RÉGRESSION" if ecart > seuil else ""
+        print(f"{nom:<18} {ancienne['mediane']:>9.3f}s {mesure['mediane']:>9.3f}s {ecart:>+8.1f}%{alerte}")
+        if alerte:
+            regressions.append(nom)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de bout en bout de LCAMS sur des classeurs PLANETE synthétiques")
+    parser.add_argument("--classes", type=int, default=14, help="Nombre de classes (réparties sur les niveaux par défaut)")
+    parser.add_argument("--eleves", type=int, default=50, help="Nombre d'élèves par classe")
+    parser.add_argument("--disciplines", type=int, default=12, help="Nombre de disciplines")
+    parser.add_argument("--repetitions", type=int, default=3, help="Nombre d'exécutions de chaque scénario")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du générateur (jeu reproductible)")
+    parser.add_argument("--json", help="Enregistrer les résultats dans ce fichier JSON")
+    parser.add_argument("--reference", help="Fichier JSON d'une exécution antérieure à comparer")
+    parser.add_argument("--seuil", type=float, default=10.0, help="Ralentissement toléré par rapport à la référence (%%)")
+    parser.add_argument("--garder", action="store_true", help="Conserver le dossier de travail (classeurs et base)")
+    args = parser.parse_args()
+
+    parametres = {
+        'classes': args.classes,
+        'eleves': args.eleves,
+        'disciplines': args.disciplines,
+        'repetitions': args.repetitions,
+        'graine': args.graine,
+    }
+
+    dossier = tempfile.mkdtemp(prefix="lcams_bench_")
+    try:
+        scenarios = executer(parametres, dossier)
+    finally:
+        if args.garder:
+            print(f"Dossier de travail conservé : {dossier}")
+        else:
+            shutil.rmtree(dossier, ignore_errors=True)
+
+    from src.config import APP_VERSION
+    resultats = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'version': APP_VERSION,
+        'commit': _commit_git(),
+        'python': platform.python_version(),
+        'plateforme': platform.platform(),
+        'parametres': parametres,
+        'scenarios': scenarios,
+    }
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, ensure_ascii=False, indent=2)
+        print(f"\nRésultats enregistrés dans {os.path.abspath(args.json)}")
+
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+        if comparer(resultats, reference, args.seuil):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import random
+import datetime
+import xlsxwriter
+
+# Disciplines courantes d'un bulletin PLANETE (complétées par "Discipline N" au-delà)
+DISCIPLINES = [
+    "Français", "Mathématiques", "Anglais", "Histoire-Géographie", "Sciences Physiques",
+    "SVT", "EPS", "Espagnol", "Philosophie", "Arabe", "Éducation civique",
+    "Économie familiale", "Arts plastiques", "Musique", "Informatique", "Latin",
+]
+
+# Niveaux créés par défaut par init_database
+NIVEAUX = ["6ème", "5ème", "4ème", "3ème", "Seconde", "Première", "Terminale"]
+
+PRENOMS = ["Awa", "Moussa", "Fatou", "Ibrahima", "Aminata", "Cheikh", "Mariama", "Ousmane",
+           "Khady", "Abdoulaye", "Ndeye", "Mamadou", "Coumba", "Pape", "Bineta", "Alioune"]
+NOMS = ["Diop", "Ndiaye", "Fall", "Sow", "Diallo", "Ba", "Sarr", "Faye", "Gueye", "Mbaye",
+        "Cissé", "Kane", "Sy", "Thiam", "Seck", "Camara"]
+LIEUX = ["Dakar", "Thiès", "Saint-Louis", "Kaolack", "Ziguinchor", "Touba", "Mbour", "Louga"]
+
+# Colonnes de la feuille "Moyennes eleves" (ligne d'en-tête après 11 lignes d'en-tête PLANETE)
+COLONNES_MOYENNES = [
+    "IEN", "Prénom", "Nom", "Sexe", "Date naissance", "Lieu naissance", "Retard", "Absence",
+    "C.D.", "Moy", "Rang", "Décision conseil", "Appréciation", "Observation conseil",
+]
+LIGNES_ENTETE_MOYENNES = 11
+
+# Feuille "Données détaillées" : 8 lignes d'en-tête, puis discipline (cellules fusionnées) et sous-colonnes
+SOUS_COLONNES = ["Moy DD", "Comp D", "Moy D", "Rang D"]
+LIGNES_ENTETE_DETAIL = 8
+
+def noms_disciplines(nb_disciplines):
+    """Retourne nb_disciplines libellés de disciplines distincts"""
+    return [DISCIPLINES[i] if i < len(DISCIPLINES) else f"Discipline {i + 1}" for i in range(nb_disciplines)]
+
+def _rangs(valeurs):
+    """Rangs par valeur décroissante, ex aequo au rang minimal"""
+    ordre = sorted(valeurs, reverse=True)
+    return [ordre.index(v) + 1 for v in valeurs]
+
+def _appreciation(moyenne):
+    if moyenne >= 16:
+        return "Très bien"
+    if moyenne >= 14:
+        return "Bien"
+    if moyenne >= 12:
+        return "Assez bien"
+    if moyenne >= 10:
+        return "Passable"
+    return "Insuffisant"
+
+def generer_eleves(nb_eleves, disciplines, rng, prefixe_ien):
+    """
+    Génère les élèves d'une classe et leurs notes
+
+    Chaque élève a un niveau propre autour duquel ses notes de discipline varient,
+    ce qui donne des distributions et des classements réalistes.
+
+    Returns:
+        list de dict : informations de l'élève, 'notes' (dict discipline -> (moy_dd, comp_d, moy_d))
+        et 'moyenne'
+    """
+    eleves = []
+    for i in range(nb_eleves):
+        niveau_eleve = rng.gauss(11, 3)
+        notes = {}
+        for discipline in disciplines:
+            moy_dd = round(min(20, max(0, rng.gauss(niveau_eleve, 2.5))), 2)
+            comp_d = round(min(20, max(0, rng.gauss(niveau_eleve, 3))), 2)
+            notes[discipline] = (moy_dd, comp_d, round((moy_dd + 2 * comp_d) / 3, 2))
+        naissance = datetime.date(2008, 1, 1) + datetime.timedelta(days=rng.randrange(6 * 365))
+        eleves.append({
+            'ien': f"{prefixe_ien}{i + 1:04d}",
+            'prenom': rng.choice(PRENOMS),
+            'nom': rng.choice(NOMS),
+            'sexe': rng.choice("MF"),
+            'date_naissance': naissance.strftime("%d/%m/%Y"),
+            'lieu_naissance': rng.choice(LIEUX),
+            'retard': rng.choice([0, 0, 0, 1, 2, 3]),
+            'absence': rng.choice([0, 0, 0, 2, 4, 8]),
+            'conseil_discipline': rng.choice([0] * 19 + [1]),
+            'notes': notes,
+            'moyenne': round(sum(note[2] for note in notes.values()) / len(notes), 2) if notes else 0,
+        })
+    return eleves
+
+def ecrire_classeur(destination, eleves, disciplines, niveau, classe, semestre=1):
+    """
+    Écrit un classeur au format d'export PLANETE attendu par charger_et_nettoyer
+
+    Args:
+        destination: Chemin du fichier .xlsx
+        eleves: Liste issue de generer_eleves
+        disciplines: Libellés des disciplines
+        niveau: Libellé du niveau
+        classe: Libellé de la classe
+        semestre: Semestre (1 ou 2)
+    """
+    workbook = xlsxwriter.Workbook(destination)
+    gras = workbook.add_format({'bold': True})
+    entete = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+
+    def bandeau(sheet):
+        sheet.write(0, 0, "REPUBLIQUE DU SENEGAL", gras)
+        sheet.write(1, 0, "Ministère de l'Education nationale")
+        sheet.write(3, 0, "Etablissement : LYCEE DE BENCHMARK", gras)
+        sheet.write(4, 0, f"Classe : {niveau} {classe}")
+        sheet.write(5, 0, f"Semestre : {semestre}")
+
+    # Feuille des moyennes générales
+    rangs = _rangs([eleve['moyenne'] for eleve in eleves])
+    sheet = workbook.add_worksheet("Moyennes eleves")
+    bandeau(sheet)
+    sheet.write_row(LIGNES_ENTETE_MOYENNES, 0, COLONNES_MOYENNES, entete)
+    for i, (eleve, rang) in enumerate(zip(eleves, rangs), start=LIGNES_ENTETE_MOYENNES + 1):
+        sheet.write_row(i, 0, [
+            eleve['ien'], eleve['prenom'], eleve['nom'], eleve['sexe'], eleve['date_naissance'],
+            eleve['lieu_naissance'], eleve['retard'], eleve['absence'], eleve['conseil_discipline'],
+            eleve['moyenne'], rang, "", _appreciation(eleve['moyenne']), "",
+        ])
+
+    # Feuille détaillée : en-tête sur deux lignes, discipline fusionnée au-dessus de ses sous-colonnes
+    sheet = workbook.add_worksheet("Données détaillées")
+    bandeau(sheet)
+    ligne_discipline, ligne_sous_colonne = LIGNES_ENTETE_DETAIL, LIGNES_ENTETE_DETAIL + 1
+    for j, libelle in enumerate(["IEN", "Prénom", "Nom"]):
+        sheet.merge_range(ligne_discipline, j, ligne_sous_colonne, j, libelle, entete)
+
+    rangs_disciplines = {
+        discipline: _rangs([eleve['notes'][discipline][2] for eleve in eleves]) for discipline in disciplines
+    }
+    for k, discipline in enumerate(disciplines):
+        premiere = 3 + k * len(SOUS_COLONNES)
+        sheet.merge_range(ligne_discipline, premiere, ligne_discipline, premiere + len(SOUS_COLONNES) - 1,
+                          discipline, entete)
+        sheet.write_row(ligne_sous_colonne, premiere, SOUS_COLONNES, entete)
+
+    for i, eleve in enumerate(eleves):
+        ligne = [eleve['ien'], eleve['prenom'], eleve['nom']]
+        for discipline in disciplines:
+            moy_dd, comp_d, moy_d = eleve['notes'][discipline]
+            ligne.extend([moy_dd, comp_d, moy_d, rangs_disciplines[discipline][i]])
+        sheet.write_row(ligne_sous_colonne + 1 + i, 0, ligne)
+
+    workbook.close()
+
+def generer_jeu(dossier, nb_classes, nb_eleves, nb_disciplines, graine=0, semestre=1):
+    """
+    Génère un jeu de classeurs PLANETE (un par classe), répartis sur les niveaux par défaut
+
+    Args:
+        dossier: Dossier de destination (créé si besoin)
+        nb_classes: Nombre de classes
+        nb_eleves: Nombre d'élèves par classe
+        nb_disciplines: Nombre de disciplines
+        graine: Graine du générateur aléatoire (jeu reproductible)
+        semestre: Semestre indiqué dans les classeurs
+
+    Returns:
+        list de dict : 'chemin', 'niveau', 'classe' et 'nb_eleves'
+    """
+    os.makedirs(dossier, exist_ok=True)
+    rng = random.Random(graine)
+    disciplines = noms_disciplines(nb_disciplines)
+
+    classeurs = []
+    for k in range(nb_classes):
+        niveau = NIVEAUX[k % len(NIVEAUX)]
+        classe = f"{niveau[0]}{chr(ord('A') + (k // len(NIVEAUX)) % 26)}{k // (len(NIVEAUX) * 26) or ''}"
+        eleves = generer_eleves(nb_eleves, disciplines, rng, prefixe_ien=f"BENCH{k:04d}")
+        chemin = os.path.join(dossier, f"planete_{k:04d}.xlsx")
+        ecrire_classeur(chemin, eleves, disciplines, niveau, classe, semestre)
+        classeurs.append({'chemin': chemin, 'niveau': niveau, 'classe': classe, 'nb_eleves': nb_eleves})
+    return classeurs
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+from src.config import DB_PATH, FICHIER_CENTRAL
+from src.utils.db_utils import init_database
+from src.utils.excel_utils import charger_et_nettoyer, sauvegarder_dans_fichier_central, synchroniser_suppression_classe
+from src.utils.rapport_utils import (
+    construire_rapport_classe, classeur_rapport_classe, construire_statistiques_globales,
+    feuilles_statistiques_globales, feuilles_rapport_discipline
+)
+from src.utils.stats_utils import calculer_statistiques_discipline
+from src.utils.export_utils import exporter
+from src.utils.honneur_utils import (
+    calculer_tableaux_honneur, tableau_global, tableaux_par_niveau, tableaux_par_classe, classeur_tableaux_honneur
+)
+
+# Semestre utilisé par tous les scénarios
+SEMESTRE = 1
+
+# Taille des tableaux d'honneur
+TOP_N = 10
+
+def preparer_base():
+    """Repart d'une base vide (schéma, niveaux et année active par défaut) sans fichier centralisé"""
+    for chemin in (DB_PATH, FICHIER_CENTRAL):
+        if os.path.exists(chemin):
+            os.remove(chemin)
+    init_database()
+
+def _annee_active(conn):
+    return conn.execute("SELECT libelle FROM Annee_Scolaire WHERE etat = 'actif' LIMIT 1").fetchone()[0]
+
+def lecture(contexte):
+    """Lecture et nettoyage de chaque classeur PLANETE (charger_et_nettoyer)"""
+    contexte['donnees'] = [charger_et_nettoyer(classeur['chemin']) for classeur in contexte['classeurs']]
+    return len(contexte['donnees'])
+
+def importation(contexte):
+    """Import de chaque classe dans le fichier centralisé et la base, comme depuis la vue Semestre 1"""
+    for classeur, (df_moyennes, df_final, _) in zip(contexte['classeurs'], contexte['donnees']):
+        sauvegarder_dans_fichier_central(df_moyennes, df_final, classeur['niveau'], classeur['classe'], SEMESTRE)
+    return len(contexte['classeurs'])
+
+def vue_ensemble(contexte):
+    """Requêtes de la vue d'ensemble du semestre et statistiques globales"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        annee_scolaire = _annee_active(conn)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(DISTINCT ien) FROM Moyennes_Generales_S{SEMESTRE} WHERE annee_scolaire = ?", (annee_scolaire,))
+        cursor.execute(f"SELECT AVG(moyenne) FROM Moyennes_Generales_S{SEMESTRE} WHERE annee_scolaire = ?", (annee_scolaire,))
+        cursor.execute(f"SELECT COUNT(*) FROM Moyennes_Generales_S{SEMESTRE} WHERE moyenne >= 10 AND annee_scolaire = ?", (annee_scolaire,))
+        cursor.execute(f"""
+            SELECT n.libelle as niveau, COUNT(DISTINCT mg.ien) as nb_eleves,
+                   AVG(mg.moyenne) as moyenne,
+                   SUM(CASE WHEN mg.moyenne >= 10 THEN 1 ELSE 0 END) as nb_moyenne
+            FROM Moyennes_Generales_S{SEMESTRE} mg
+            JOIN Eleves e ON mg.ien = e.ien
+            JOIN Inscriptions i ON i.ien = mg.ien AND i.annee_scolaire = mg.annee_scolaire
+            JOIN Classes c ON i.id_classe = c.id
+            JOIN Niveaux n ON c.id_niveau = n.id
+            WHERE mg.annee_scolaire = ?
+            GROUP BY n.libelle
+            ORDER BY n.libelle
+        """, (annee_scolaire,))
+        cursor.fetchall()
+        construire_statistiques_globales(conn, SEMESTRE, annee_scolaire)
+    finally:
+        conn.close()
+    return 1
+
+def rapports(contexte):
+    """Rapport Excel de chaque classe, rapport statistique global et rapport de chaque discipline"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        annee_scolaire = _annee_active(conn)
+        nb_rapports = 0
+        for (id_classe,) in conn.execute("SELECT id FROM Classes ORDER BY id").fetchall():
+            classeur_rapport_classe(construire_rapport_classe(conn, SEMESTRE, annee_scolaire, id_classe))
+            nb_rapports += 1
+
+        exporter(feuilles_statistiques_globales(construire_statistiques_globales(conn, SEMESTRE, annee_scolaire)), "xlsx")
+        nb_rapports += 1
+
+        for (id_discipline,) in conn.execute("SELECT id FROM Disciplines ORDER BY id").fetchall():
+            statistiques = calculer_statistiques_discipline(conn, SEMESTRE, annee_scolaire, id_discipline)
+            exporter(feuilles_rapport_discipline(conn, SEMESTRE, annee_scolaire, id_discipline, statistiques), "xlsx")
+            nb_rapports += 1
+    finally:
+        conn.close()
+    return nb_rapports
+
+def tableaux_honneur(contexte):
+    """Tableaux d'honneur global, par niveau et par classe, avec leurs exports Excel"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        df_honneur = calculer_tableaux_honneur(conn, _annee_active(conn), TOP_N, SEMESTRE)
+    finally:
+        conn.close()
+
+    classeur_tableaux_honneur([('Tableau_Honneur', tableau_global(df_honneur, TOP_N))])
+    par_niveau = tableaux_par_niveau(df_honneur, TOP_N)
+    classeur_tableaux_honneur([(f"Niveau_{niveau}", df) for niveau, df in par_niveau])
+    par_classe = tableaux_par_classe(df_honneur, TOP_N)
+    classeur_tableaux_honneur([(f"{niveau}_{classe}", df) for (niveau, classe), df in par_classe])
+    return 1 + len(par_niveau) + len(par_classe)
+
+def suppressions(contexte):
+    """Suppression de chaque classe importée (base et fichier centralisé)"""
+    for classeur in contexte['classeurs']:
+        synchroniser_suppression_classe(classeur['niveau'], classeur['classe'], SEMESTRE)
+    return len(contexte['classeurs'])
+
+# Scénarios exécutés dans cet ordre à chaque répétition (chacun s'appuie sur l'état laissé par le précédent)
+SCENARIOS = [
+    ("lecture", lecture),
+    ("import", importation),
+    ("vue_ensemble", vue_ensemble),
+    ("rapports", rapports),
+    ("tableaux_honneur", tableaux_honneur),
+    ("suppressions", suppressions),
+]
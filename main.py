@@ -1,17 +1,31 @@
 import streamlit as st
 import sys
 import os
+import importlib
 
 # Ajouter le chemin du projet au PYTHONPATH
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 from src.config import APP_NAME, APP_VERSION
 from src.utils.db_utils import init_database
-from src.views.home_view import show_home_view
-from src.views.parametres_view import show_parametres_view
-from src.views.semestre1_view import show_semestre1_view
-from src.views.semestre2_view import show_semestre2_view
-from src.views.general_view import show_general_view
+from src.utils.profil_utils import section, debut_execution, afficher_hud
+from src.utils.metriques_utils import demarrer_export
+
+# Vues de l'application : (module, fonction d'affichage). Un module n'est importé
+# qu'à la première sélection de son menu, avec ses dépendances (Plotly, export...).
+VUES = {
+    "Accueil": ("src.views.home_view", "show_home_view"),
+    "Module Semestre 1": ("src.views.semestre1_view", "show_semestre1_view"),
+    "Module Semestre 2": ("src.views.semestre2_view", "show_semestre2_view"),
+    "Module Général": ("src.views.general_view", "show_general_view"),
+    "Paramètres": ("src.views.parametres_view", "show_parametres_view"),
+}
+
+def afficher_vue(menu):
+    """Importe le module de la vue demandée (une seule fois par processus) puis l'affiche"""
+    module, fonction = VUES[menu]
+    with section(menu):
+        getattr(importlib.import_module(module), fonction)()
 
 # Configuration de la page Streamlit
 st.set_page_config(
@@ -41,13 +55,17 @@ st.markdown(
 def main():
     # Initialiser la base de données
     init_database()
+    # Export des métriques d'exploitation (threads démarrés une seule fois par processus)
+    demarrer_export()
+    debut_execution()
     
     # Récupérer le paramètre de menu de l'URL (si présent)
     menu = st.query_params.get("menu", "Accueil")
     
     # Barre latérale cachée par défaut sur la page d'accueil
     if menu == "Accueil":
-        show_home_view()
+        afficher_vue("Accueil")
+        afficher_hud()
         return
     
     # Barre latérale avec navigation
@@ -66,16 +84,8 @@ def main():
     st.query_params["menu"] = selected_menu
     
     # Afficher la vue correspondante
-    if selected_menu == "Accueil":
-        show_home_view()
-    elif selected_menu == "Module Semestre 1":
-        show_semestre1_view()
-    elif selected_menu == "Module Semestre 2":
-        show_semestre2_view()
-    elif selected_menu == "Module Général":
-        show_general_view()
-    elif selected_menu == "Paramètres":
-        show_parametres_view()
+    afficher_vue(selected_menu)
+    afficher_hud()
     
     # Pied de page
     st.sidebar.divider()
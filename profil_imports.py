@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+
+# Racine du projet (les modules sont importés comme le fait main.py)
+BASE_DIR = Path(__file__).resolve().parent
+
+# Modules mesurés : point d'entrée puis chaque vue chargée à la demande par main.py
+MODULES = [
+    "src.utils.db_utils",
+    "src.views.home_view",
+    "src.views.parametres_view",
+    "src.views.semestre1_view",
+    "src.views.semestre2_view",
+    "src.views.general_view",
+]
+
+def mesurer_import(module):
+    """
+    Importe un module dans un interpréteur neuf avec -X importtime
+
+    Args:
+        module: Nom du module, ou None pour mesurer le seul démarrage de l'interpréteur
+
+    Returns:
+        dict : 'module', 'total_ms' (temps cumulé des imports) et 'paquets'
+        (temps propre par paquet de premier niveau, en ms)
+    """
+    resultat = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if resultat.returncode != 0:
+        derniere_ligne = resultat.stderr.strip().splitlines()[-1] if resultat.stderr.strip() else ""
+        return {'module': module, 'erreur': derniere_ligne}
+
+    total_us = 0
+    paquets = defaultdict(int)
+    for ligne in resultat.stderr.splitlines():
+        if not ligne.startswith("import time:") or "self [us]" in ligne:
+            continue
+        propre, cumule, nom = ligne[len("import time:"):].split("|", 2)
+        # Les imports de premier niveau ne sont pas indentés : leur cumul donne le total
+        if not nom.startswith("  "):
+            total_us += int(cumule)
+        paquets[nom.strip().split(".")[0]] += int(propre)
+
+    return {
+        'module': module,
+        'total_ms': round(total_us / 1000, 1),
+        'paquets': {nom: round(us / 1000, 1) for nom, us in sorted(paquets.items(), key=lambda x: -x[1])},
+    }
+
+def afficher_rapport(mesures, nb_paquets):
+    """Affiche le temps d'import de chaque module et ses paquets les plus coûteux"""
+    for mesure in mesures:
+        if 'erreur' in mesure:
+            print(f"\n{mesure['module']}: échec de l'import ({mesure['erreur']})")
+            continue
+        print(f"\n{mesure['module']}: {mesure['total_ms']} ms")
+        for nom, ms in list(mesure['paquets'].items())[:nb_paquets]:
+            print(f"    {nom:<30} {ms:>8} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Profil du temps d'import des vues LCAMS")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules à mesurer (tous par défaut)")
+    parser.add_argument("--paquets", type=int, default=10, help="Nombre de paquets affichés par module")
+    parser.add_argument("--json", help="Enregistrer les mesures dans ce fichier JSON")
+    args = parser.parse_args()
+
+    # Le démarrage de l'interpréteur (site, encodings...) est mesuré à part et retranché
+    demarrage = mesurer_import(None)['total_ms']
+    mesures = [mesurer_import(module) for module in args.modules]
+    for mesure in mesures:
+        if 'total_ms' in mesure:
+            mesure['total_ms'] = round(mesure['total_ms'] - demarrage, 1)
+
+    print(f"Démarrage de l'interpréteur : {demarrage} ms (déduit des totaux)")
+    afficher_rapport(mesures, args.paquets)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(mesures, f, ensure_ascii=False, indent=2)
+        print(f"\nMesures enregistrées dans {os.path.abspath(args.json)}")
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,13 @@ from pathlib import Path
 
 # Chemins de base
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = os.path.join(BASE_DIR, "src", "data")
+# LCAMS_DATA_DIR et LCAMS_DB_PATH permettent de travailler sur une autre base (ex: benchmarks)
+DATA_DIR = os.environ.get("LCAMS_DATA_DIR", os.path.join(BASE_DIR, "src", "data"))
 STATIC_DIR = os.path.join(BASE_DIR, "src", "static")
 
 # Nom des fichiers de base de données
 DB_NAME = "lcams.db"
-DB_PATH = os.path.join(DATA_DIR, DB_NAME)
+DB_PATH = os.environ.get("LCAMS_DB_PATH", os.path.join(DATA_DIR, DB_NAME))
 
 # Nom du fichier Excel centralisé
 FICHIER_CENTRAL = os.path.join(DATA_DIR, "fichier_central.xlsx")
@@ -30,6 +31,50 @@ THEME_COLORS = {
     "dark": "#2c3e50",
 }
 
+# Cache disque des rapports générés (XLSX, PDF...), purgé au-delà de la taille maximale
+CACHE_RAPPORTS_DIR = os.path.join(DATA_DIR, "cache_rapports")
+CACHE_RAPPORTS_TAILLE_MAX = 200 * 1024 * 1024  # octets
+
+# Archives des années scolaires closes : une base par année, attachée en lecture seule à la demande
+ARCHIVES_DIR = os.path.join(DATA_DIR, "archives")
+ARCHIVES_ATTACHEES_MAX = 9  # SQLite attache au plus 10 bases par connexion (une reste libre)
+
+# Rapports générés en arrière-plan : dossier des fichiers produits et nombre de travaux simultanés
+RAPPORTS_JOBS_DIR = os.path.join(DATA_DIR, "rapports")
+RAPPORTS_JOBS_TRAVAILLEURS = 2
+
+# Écritures SQLite : confiées à un thread unique qui regroupe les travaux en attente
+# dans une même transaction (voir ecriture_utils)
+ECRITURE_FILE_TAILLE = 256  # travaux en attente au-delà desquels les sessions patientent
+ECRITURE_LOT_MAX = 64  # travaux validés ensemble au plus
+ECRITURE_DELAI_FILE = 60  # secondes d'attente maximale d'une place dans la file
+DELAI_VERROU_SQLITE = 30  # secondes d'attente d'un verrou avant "database is locked"
+
+# Traçage des requêtes SQL (onglet Performances des paramètres) : désactivable avec LCAMS_TRACE_SQL=0
+TRACE_SQL = os.environ.get("LCAMS_TRACE_SQL", "1") != "0"
+TRACE_SQL_TAILLE = 5000  # exécutions conservées dans le journal glissant
+# Fonction appelante de chaque requête (parcours de la pile à chaque exécution) : LCAMS_TRACE_SQL_APPELANTS=1
+TRACE_SQL_APPELANTS = os.environ.get("LCAMS_TRACE_SQL_APPELANTS", "0") == "1"
+SEUIL_REQUETE_LENTE_MS = 100
+
+# Profilage des vues (HUD activable depuis Paramètres > Performances, ou d'office avec LCAMS_PROFIL_VUES=1)
+PROFIL_VUES = os.environ.get("LCAMS_PROFIL_VUES", "0") == "1"
+PROFIL_HISTORIQUE_TAILLE = 5000  # sections conservées pour l'export JSON
+PROFIL_INTERVALLE_ECHANTILLON = 0.005  # secondes entre deux relevés de pile (temps pandas estimé)
+
+# Profil des imports : suivi des allocations Python par tracemalloc (ralentit un peu l'import)
+PROFIL_IMPORT_ALLOCATIONS = True
+
+# Métriques d'exploitation au format OpenMetrics : fichier réécrit périodiquement
+# (ex: collecteur textfile de node_exporter) et/ou point /metrics servi en local
+METRIQUES_FICHIER = os.environ.get("LCAMS_METRIQUES_FICHIER") or None
+METRIQUES_PORT = int(os.environ.get("LCAMS_METRIQUES_PORT", "0"))  # 0 : pas de serveur
+METRIQUES_ADRESSE = "127.0.0.1"
+METRIQUES_INTERVALLE = 15  # secondes entre deux écritures du fichier
+
+# Méthode de classement des ex aequo : "min" (1, 2, 2, 4) ou "dense" (1, 2, 2, 3)
+METHODE_CLASSEMENT = "min"
+
 # Niveaux d'enseignement disponibles
 NIVEAUX = [
     "6ème", "5ème", "4ème", "3ème",  # Collège
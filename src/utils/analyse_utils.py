@@ -0,0 +1,175 @@
+import pandas as pd
+import streamlit as st
+from .db_utils import get_db_connection
+from .stats_utils import BORNES_MENTIONS, LIBELLES_MENTIONS
+
+# Table dont la présence de données rend un niveau / une classe sélectionnable
+SOURCES = {
+    "moyennes": "Moyennes_Generales_S{semestre}",
+    "notes": "Notes_S{semestre}",
+}
+
+# Les fonctions ci-dessous reçoivent la version des données (get_version_donnees) :
+# tout import ou toute modification de la base produit de nouvelles entrées de cache.
+
+def _lignes(query, params):
+    conn = get_db_connection()
+    try:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+    finally:
+        conn.close()
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def niveaux_disponibles(semestre, annee_scolaire, version, source="moyennes"):
+    """Niveaux actifs ayant des données pour le semestre (liste de dict id / libelle)"""
+    table = SOURCES[source].format(semestre=semestre)
+    return _lignes(f"""
+        SELECT DISTINCT n.id, n.libelle
+        FROM Niveaux n
+        JOIN Classes c ON n.id = c.id_niveau
+        JOIN Inscriptions i ON c.id = i.id_classe
+        JOIN {table} t ON i.ien = t.ien AND t.annee_scolaire = i.annee_scolaire
+        WHERE i.annee_scolaire = ? AND n.etat = 'actif'
+        ORDER BY n.libelle
+    """, (annee_scolaire,))
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def classes_disponibles(semestre, annee_scolaire, id_niveau, version, source="moyennes"):
+    """Classes actives d'un niveau ayant des données pour le semestre (liste de dict id / libelle)"""
+    table = SOURCES[source].format(semestre=semestre)
+    return _lignes(f"""
+        SELECT DISTINCT c.id, c.libelle
+        FROM Classes c
+        JOIN Inscriptions i ON c.id = i.id_classe
+        JOIN {table} t ON i.ien = t.ien AND t.annee_scolaire = i.annee_scolaire
+        WHERE c.id_niveau = ? AND i.annee_scolaire = ? AND c.etat = 'actif'
+        ORDER BY c.libelle
+    """, (id_niveau, annee_scolaire))
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def disciplines_classe(semestre, annee_scolaire, id_classe, version):
+    """Disciplines notées dans une classe (liste de dict id / libelle)"""
+    return _lignes(f"""
+        SELECT DISTINCT d.id, d.libelle
+        FROM Disciplines d
+        JOIN Notes_S{semestre} notes ON d.id = notes.id_discipline
+        JOIN Inscriptions i ON notes.ien = i.ien AND notes.annee_scolaire = i.annee_scolaire
+        WHERE i.id_classe = ? AND i.annee_scolaire = ?
+        ORDER BY d.libelle
+    """, (id_classe, annee_scolaire))
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def moyennes_classe(semestre, annee_scolaire, id_classe, version):
+    """Moyennes générales des élèves d'une classe (dernière ligne importée par élève), triées par rang"""
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query(f"""
+            WITH mg AS (
+                SELECT * FROM Moyennes_Generales_S{semestre}
+                WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ? GROUP BY ien)
+            )
+            SELECT e.ien, e.prenom, e.nom, e.sexe, mg.moyenne, mg.rang,
+                   mg.retard, mg.absence, mg.conseil_discipline, mg.appreciation
+            FROM Inscriptions i
+            JOIN Eleves e ON i.ien = e.ien
+            JOIN mg ON i.ien = mg.ien AND mg.annee_scolaire = i.annee_scolaire
+            WHERE i.id_classe = ? AND i.annee_scolaire = ?
+            ORDER BY mg.rang
+        """, conn, params=(annee_scolaire, id_classe, annee_scolaire))
+    finally:
+        conn.close()
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def notes_discipline_classe(semestre, annee_scolaire, id_classe, id_discipline, version):
+    """
+    Notes d'une discipline dans une classe, avec la moyenne et le rang généraux de chaque élève
+
+    Une ligne par élève : dernière ligne importée des notes et des moyennes générales.
+    """
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query(f"""
+            WITH notes AS (
+                SELECT * FROM Notes_S{semestre}
+                WHERE id IN (
+                    SELECT MAX(id) FROM Notes_S{semestre} WHERE annee_scolaire = ? AND id_discipline = ? GROUP BY ien
+                )
+            ),
+            mg AS (
+                SELECT * FROM Moyennes_Generales_S{semestre}
+                WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ? GROUP BY ien)
+            )
+            SELECT e.ien, e.prenom, e.nom, e.sexe,
+                   notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d,
+                   mg.moyenne as moyenne_generale, mg.rang as rang_general
+            FROM Inscriptions i
+            JOIN Eleves e ON i.ien = e.ien
+            JOIN notes ON i.ien = notes.ien AND notes.annee_scolaire = i.annee_scolaire
+            JOIN mg ON i.ien = mg.ien AND mg.annee_scolaire = i.annee_scolaire
+            WHERE i.id_classe = ? AND notes.id_discipline = ? AND i.annee_scolaire = ?
+            ORDER BY notes.rang_d
+        """, conn, params=(annee_scolaire, id_discipline, annee_scolaire, id_classe, id_discipline, annee_scolaire))
+    finally:
+        conn.close()
+
+def expression_mention(colonne):
+    """Expression SQL CASE donnant la mention d'une note (mêmes tranches que le noyau de statistiques)"""
+    tranches = " ".join(
+        f"WHEN {colonne} >= {borne} THEN '{libelle}'"
+        for borne, libelle in reversed(list(zip(BORNES_MENTIONS, LIBELLES_MENTIONS[1:])))
+    )
+    return f"CASE {tranches} ELSE '{LIBELLES_MENTIONS[0]}' END"
+
+# Expressions SQL (tables de base) des colonnes triables ou recherchées des tableaux paginés
+# ci-dessous : la pagination porte sur ces colonnes indexées, l'id de ligne départageant les ex aequo
+EXPRESSIONS_LISTE_CLASSE = {
+    "id": "mg.id", "rang": "mg.rang", "moyenne": "mg.moyenne",
+    "nom": "e.nom", "prenom": "e.prenom", "ien": "e.ien",
+}
+EXPRESSIONS_NOTES_DISCIPLINE = {
+    "id": "notes.id", "rang_d": "notes.rang_d", "moy_d": "notes.moy_d", "rang_general": "mg.rang",
+    "nom": "e.nom", "prenom": "e.prenom", "ien": "e.ien",
+}
+
+def requete_liste_classe(semestre, annee_scolaire, id_classe):
+    """
+    Requête (et paramètres) de la liste des élèves d'une classe, pour un tableau paginé
+
+    Une ligne par élève (dernière ligne importée), identifiée par mg.id ; la requête
+    se termine par sa clause WHERE (voir page_requete et EXPRESSIONS_LISTE_CLASSE).
+    """
+    return f"""
+        SELECT mg.id, e.ien, e.prenom, e.nom, e.sexe, mg.moyenne, mg.rang,
+               {expression_mention('mg.moyenne')} as mention,
+               mg.retard, mg.absence, mg.conseil_discipline, mg.appreciation
+        FROM Moyennes_Generales_S{semestre} mg
+        JOIN Inscriptions i ON i.ien = mg.ien AND i.annee_scolaire = mg.annee_scolaire
+        JOIN Eleves e ON mg.ien = e.ien
+        WHERE mg.annee_scolaire = ? AND i.id_classe = ?
+          AND mg.id IN (SELECT MAX(id) FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ? GROUP BY ien)
+    """, (annee_scolaire, id_classe, annee_scolaire)
+
+def requete_notes_discipline(semestre, annee_scolaire, id_classe, id_discipline):
+    """
+    Requête (et paramètres) des notes d'une discipline dans une classe, pour un tableau paginé
+
+    Une ligne par élève (dernière ligne importée), identifiée par notes.id ; la requête
+    se termine par sa clause WHERE (voir page_requete et EXPRESSIONS_NOTES_DISCIPLINE).
+    """
+    return f"""
+        SELECT notes.id, e.ien, e.prenom, e.nom, e.sexe,
+               notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d,
+               mg.moyenne as moyenne_generale, mg.rang as rang_general,
+               {expression_mention('notes.moy_d')} as mention
+        FROM Notes_S{semestre} notes
+        JOIN Inscriptions i ON i.ien = notes.ien AND i.annee_scolaire = notes.annee_scolaire
+        JOIN Eleves e ON notes.ien = e.ien
+        JOIN Moyennes_Generales_S{semestre} mg ON mg.id = (
+            SELECT MAX(id) FROM Moyennes_Generales_S{semestre}
+            WHERE ien = notes.ien AND annee_scolaire = notes.annee_scolaire
+        )
+        WHERE notes.annee_scolaire = ? AND notes.id_discipline = ? AND i.id_classe = ?
+          AND notes.id IN (
+              SELECT MAX(id) FROM Notes_S{semestre} WHERE annee_scolaire = ? AND id_discipline = ? GROUP BY ien
+          )
+    """, (annee_scolaire, id_discipline, id_classe, annee_scolaire, id_discipline)
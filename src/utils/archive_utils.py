@@ -0,0 +1,279 @@
+import os
+import re
+import sqlite3
+import urllib.parse
+from contextlib import contextmanager
+import pandas as pd
+from ..config import DB_PATH, ARCHIVES_DIR, ARCHIVES_ATTACHEES_MAX, DELAI_VERROU_SQLITE
+from .trace_utils import fabrique_connexion
+from .ecriture_utils import ecrire_exclusif
+
+# Tables dont les lignes d'une année sont déplacées dans l'archive de cette année
+TABLES_ANNUELLES = [
+    "Moyennes_Generales_S1", "Moyennes_Generales_S2", "Notes_S1", "Notes_S2",
+    "Decisions_Finales", "Decisions_Audit", "Inscriptions",
+]
+
+# Tables de référence copiées telles quelles : l'archive se suffit à elle-même pour les jointures
+TABLES_REFERENCE = ["Annee_Scolaire", "Niveaux", "Classes", "Disciplines"]
+
+def chemin_archive(fichier):
+    """Chemin complet d'un fichier d'archive enregistré dans Annee_Scolaire.fichier_archive"""
+    return os.path.join(ARCHIVES_DIR, fichier)
+
+def nom_fichier_archive(annee_scolaire):
+    """Nom du fichier d'archive d'une année (ex: lcams_2023-2024.db)"""
+    return f"lcams_{re.sub(r'[^0-9A-Za-z_-]', '_', annee_scolaire)}.db"
+
+def _alias(annee_scolaire):
+    """Nom de schéma sous lequel l'archive d'une année est attachée"""
+    return "archive_" + re.sub(r'[^0-9A-Za-z_]', '_', annee_scolaire)
+
+def _colonnes(conn, table, schema="main"):
+    return [row[1] for row in conn.execute(f'PRAGMA "{schema}".table_info("{table}")')]
+
+def _colonnes_communes(conn, table, schema):
+    """Colonnes présentes à la fois dans la base principale et dans l'archive (schémas d'âges différents)"""
+    dans_archive = set(_colonnes(conn, table, schema))
+    return ", ".join(f'"{colonne}"' for colonne in _colonnes(conn, table) if colonne in dans_archive)
+
+def _creer_schema(conn, chemin):
+    """Crée dans le fichier d'archive les tables (et index) archivées, d'après la base principale"""
+    tables = TABLES_ANNUELLES + TABLES_REFERENCE + ["Eleves"]
+    definitions = conn.execute(f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('table', 'index') AND sql IS NOT NULL
+          AND tbl_name IN ({", ".join("?" * len(tables))})
+        ORDER BY type DESC
+    """, tables).fetchall()
+
+    os.makedirs(ARCHIVES_DIR, exist_ok=True)
+    archive = sqlite3.connect(chemin)
+    try:
+        existants = {row[0] for row in archive.execute("SELECT name FROM sqlite_master")}
+        for _, nom, sql in definitions:
+            if nom not in existants:
+                archive.execute(sql)
+        archive.commit()
+    finally:
+        archive.close()
+
+def _archiver(conn, annee_scolaire, fichier, compacter):
+    """Travail exclusif : déplace les lignes d'une année dans son archive (une transaction sur les deux bases)"""
+    chemin = chemin_archive(fichier)
+    _creer_schema(conn, chemin)
+    conn.execute("ATTACH DATABASE ? AS archive", (chemin,))
+    lignes = {}
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in TABLES_REFERENCE:
+                colonnes = _colonnes_communes(conn, table, "archive")
+                conn.execute(f"DELETE FROM archive.{table}")
+                conn.execute(f"INSERT INTO archive.{table} ({colonnes}) SELECT {colonnes} FROM main.{table}")
+
+            # Élèves ayant des résultats cette année (copiés avant la suppression de ces résultats)
+            iens = " UNION ".join(f"SELECT ien FROM main.{table} WHERE annee_scolaire = :annee" for table in TABLES_ANNUELLES)
+            colonnes = _colonnes_communes(conn, "Eleves", "archive")
+            conn.execute(f"""
+                INSERT OR REPLACE INTO archive.Eleves ({colonnes})
+                SELECT {colonnes} FROM main.Eleves WHERE ien IN ({iens})
+            """, {'annee': annee_scolaire})
+
+            # Une archive déjà présente (archivage interrompu) est remplacée
+            for table in TABLES_ANNUELLES:
+                colonnes = _colonnes_communes(conn, table, "archive")
+                conn.execute(f"DELETE FROM archive.{table} WHERE annee_scolaire = ?", (annee_scolaire,))
+                conn.execute(f"""
+                    INSERT INTO archive.{table} ({colonnes})
+                    SELECT {colonnes} FROM main.{table} WHERE annee_scolaire = ?
+                """, (annee_scolaire,))
+                lignes[table] = conn.execute(f"DELETE FROM main.{table} WHERE annee_scolaire = ?", (annee_scolaire,)).rowcount
+
+            # Élèves de cette année sans plus aucun résultat dans la base principale
+            restants = " UNION ".join(f"SELECT ien FROM main.{table}" for table in TABLES_ANNUELLES)
+            lignes["Eleves"] = conn.execute(f"""
+                DELETE FROM main.Eleves WHERE annee_scolaire = ? AND ien NOT IN ({restants})
+            """, (annee_scolaire,)).rowcount
+
+            conn.execute("UPDATE main.Annee_Scolaire SET fichier_archive = ? WHERE libelle = ?", (fichier, annee_scolaire))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+
+    # Rend au système la place libérée (VACUUM est impossible dans une transaction)
+    if compacter:
+        conn.execute("VACUUM")
+    return lignes
+
+def archiver_annee(annee_scolaire, compacter=True):
+    """
+    Déplace les résultats d'une année close dans son fichier d'archive
+
+    Les moyennes, notes et décisions de l'année quittent la base principale ; les élèves
+    sans autre résultat aussi. Le travail est exécuté seul par le thread d'écriture.
+
+    Args:
+        annee_scolaire: Libellé d'une année inactive
+        compacter: Réduire ensuite le fichier de la base principale (VACUUM)
+
+    Returns:
+        dict : table -> nombre de lignes retirées de la base principale
+
+    Raises:
+        ValueError: si l'année est active, inconnue ou déjà archivée
+    """
+    def verifier_et_archiver(conn):
+        annee = conn.execute(
+            "SELECT etat, fichier_archive FROM Annee_Scolaire WHERE libelle = ?", (annee_scolaire,)
+        ).fetchone()
+        if annee is None:
+            raise ValueError(f"Année scolaire inconnue : {annee_scolaire}")
+        if annee['etat'] == 'actif':
+            raise ValueError("L'année scolaire active ne peut pas être archivée.")
+        if annee['fichier_archive']:
+            raise ValueError(f"L'année {annee_scolaire} est déjà archivée.")
+        return _archiver(conn, annee_scolaire, nom_fichier_archive(annee_scolaire), compacter)
+
+    return ecrire_exclusif(verifier_et_archiver)
+
+def _reintegrer(conn, annee_scolaire, fichier):
+    """Travail exclusif : réintègre dans la base principale les lignes d'une archive"""
+    chemin = chemin_archive(fichier)
+    conn.execute("ATTACH DATABASE ? AS archive", (chemin,))
+    lignes = {}
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Les identifiants d'origine sont conservés (AUTOINCREMENT ne les réattribue jamais)
+            for table in TABLES_ANNUELLES:
+                colonnes = _colonnes_communes(conn, table, "archive")
+                lignes[table] = conn.execute(f"""
+                    INSERT OR IGNORE INTO main.{table} ({colonnes})
+                    SELECT {colonnes} FROM archive.{table} WHERE annee_scolaire = ?
+                """, (annee_scolaire,)).rowcount
+            colonnes = _colonnes_communes(conn, "Eleves", "archive")
+            lignes["Eleves"] = conn.execute(
+                f"INSERT OR IGNORE INTO main.Eleves ({colonnes}) SELECT {colonnes} FROM archive.Eleves"
+            ).rowcount
+            conn.execute("UPDATE main.Annee_Scolaire SET fichier_archive = NULL WHERE libelle = ?", (annee_scolaire,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+
+    os.remove(chemin)
+    return lignes
+
+def reintegrer_annee(annee_scolaire):
+    """
+    Ramène une année archivée dans la base principale puis supprime son archive
+
+    Returns:
+        dict : table -> nombre de lignes réintégrées
+    """
+    def verifier_et_reintegrer(conn):
+        annee = conn.execute(
+            "SELECT fichier_archive FROM Annee_Scolaire WHERE libelle = ?", (annee_scolaire,)
+        ).fetchone()
+        if annee is None or not annee['fichier_archive']:
+            raise ValueError(f"L'année {annee_scolaire} n'est pas archivée.")
+        if not os.path.exists(chemin_archive(annee['fichier_archive'])):
+            raise ValueError(f"Archive introuvable : {annee['fichier_archive']}")
+        return _reintegrer(conn, annee_scolaire, annee['fichier_archive'])
+
+    return ecrire_exclusif(verifier_et_reintegrer)
+
+def annees_archivees(conn):
+    """
+    Années archivées, des plus récentes aux plus anciennes
+
+    Returns:
+        list de (libellé, chemin du fichier d'archive)
+    """
+    return [
+        (row[0], chemin_archive(row[1]))
+        for row in conn.execute("""
+            SELECT libelle, fichier_archive FROM Annee_Scolaire
+            WHERE fichier_archive IS NOT NULL
+            ORDER BY libelle DESC
+        """)
+    ]
+
+def _uri(chemin, lecture_seule=False):
+    uri = "file:" + urllib.parse.quote(os.path.abspath(chemin))
+    return uri + "?mode=ro" if lecture_seule else uri
+
+@contextmanager
+def connexion_historique(annees=None):
+    """
+    Connexion de lecture où les archives sont attachées en lecture seule
+
+    Pour chaque table annuelle, la vue temporaire Historique_<table> réunit les lignes
+    de la base principale et celles des archives attachées : une requête pluriannuelle
+    s'écrit comme une requête sur l'année en cours.
+
+    Args:
+        annees: Libellés des années archivées à attacher (toutes par défaut, dans la
+            limite des ARCHIVES_ATTACHEES_MAX plus récentes)
+
+    Yields:
+        sqlite3.Connection (row_factory sqlite3.Row)
+    """
+    conn = sqlite3.connect(_uri(DB_PATH), uri=True, factory=fabrique_connexion(), timeout=DELAI_VERROU_SQLITE)
+    conn.row_factory = sqlite3.Row
+    try:
+        archives = [
+            (annee, chemin) for annee, chemin in annees_archivees(conn)
+            if (annees is None or annee in annees) and os.path.exists(chemin)
+        ][:ARCHIVES_ATTACHEES_MAX]
+        for annee, chemin in archives:
+            conn.execute("ATTACH DATABASE ? AS " + _alias(annee), (_uri(chemin, lecture_seule=True),))
+
+        for table in TABLES_ANNUELLES:
+            selections = [f"SELECT {_colonnes_communes(conn, table, 'main')} FROM main.{table}"]
+            for annee, _ in archives:
+                # Colonnes de la base principale absentes d'une archive plus ancienne : NULL
+                dans_archive = set(_colonnes(conn, table, _alias(annee)))
+                if not dans_archive:
+                    continue  # table créée après l'archivage de cette année
+                colonnes = ", ".join(
+                    f'"{colonne}"' if colonne in dans_archive else f'NULL AS "{colonne}"'
+                    for colonne in _colonnes(conn, table)
+                )
+                selections.append(f"SELECT {colonnes} FROM {_alias(annee)}.{table}")
+            conn.execute(f"CREATE TEMP VIEW Historique_{table} AS " + " UNION ALL ".join(selections))
+        yield conn
+    finally:
+        conn.close()
+
+def tendances_annuelles(conn):
+    """
+    Effectif, moyenne générale et taux de réussite par année et par semestre (archives comprises)
+
+    Seule la dernière ligne importée par élève et par année est retenue. Les identifiants
+    de ligne n'étant uniques que dans chaque fichier, elle est repérée par (ien, année, id).
+
+    Args:
+        conn: Connexion ouverte par connexion_historique
+
+    Returns:
+        DataFrame (annee_scolaire, semestre, eleves, moyenne, taux_reussite)
+    """
+    requete = " UNION ALL ".join(f"""
+        SELECT annee_scolaire, {semestre} AS semestre, COUNT(DISTINCT ien) AS eleves,
+               ROUND(AVG(moyenne), 2) AS moyenne,
+               ROUND(100.0 * AVG(CASE WHEN moyenne >= 10 THEN 1 ELSE 0 END), 1) AS taux_reussite
+        FROM Historique_Moyennes_Generales_S{semestre}
+        WHERE (ien, annee_scolaire, id) IN (
+            SELECT ien, annee_scolaire, MAX(id) FROM Historique_Moyennes_Generales_S{semestre}
+            GROUP BY ien, annee_scolaire
+        )
+        GROUP BY annee_scolaire
+    """ for semestre in (1, 2))
+    return pd.read_sql_query(f"{requete} ORDER BY annee_scolaire, semestre", conn)
@@ -0,0 +1,306 @@
+import os
+import zipfile
+import tempfile
+import xlsxwriter
+import pandas as pd
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    REPORTLAB_DISPONIBLE = True
+except ImportError:
+    REPORTLAB_DISPONIBLE = False
+
+# Formats de bulletin disponibles (le PDF nécessite reportlab)
+FORMATS_BULLETIN = ["xlsx", "pdf"] if REPORTLAB_DISPONIBLE else ["xlsx"]
+
+# Nombre maximal de bulletins en attente par processus (borne la mémoire)
+BULLETINS_EN_ATTENTE_PAR_PROCESSUS = 4
+
+def charger_bulletins(conn, semestre, annee_scolaire, id_classe=None, id_niveau=None):
+    """
+    Récupère en deux requêtes toutes les données des bulletins d'une classe ou d'un niveau
+
+    Seule la dernière ligne importée par élève (et par discipline) est retenue.
+    Le rang affiché est le rang dans la classe calculé par calculer_rangs (et non
+    le rang fourni par PLANETE, conservé dans rang_import).
+
+    Args:
+        conn: Connexion à la base de données
+        semestre: Semestre (1 ou 2)
+        annee_scolaire: Libellé de l'année scolaire
+        id_classe: Restreindre à une classe
+        id_niveau: Restreindre à un niveau
+
+    Returns:
+        Liste de dict, un par élève, prêts à être transmis aux processus de rendu
+    """
+    filtre = ""
+    params = [annee_scolaire]
+    if id_classe is not None:
+        filtre += " AND i.id_classe = ?"
+        params.append(id_classe)
+    if id_niveau is not None:
+        filtre += " AND c.id_niveau = ?"
+        params.append(id_niveau)
+
+    df_eleves = pd.read_sql_query(f"""
+        WITH mg AS (
+            SELECT * FROM Moyennes_Generales_S{semestre}
+            WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ? GROUP BY ien)
+        )
+        SELECT e.ien, e.prenom, e.nom, e.sexe, e.date_naissance, e.lieu_naissance,
+               n.libelle as niveau, c.libelle as classe,
+               COUNT(*) OVER (PARTITION BY c.id) as effectif_classe,
+               mg.moyenne, mg.rang, mg.retard, mg.absence,
+               mg.conseil_discipline, mg.appreciation, mg.observation
+        FROM mg
+        JOIN Eleves e ON mg.ien = e.ien
+        JOIN Inscriptions i ON i.ien = mg.ien AND i.annee_scolaire = mg.annee_scolaire
+        JOIN Classes c ON i.id_classe = c.id
+        JOIN Niveaux n ON c.id_niveau = n.id
+        WHERE 1 = 1 {filtre}
+        ORDER BY n.libelle, c.libelle, e.nom, e.prenom
+    """, conn, params=params)
+
+    df_notes = pd.read_sql_query(f"""
+        WITH notes AS (
+            SELECT * FROM Notes_S{semestre}
+            WHERE id IN (SELECT MAX(id) FROM Notes_S{semestre} WHERE annee_scolaire = ? GROUP BY ien, id_discipline)
+        )
+        SELECT notes.ien, d.libelle as discipline, d.coefficient,
+               notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d,
+               ROUND(AVG(notes.moy_d) OVER (PARTITION BY c.id, notes.id_discipline), 2) as moyenne_classe
+        FROM notes
+        JOIN Eleves e ON notes.ien = e.ien
+        JOIN Inscriptions i ON i.ien = notes.ien AND i.annee_scolaire = notes.annee_scolaire
+        JOIN Classes c ON i.id_classe = c.id
+        JOIN Disciplines d ON notes.id_discipline = d.id
+        WHERE 1 = 1 {filtre}
+        ORDER BY d.libelle
+    """, conn, params=params)
+
+    config = pd.read_sql_query("SELECT * FROM Configuration LIMIT 1", conn)
+    etablissement = config.iloc[0].to_dict() if not config.empty else {}
+
+    notes_par_eleve = {
+        ien: groupe.drop(columns='ien').to_dict('records')
+        for ien, groupe in df_notes.groupby('ien', sort=False)
+    }
+
+    bulletins = []
+    for eleve in df_eleves.to_dict('records'):
+        bulletins.append({
+            'etablissement': etablissement,
+            'annee_scolaire': annee_scolaire,
+            'semestre': semestre,
+            'eleve': eleve,
+            'notes': notes_par_eleve.get(eleve['ien'], []),
+        })
+    return bulletins
+
+def _valeur(valeur, decimales=2):
+    """Formate une valeur pour l'affichage (vide si manquante)"""
+    if valeur is None or (isinstance(valeur, float) and pd.isna(valeur)):
+        return ""
+    if isinstance(valeur, float):
+        return int(valeur) if valeur.is_integer() else round(valeur, decimales)
+    return valeur
+
+def nom_fichier_bulletin(bulletin, extension):
+    """Nom du fichier d'un bulletin dans l'archive : Niveau_Classe/NOM_Prenom_IEN.ext"""
+    eleve = bulletin['eleve']
+    dossier = f"{eleve['niveau']}_{eleve['classe']}".replace(" ", "_").replace("/", "-")
+    fichier = f"{eleve['nom']}_{eleve['prenom']}_{eleve['ien']}".replace(" ", "_").replace("/", "-")
+    return f"{dossier}/{fichier}.{extension}"
+
+def rendre_bulletin_xlsx(bulletin):
+    """
+    Produit le bulletin d'un élève au format Excel
+
+    Args:
+        bulletin: dict issu de charger_bulletins
+
+    Returns:
+        bytes: Contenu du fichier Excel
+    """
+    eleve = bulletin['eleve']
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    sheet = workbook.add_worksheet("Bulletin")
+
+    titre = workbook.add_format({'bold': True, 'font_size': 14})
+    gras = workbook.add_format({'bold': True})
+    entete = workbook.add_format({'bold': True, 'bg_color': '#D9E1F2', 'border': 1})
+    cellule = workbook.add_format({'border': 1})
+
+    sheet.set_column(0, 0, 28)
+    sheet.set_column(1, 6, 14)
+
+    nom_etablissement = bulletin['etablissement'].get('nom_etablissement') or ""
+    sheet.write(0, 0, nom_etablissement, titre)
+    sheet.write(1, 0, f"Bulletin du semestre {bulletin['semestre']} - Année scolaire {bulletin['annee_scolaire']}", gras)
+
+    infos = [
+        ("Élève", f"{eleve['prenom']} {eleve['nom']}"),
+        ("IEN", eleve['ien']),
+        ("Né(e) le", f"{_valeur(eleve['date_naissance'])} à {_valeur(eleve['lieu_naissance'])}"),
+        ("Classe", f"{eleve['niveau']} {eleve['classe']}"),
+    ]
+    for i, (libelle, valeur) in enumerate(infos):
+        sheet.write(3 + i, 0, libelle, gras)
+        sheet.write(3 + i, 1, valeur)
+
+    ligne = 8
+    colonnes = ["Discipline", "Coef.", "Moy. devoirs", "Composition", "Moyenne", "Rang", "Moy. classe"]
+    for j, libelle in enumerate(colonnes):
+        sheet.write(ligne, j, libelle, entete)
+
+    for note in bulletin['notes']:
+        ligne += 1
+        valeurs = [note['discipline'], note['coefficient'], note['moy_dd'], note['comp_d'],
+                   note['moy_d'], note['rang_d'], note['moyenne_classe']]
+        for j, valeur in enumerate(valeurs):
+            sheet.write(ligne, j, _valeur(valeur), cellule)
+
+    ligne += 2
+    resultats = [
+        ("Moyenne générale", _valeur(eleve['moyenne'])),
+        ("Rang", f"{_valeur(eleve['rang'])} / {eleve['effectif_classe']}"),
+        ("Retards", _valeur(eleve['retard'])),
+        ("Absences", _valeur(eleve['absence'])),
+        ("Conseil de discipline", _valeur(eleve['conseil_discipline'])),
+        ("Appréciation", _valeur(eleve['appreciation'])),
+        ("Observation", _valeur(eleve['observation'])),
+    ]
+    for libelle, valeur in resultats:
+        sheet.write(ligne, 0, libelle, gras)
+        sheet.write(ligne, 1, valeur)
+        ligne += 1
+
+    workbook.close()
+    return output.getvalue()
+
+def rendre_bulletin_pdf(bulletin):
+    """
+    Produit le bulletin d'un élève au format PDF (nécessite reportlab)
+
+    Args:
+        bulletin: dict issu de charger_bulletins
+
+    Returns:
+        bytes: Contenu du fichier PDF
+    """
+    if not REPORTLAB_DISPONIBLE:
+        raise ImportError("Le module reportlab est nécessaire pour produire des bulletins PDF")
+
+    eleve = bulletin['eleve']
+    styles = getSampleStyleSheet()
+    output = BytesIO()
+    document = SimpleDocTemplate(output, pagesize=A4, title=f"Bulletin {eleve['prenom']} {eleve['nom']}")
+
+    elements = [
+        Paragraph(bulletin['etablissement'].get('nom_etablissement') or "", styles['Title']),
+        Paragraph(f"Bulletin du semestre {bulletin['semestre']} - Année scolaire {bulletin['annee_scolaire']}", styles['Heading2']),
+        Paragraph(f"<b>Élève :</b> {eleve['prenom']} {eleve['nom']} ({eleve['ien']})", styles['Normal']),
+        Paragraph(f"<b>Classe :</b> {eleve['niveau']} {eleve['classe']}", styles['Normal']),
+        Spacer(1, 12),
+    ]
+
+    lignes = [["Discipline", "Coef.", "Moy. devoirs", "Composition", "Moyenne", "Rang", "Moy. classe"]]
+    for note in bulletin['notes']:
+        lignes.append([str(_valeur(v)) for v in (
+            note['discipline'], note['coefficient'], note['moy_dd'], note['comp_d'],
+            note['moy_d'], note['rang_d'], note['moyenne_classe']
+        )])
+
+    tableau = Table(lignes, repeatRows=1)
+    tableau.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D9E1F2')),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]))
+    elements.extend([tableau, Spacer(1, 12)])
+
+    elements.extend([
+        Paragraph(f"<b>Moyenne générale :</b> {_valeur(eleve['moyenne'])}", styles['Normal']),
+        Paragraph(f"<b>Rang :</b> {_valeur(eleve['rang'])} / {eleve['effectif_classe']}", styles['Normal']),
+        Paragraph(f"<b>Retards :</b> {_valeur(eleve['retard'])} &nbsp; <b>Absences :</b> {_valeur(eleve['absence'])}", styles['Normal']),
+        Paragraph(f"<b>Appréciation :</b> {_valeur(eleve['appreciation'])}", styles['Normal']),
+    ])
+
+    document.build(elements)
+    return output.getvalue()
+
+def _rendre_bulletin(args):
+    """Rendu d'un bulletin dans un processus de travail (fonction de module pour être sérialisable)"""
+    bulletin, format_fichier = args
+    rendu = rendre_bulletin_pdf if format_fichier == "pdf" else rendre_bulletin_xlsx
+    return nom_fichier_bulletin(bulletin, format_fichier), rendu(bulletin)
+
+def generer_archive_bulletins(bulletins, format_fichier="xlsx", destination=None, nb_processus=None, progression=None):
+    """
+    Produit les bulletins en parallèle et les écrit au fil de l'eau dans une archive ZIP
+
+    Le nombre de bulletins en cours de rendu est borné : la mémoire utilisée ne dépend
+    pas de la taille du lot, seule l'archive sur disque grossit.
+
+    Args:
+        bulletins: Liste de dict issue de charger_bulletins
+        format_fichier: "xlsx" ou "pdf"
+        destination: Chemin du fichier ZIP (fichier temporaire si None)
+        nb_processus: Nombre de processus de rendu (nombre de cœurs par défaut, 1 pour tout faire sur place)
+        progression: Fonction appelée avec (nombre traité, total) après chaque bulletin
+
+    Returns:
+        str: Chemin de l'archive ZIP produite
+    """
+    if format_fichier not in FORMATS_BULLETIN:
+        raise ValueError(f"Format de bulletin non disponible : {format_fichier}")
+
+    if destination is None:
+        descripteur, destination = tempfile.mkstemp(prefix="bulletins_", suffix=".zip")
+        os.close(descripteur)
+
+    nb_processus = nb_processus or os.cpu_count() or 1
+    total = len(bulletins)
+    traites = 0
+
+    with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        if nb_processus == 1 or total <= 1:
+            for bulletin in bulletins:
+                nom, contenu = _rendre_bulletin((bulletin, format_fichier))
+                archive.writestr(nom, contenu)
+                traites += 1
+                if progression:
+                    progression(traites, total)
+            return destination
+
+        limite = nb_processus * BULLETINS_EN_ATTENTE_PAR_PROCESSUS
+        a_traiter = iter(bulletins)
+        en_cours = set()
+
+        with ProcessPoolExecutor(max_workers=nb_processus) as executor:
+            while True:
+                # Alimenter le pool sans dépasser la limite de bulletins en attente
+                for bulletin in a_traiter:
+                    en_cours.add(executor.submit(_rendre_bulletin, (bulletin, format_fichier)))
+                    if len(en_cours) >= limite:
+                        break
+
+                if not en_cours:
+                    break
+
+                termines, en_cours = wait(en_cours, return_when=FIRST_COMPLETED)
+                for future in termines:
+                    nom, contenu = future.result()
+                    archive.writestr(nom, contenu)
+                    traites += 1
+                    if progression:
+                        progression(traites, total)
+
+    return destination
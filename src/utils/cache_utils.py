@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+import time
+import hashlib
+from ..config import CACHE_RAPPORTS_DIR, CACHE_RAPPORTS_TAILLE_MAX
+from .db_utils import get_db_connection, get_version_donnees, get_identifiant_base
+from .metriques_utils import CACHE_RAPPORTS, RAPPORTS_DUREE
+
+def cle_rapport(type_rapport, parametres, version, base=None):
+    """
+    Calcule la clé d'un rapport à partir de son type, de ses paramètres et de la version des données
+
+    Args:
+        type_rapport: Identifiant du rapport (ex: "tableau_honneur_global")
+        parametres: dict des paramètres (valeurs sérialisables en JSON)
+        version: Version des données (voir get_version_donnees)
+        base: Identifiant de la base (voir get_identifiant_base) : une base recréée,
+            dont la version repart à 0, ne retrouve pas les rapports de la précédente
+
+    Returns:
+        str: Empreinte SHA-256 utilisée comme nom de fichier
+    """
+    description = json.dumps(
+        {'type': type_rapport, 'parametres': parametres, 'version': version, 'base': base},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+def _chemin(cle):
+    return os.path.join(CACHE_RAPPORTS_DIR, cle)
+
+def lire_artefact(cle):
+    """
+    Lit un rapport en cache et le marque comme récemment utilisé
+
+    Returns:
+        bytes ou None si le rapport n'est pas en cache
+    """
+    chemin = _chemin(cle)
+    try:
+        with open(chemin, "rb") as f:
+            contenu = f.read()
+    except FileNotFoundError:
+        return None
+
+    # La date de modification sert d'horodatage d'accès pour l'éviction LRU
+    try:
+        os.utime(chemin)
+    except OSError:
+        pass
+    return contenu
+
+def ecrire_artefact(cle, contenu, taille_max=CACHE_RAPPORTS_TAILLE_MAX):
+    """
+    Enregistre un rapport dans le cache puis évince les moins récemment utilisés si nécessaire
+
+    Args:
+        cle: Clé issue de cle_rapport
+        contenu: bytes du rapport
+        taille_max: Taille maximale du cache en octets
+    """
+    os.makedirs(CACHE_RAPPORTS_DIR, exist_ok=True)
+    chemin = _chemin(cle)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, "wb") as f:
+        f.write(contenu)
+    os.replace(temporaire, chemin)
+    evincer(taille_max)
+
+def evincer(taille_max=CACHE_RAPPORTS_TAILLE_MAX):
+    """Supprime les rapports les moins récemment utilisés jusqu'à repasser sous la taille maximale"""
+    if not os.path.isdir(CACHE_RAPPORTS_DIR):
+        return
+
+    fichiers = []
+    for entree in os.scandir(CACHE_RAPPORTS_DIR):
+        if entree.is_file() and not entree.name.endswith(".tmp"):
+            infos = entree.stat()
+            fichiers.append((infos.st_mtime, infos.st_size, entree.path))
+
+    taille_totale = sum(taille for _, taille, _ in fichiers)
+    for _, taille, chemin in sorted(fichiers):
+        if taille_totale <= taille_max:
+            break
+        try:
+            os.remove(chemin)
+            taille_totale -= taille
+        except OSError:
+            pass
+
+def vider_cache_rapports():
+    """Supprime tous les rapports en cache (ex: après restauration d'une sauvegarde)"""
+    shutil.rmtree(CACHE_RAPPORTS_DIR, ignore_errors=True)
+
+def artefact_rapport(type_rapport, parametres, generer):
+    """
+    Retourne un rapport depuis le cache, ou le génère et le met en cache
+
+    La clé inclut la version des données : toute modification de la base rend
+    les rapports existants obsolètes sans invalidation explicite.
+
+    Args:
+        type_rapport: Identifiant du rapport
+        parametres: dict des paramètres du rapport
+        generer: Fonction sans argument produisant les bytes du rapport
+
+    Returns:
+        bytes: Contenu du rapport
+    """
+    conn = get_db_connection()
+    try:
+        cle = cle_rapport(type_rapport, parametres, get_version_donnees(conn), get_identifiant_base(conn))
+    finally:
+        conn.close()
+    contenu = lire_artefact(cle)
+    CACHE_RAPPORTS.incrementer(type_rapport=type_rapport, resultat="hit" if contenu is not None else "miss")
+    if contenu is None:
+        debut = time.perf_counter()
+        contenu = generer()
+        RAPPORTS_DUREE.observer(time.perf_counter() - debut, type_rapport=type_rapport)
+        ecrire_artefact(cle, contenu)
+    return contenu
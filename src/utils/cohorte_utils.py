@@ -0,0 +1,261 @@
+import pandas as pd
+from datetime import datetime
+from ..config import NIVEAUX
+from .db_utils import get_version_donnees
+from .ecriture_utils import ecrire
+from .archive_utils import connexion_historique
+
+# Devenir d'un élève l'année suivante (colonne Trajectoires.statut, NULL pour la dernière année connue)
+STATUT_PASSAGE = "passage"
+STATUT_REDOUBLEMENT = "redoublement"
+STATUT_SORTIE = "sortie"
+
+def _valeur_sql(valeur):
+    """Valeur pandas/numpy convertie pour sqlite3 (NaN -> NULL)"""
+    if pd.isna(valeur):
+        return None
+    return valeur.item() if hasattr(valeur, 'item') else valeur
+
+def charger_trajectoires(conn):
+    """
+    Une ligne par élève et par année d'inscription, avec son devenir l'année suivante
+
+    Les identifiants de ligne n'étant uniques que dans chaque fichier (base principale
+    ou archive), la dernière ligne importée est repérée par (ien, année, id).
+
+    Args:
+        conn: Connexion ouverte par connexion_historique (années archivées comprises)
+
+    Returns:
+        DataFrame des colonnes de la table Trajectoires
+    """
+    df = pd.read_sql_query("""
+        WITH ins AS (
+            SELECT i.ien, i.annee_scolaire, i.id_classe, c.libelle as classe,
+                   n.id as id_niveau, n.libelle as niveau,
+                   LEAD(i.annee_scolaire) OVER suivante as annee_suivante,
+                   LEAD(n.libelle) OVER suivante as niveau_suivant
+            FROM Historique_Inscriptions i
+            LEFT JOIN Classes c ON i.id_classe = c.id
+            LEFT JOIN Niveaux n ON c.id_niveau = n.id
+            WINDOW suivante AS (PARTITION BY i.ien ORDER BY i.annee_scolaire)
+        ),
+        s1 AS (
+            SELECT ien, annee_scolaire, moyenne FROM Historique_Moyennes_Generales_S1
+            WHERE (ien, annee_scolaire, id) IN (
+                SELECT ien, annee_scolaire, MAX(id) FROM Historique_Moyennes_Generales_S1 GROUP BY ien, annee_scolaire
+            )
+        ),
+        s2 AS (
+            SELECT ien, annee_scolaire, moyenne FROM Historique_Moyennes_Generales_S2
+            WHERE (ien, annee_scolaire, id) IN (
+                SELECT ien, annee_scolaire, MAX(id) FROM Historique_Moyennes_Generales_S2 GROUP BY ien, annee_scolaire
+            )
+        ),
+        df AS (
+            SELECT ien, annee_scolaire, decision, moyenne_annuelle FROM Historique_Decisions_Finales
+            WHERE (ien, annee_scolaire, id) IN (
+                SELECT ien, annee_scolaire, MAX(id) FROM Historique_Decisions_Finales GROUP BY ien, annee_scolaire
+            )
+        )
+        SELECT ins.ien, ins.annee_scolaire, ins.id_classe, ins.classe, ins.id_niveau, ins.niveau,
+               s1.moyenne as moyenne_s1, s2.moyenne as moyenne_s2,
+               COALESCE(df.moyenne_annuelle,
+                        ROUND((COALESCE(s1.moyenne, s2.moyenne) + COALESCE(s2.moyenne, s1.moyenne)) / 2, 2))
+                   as moyenne_annuelle,
+               df.decision, ins.annee_suivante, ins.niveau_suivant
+        FROM ins
+        LEFT JOIN s1 ON s1.ien = ins.ien AND s1.annee_scolaire = ins.annee_scolaire
+        LEFT JOIN s2 ON s2.ien = ins.ien AND s2.annee_scolaire = ins.annee_scolaire
+        LEFT JOIN df ON df.ien = ins.ien AND df.annee_scolaire = ins.annee_scolaire
+    """, conn)
+
+    # Passage si le niveau suivant est plus avancé (ordre de NIVEAUX), redoublement sinon ;
+    # un niveau hors de NIVEAUX compte comme un passage dès qu'il change
+    ordre = {niveau: i for i, niveau in enumerate(NIVEAUX)}
+    rang = df['niveau'].map(ordre)
+    rang_suivant = df['niveau_suivant'].map(ordre)
+    progresse = (rang_suivant > rang).where(rang.notna() & rang_suivant.notna(), df['niveau_suivant'] != df['niveau'])
+
+    # Sans inscription ultérieure : sortie, sauf pour la dernière année connue de l'établissement
+    derniere_annee = df['annee_scolaire'].max()
+    inscrit_ensuite = df['annee_suivante'].notna()
+    df['statut'] = None
+    df.loc[inscrit_ensuite & progresse, 'statut'] = STATUT_PASSAGE
+    df.loc[inscrit_ensuite & ~progresse, 'statut'] = STATUT_REDOUBLEMENT
+    df.loc[~inscrit_ensuite & (df['annee_scolaire'] < derniere_annee), 'statut'] = STATUT_SORTIE
+    return df
+
+def charger_disciplines_annuelles(conn):
+    """
+    Moyenne annuelle de chaque élève par discipline (moyenne des semestres notés)
+
+    Args:
+        conn: Connexion ouverte par connexion_historique
+
+    Returns:
+        DataFrame (ien, annee_scolaire, id_discipline, discipline, moyenne)
+    """
+    return pd.read_sql_query("""
+        WITH notes AS (
+            SELECT ien, annee_scolaire, id_discipline, moy_d FROM Historique_Notes_S1
+            WHERE (ien, annee_scolaire, id_discipline, id) IN (
+                SELECT ien, annee_scolaire, id_discipline, MAX(id) FROM Historique_Notes_S1 GROUP BY ien, annee_scolaire, id_discipline
+            )
+            UNION ALL
+            SELECT ien, annee_scolaire, id_discipline, moy_d FROM Historique_Notes_S2
+            WHERE (ien, annee_scolaire, id_discipline, id) IN (
+                SELECT ien, annee_scolaire, id_discipline, MAX(id) FROM Historique_Notes_S2 GROUP BY ien, annee_scolaire, id_discipline
+            )
+        )
+        SELECT notes.ien, notes.annee_scolaire, notes.id_discipline, d.libelle as discipline,
+               ROUND(AVG(notes.moy_d), 2) as moyenne
+        FROM notes
+        JOIN Disciplines d ON notes.id_discipline = d.id
+        GROUP BY notes.ien, notes.annee_scolaire, notes.id_discipline
+    """, conn)
+
+def _enregistrer_trajectoires(conn, df, df_disciplines, version):
+    """Travail d'écriture : remplace les trajectoires précalculées"""
+    cursor = conn.cursor()
+    colonnes = [
+        'ien', 'annee_scolaire', 'id_classe', 'classe', 'id_niveau', 'niveau', 'moyenne_s1', 'moyenne_s2',
+        'moyenne_annuelle', 'decision', 'annee_suivante', 'niveau_suivant', 'statut',
+    ]
+    cursor.execute("DELETE FROM Trajectoires")
+    cursor.executemany(f"""
+        INSERT INTO Trajectoires ({", ".join(colonnes)})
+        VALUES ({", ".join("?" * len(colonnes))})
+    """, [
+        tuple(_valeur_sql(valeur) for valeur in row)
+        for row in df[colonnes].itertuples(index=False, name=None)
+    ])
+
+    cursor.execute("DELETE FROM Trajectoires_Disciplines")
+    cursor.executemany("""
+        INSERT INTO Trajectoires_Disciplines (ien, annee_scolaire, id_discipline, discipline, moyenne)
+        VALUES (?, ?, ?, ?, ?)
+    """, [
+        tuple(_valeur_sql(valeur) for valeur in row)
+        for row in df_disciplines[['ien', 'annee_scolaire', 'id_discipline', 'discipline', 'moyenne']]
+        .itertuples(index=False, name=None)
+    ])
+
+    cursor.execute("""
+        INSERT OR REPLACE INTO Trajectoires_Etat (id, version, date_calcul) VALUES (1, ?, ?)
+    """, (version, datetime.now().isoformat(timespec="seconds")))
+
+def trajectoires_a_jour(conn):
+    """Les trajectoires précalculées correspondent-elles à la version courante des données ?"""
+    row = conn.execute("SELECT version FROM Trajectoires_Etat WHERE id = 1").fetchone()
+    return row is not None and row[0] == get_version_donnees(conn)
+
+def calculer_trajectoires():
+    """
+    Recalcule les tables Trajectoires et Trajectoires_Disciplines (archives comprises)
+
+    Le calcul se fait sur une connexion de lecture où les années archivées sont
+    attachées ; seul l'enregistrement passe par le thread d'écriture. La version
+    relevée avant le calcul est enregistrée avec le résultat : une écriture
+    survenue pendant le calcul le laisse périmé.
+
+    Returns:
+        int : nombre de trajectoires (élève x année) enregistrées
+    """
+    with connexion_historique() as conn:
+        version = get_version_donnees(conn)
+        df = charger_trajectoires(conn)
+        df_disciplines = charger_disciplines_annuelles(conn)
+
+    ecrire(_enregistrer_trajectoires, df, df_disciplines, version)
+    return len(df)
+
+def cohortes_disponibles(conn):
+    """
+    Cohortes pouvant être suivies : un niveau une année donnée
+
+    Returns:
+        DataFrame (annee_scolaire, id_niveau, niveau, effectif)
+    """
+    return pd.read_sql_query("""
+        SELECT annee_scolaire, id_niveau, niveau, COUNT(*) as effectif
+        FROM Trajectoires
+        WHERE id_niveau IS NOT NULL
+        GROUP BY annee_scolaire, id_niveau
+        ORDER BY annee_scolaire DESC, niveau
+    """, conn)
+
+def suivi_cohorte(conn, annee_scolaire, id_niveau):
+    """
+    Devenir d'une cohorte année après année
+
+    Args:
+        conn: Connexion à la base de données
+        annee_scolaire: Année d'entrée de la cohorte
+        id_niveau: Niveau de la cohorte cette année-là
+
+    Returns:
+        DataFrame, une ligne par année à partir de l'entrée : inscrits, passages,
+        redoublements, sorties, moyenne, taux de rétention (inscrits / effectif initial)
+        et taux de redoublement (redoublements / inscrits), en %
+    """
+    df = pd.read_sql_query("""
+        WITH cohorte AS (
+            SELECT ien FROM Trajectoires WHERE annee_scolaire = ? AND id_niveau = ?
+        )
+        SELECT t.annee_scolaire, COUNT(*) as inscrits,
+               SUM(CASE WHEN t.statut = 'passage' THEN 1 ELSE 0 END) as passages,
+               SUM(CASE WHEN t.statut = 'redoublement' THEN 1 ELSE 0 END) as redoublements,
+               SUM(CASE WHEN t.statut = 'sortie' THEN 1 ELSE 0 END) as sorties,
+               ROUND(AVG(t.moyenne_annuelle), 2) as moyenne
+        FROM cohorte
+        JOIN Trajectoires t ON t.ien = cohorte.ien AND t.annee_scolaire >= ?
+        GROUP BY t.annee_scolaire
+        ORDER BY t.annee_scolaire
+    """, conn, params=(annee_scolaire, id_niveau, annee_scolaire))
+
+    if not df.empty:
+        df['taux_retention'] = (100 * df['inscrits'] / df['inscrits'].iloc[0]).round(1)
+        df['taux_redoublement'] = (100 * df['redoublements'] / df['inscrits']).round(1)
+    return df
+
+def disciplines_cohorte(conn, annee_scolaire, id_niveau):
+    """
+    Moyenne de la cohorte par discipline et par année (élèves encore inscrits)
+
+    Returns:
+        DataFrame (annee_scolaire, discipline, eleves, moyenne)
+    """
+    return pd.read_sql_query("""
+        WITH cohorte AS (
+            SELECT ien FROM Trajectoires WHERE annee_scolaire = ? AND id_niveau = ?
+        )
+        SELECT td.annee_scolaire, td.discipline, COUNT(*) as eleves, ROUND(AVG(td.moyenne), 2) as moyenne
+        FROM cohorte
+        JOIN Trajectoires_Disciplines td ON td.ien = cohorte.ien AND td.annee_scolaire >= ?
+        GROUP BY td.annee_scolaire, td.id_discipline
+        ORDER BY td.discipline, td.annee_scolaire
+    """, conn, params=(annee_scolaire, id_niveau, annee_scolaire))
+
+def parcours_eleve(conn, ien):
+    """
+    Parcours d'un élève : une ligne par année, et ses moyennes par discipline
+
+    Returns:
+        tuple (DataFrame des années, DataFrame discipline x année des moyennes)
+    """
+    df_annees = pd.read_sql_query("""
+        SELECT annee_scolaire, niveau, classe, moyenne_s1, moyenne_s2, moyenne_annuelle, decision, statut
+        FROM Trajectoires
+        WHERE ien = ?
+        ORDER BY annee_scolaire
+    """, conn, params=(ien,))
+
+    df_disciplines = pd.read_sql_query("""
+        SELECT annee_scolaire, discipline, moyenne
+        FROM Trajectoires_Disciplines
+        WHERE ien = ?
+    """, conn, params=(ien,))
+    if not df_disciplines.empty:
+        df_disciplines = df_disciplines.pivot(index='discipline', columns='annee_scolaire', values='moyenne')
+    return df_annees, df_disciplines
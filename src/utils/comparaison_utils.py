@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Tranches d'évolution S1 -> S2 (en points de moyenne)
+BORNES_EVOLUTION = [-np.inf, -2, -0.5, 0.5, 2, np.inf]
+LIBELLES_EVOLUTION = ["Forte régression", "Régression", "Stable", "Progression", "Forte progression"]
+
+def comparer_eleves(conn, annee_scolaire):
+    """
+    Récupère en une seule requête les moyennes S1 et S2 de chaque élève avec sa classe et son niveau
+
+    Seule la dernière ligne importée par élève et par semestre est retenue.
+
+    Args:
+        conn: Connexion à la base de données
+        annee_scolaire: Libellé de l'année scolaire
+
+    Returns:
+        DataFrame avec une ligne par élève présent aux deux semestres, l'écart et sa tranche
+    """
+    query = """
+        WITH s1 AS (
+            SELECT ien, moyenne FROM Moyennes_Generales_S1
+            WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S1 WHERE annee_scolaire = ? GROUP BY ien)
+        ),
+        s2 AS (
+            SELECT ien, moyenne FROM Moyennes_Generales_S2
+            WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S2 WHERE annee_scolaire = ? GROUP BY ien)
+        )
+        SELECT e.ien, e.prenom, e.nom, e.sexe, n.libelle as niveau, c.libelle as classe,
+               s1.moyenne as moyenne_s1, s2.moyenne as moyenne_s2,
+               s2.moyenne - s1.moyenne as evolution
+        FROM s1
+        JOIN s2 ON s2.ien = s1.ien
+        JOIN Eleves e ON e.ien = s1.ien
+        JOIN Inscriptions i ON i.ien = s1.ien AND i.annee_scolaire = ?
+        JOIN Classes c ON i.id_classe = c.id
+        JOIN Niveaux n ON c.id_niveau = n.id
+    """
+
+    df = pd.read_sql_query(query, conn, params=(annee_scolaire, annee_scolaire, annee_scolaire))
+    df['tranche'] = pd.cut(df['evolution'], bins=BORNES_EVOLUTION, labels=LIBELLES_EVOLUTION)
+    return df
+
+def comparer_disciplines(conn, annee_scolaire):
+    """
+    Calcule l'évolution S1 -> S2 de chaque discipline en une seule requête agrégée
+
+    Seule la dernière ligne importée par élève, discipline et semestre est retenue.
+
+    Args:
+        conn: Connexion à la base de données
+        annee_scolaire: Libellé de l'année scolaire
+
+    Returns:
+        DataFrame avec une ligne par discipline
+    """
+    query = """
+        WITH n1 AS (
+            SELECT ien, id_discipline, moy_d FROM Notes_S1
+            WHERE id IN (SELECT MAX(id) FROM Notes_S1 WHERE annee_scolaire = ? GROUP BY ien, id_discipline)
+        ),
+        n2 AS (
+            SELECT ien, id_discipline, moy_d FROM Notes_S2
+            WHERE id IN (SELECT MAX(id) FROM Notes_S2 WHERE annee_scolaire = ? GROUP BY ien, id_discipline)
+        )
+        SELECT d.libelle as discipline, COUNT(*) as nb_eleves,
+               AVG(n1.moy_d) as moyenne_s1, AVG(n2.moy_d) as moyenne_s2,
+               AVG(n2.moy_d - n1.moy_d) as evolution,
+               SUM(CASE WHEN n2.moy_d > n1.moy_d THEN 1 ELSE 0 END) as nb_progression,
+               SUM(CASE WHEN n2.moy_d < n1.moy_d THEN 1 ELSE 0 END) as nb_regression
+        FROM n1
+        JOIN n2 ON n2.ien = n1.ien AND n2.id_discipline = n1.id_discipline
+        JOIN Disciplines d ON d.id = n1.id_discipline
+        GROUP BY d.libelle
+        ORDER BY evolution DESC
+    """
+
+    df = pd.read_sql_query(query, conn, params=(annee_scolaire, annee_scolaire))
+    for col in ['moyenne_s1', 'moyenne_s2', 'evolution']:
+        df[col] = df[col].round(2)
+    return df
+
+def agreger_evolution(df_eleves, groupes):
+    """
+    Agrège les évolutions individuelles par groupe (classe, niveau...)
+
+    Args:
+        df_eleves: DataFrame issu de comparer_eleves
+        groupes: Liste des colonnes de regroupement
+
+    Returns:
+        DataFrame avec effectif, moyennes S1/S2, évolution moyenne et nombre d'élèves par tranche
+    """
+    df_groupes = df_eleves.groupby(groupes, observed=True).agg(
+        nb_eleves=('ien', 'count'),
+        moyenne_s1=('moyenne_s1', 'mean'),
+        moyenne_s2=('moyenne_s2', 'mean'),
+        evolution=('evolution', 'mean'),
+    )
+
+    repartition = pd.crosstab(
+        [df_eleves[g] for g in groupes],
+        df_eleves['tranche']
+    ).reindex(columns=LIBELLES_EVOLUTION, fill_value=0)
+
+    df_groupes = df_groupes.join(repartition).reset_index()
+    for col in ['moyenne_s1', 'moyenne_s2', 'evolution']:
+        df_groupes[col] = df_groupes[col].round(2)
+    return df_groupes
+
+def plus_fortes_evolutions(df_eleves, n=10):
+    """
+    Retourne les élèves ayant le plus progressé et le plus régressé
+
+    Args:
+        df_eleves: DataFrame issu de comparer_eleves
+        n: Nombre d'élèves dans chaque liste
+
+    Returns:
+        tuple (progressions, regressions)
+    """
+    colonnes = ['prenom', 'nom', 'niveau', 'classe', 'moyenne_s1', 'moyenne_s2', 'evolution']
+    progressions = df_eleves.nlargest(n, 'evolution')[colonnes]
+    regressions = df_eleves.nsmallest(n, 'evolution')[colonnes]
+    return progressions, regressions
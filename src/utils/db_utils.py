@@ -1,19 +1,57 @@
 import sqlite3
 import os
+import threading
+import uuid
 import pandas as pd
-from ..config import DB_PATH, DATA_DIR
+from ..config import DB_PATH, DATA_DIR, DELAI_VERROU_SQLITE
+from .trace_utils import fabrique_connexion
+from .ecriture_utils import ecrire, ecrire_exclusif
+
+# Schéma créé ou mis à jour par ce processus (voir init_database)
+_verrou_schema = threading.Lock()
+_schema_a_jour = False
 
 def init_database():
-    """Initialise la base de données si elle n'existe pas"""
-    # Créer le dossier data s'il n'existe pas
-    os.makedirs(DATA_DIR, exist_ok=True)
-    
-    # Vérifier si la base existe déjà
-    if os.path.exists(DB_PATH):
+    """
+    Crée la base ou met à jour son schéma, une seule fois par processus
+
+    Le schéma et les reprises de données passent par le thread d'écriture. Les
+    réexécutions suivantes du script ne font que vérifier l'existence du fichier :
+    elles ne prennent jamais le verrou d'écriture et ne sont donc pas bloquées
+    pendant qu'un import valide ses lots.
+    """
+    global _schema_a_jour
+    if _schema_a_jour and os.path.exists(DB_PATH):
         return
     
-    # Créer une nouvelle base de données
-    conn = sqlite3.connect(DB_PATH)
+    with _verrou_schema:
+        if _schema_a_jour and os.path.exists(DB_PATH):
+            return
+        # Créer le dossier data s'il n'existe pas
+        os.makedirs(DATA_DIR, exist_ok=True)
+        # Le mode de journal ne peut pas changer dans une transaction
+        ecrire_exclusif(activer_wal)
+        ecrire(_preparer_schema)
+        appliquer_migrations()
+        _schema_a_jour = True
+
+def _preparer_schema(conn):
+    """Travail d'écriture : crée les tables d'une base neuve, puis met le schéma à jour"""
+    nouvelle = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Configuration'"
+    ).fetchone() is None
+    
+    if nouvelle:
+        _creer_tables(conn)
+    
+    # Tables ajoutées après la première version du schéma
+    upgrade_schema(conn)
+    
+    if nouvelle:
+        _initialiser_donnees(conn)
+
+def _creer_tables(conn):
+    """Tables de la première version du schéma"""
     cursor = conn.cursor()
     
     # Créer les tables
@@ -155,6 +193,10 @@ def init_database():
         FOREIGN KEY (ien) REFERENCES Eleves(ien)
     )
     ''')
+
+def _initialiser_donnees(conn):
+    """Données par défaut d'une base neuve"""
+    cursor = conn.cursor()
     
     # Insérer les niveaux par défaut
     niveaux = ["6ème", "5ème", "4ème", "3ème", "Seconde", "Première", "Terminale"]
@@ -165,30 +207,324 @@ def init_database():
     cursor.execute("INSERT INTO Annee_Scolaire (libelle, etat) VALUES (?, ?)", 
                   ("2023-2024", "actif"))
     
-    # Valider les changements
-    conn.commit()
-    conn.close()
+    cursor.execute("UPDATE Version_Donnees SET identifiant = ? WHERE id = 1", (uuid.uuid4().hex,))
+    
+    # Une base neuve n'a aucune donnée à reprendre
+    cursor.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+
+# Tables dont la modification invalide les rapports déjà générés
+TABLES_VERSIONNEES = [
+    "Configuration", "Niveaux", "Classes", "Eleves", "Disciplines",
+    "Notes_S1", "Notes_S2", "Moyennes_Generales_S1", "Moyennes_Generales_S2",
+    "Decisions_Finales", "Inscriptions",
+]
+
+def upgrade_schema(conn):
+    """
+    Crée les tables ajoutées depuis la première version du schéma (bases existantes comprises)
+
+    Travail d'écriture (voir _preparer_schema) : ne valide pas lui-même la transaction.
+    """
+    cursor = conn.cursor()
+    
+    # Règles de décision de fin d'année, évaluées par ordre de priorité croissante
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Regles_Decision (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        priorite INTEGER NOT NULL DEFAULT 100,
+        decision TEXT NOT NULL,
+        niveau TEXT,
+        moyenne_min REAL,
+        moyenne_max REAL,
+        absence_min INTEGER,
+        absence_max INTEGER,
+        retard_min INTEGER,
+        retard_max INTEGER,
+        conseil_discipline INTEGER,
+        etat TEXT DEFAULT 'actif'
+    )
+    ''')
+    
+    # Journal des décisions calculées (audit)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Decisions_Audit (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ien TEXT,
+        annee_scolaire TEXT,
+        ancienne_decision TEXT,
+        nouvelle_decision TEXT,
+        id_regle INTEGER,
+        source TEXT,
+        date_decision TEXT,
+        FOREIGN KEY (ien) REFERENCES Eleves(ien),
+        FOREIGN KEY (id_regle) REFERENCES Regles_Decision(id)
+    )
+    ''')
+    
+    # Classe de chaque élève pour chaque année (Eleves ne garde que la classe de sa première année)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Inscriptions (
+        ien TEXT NOT NULL,
+        annee_scolaire TEXT NOT NULL,
+        id_classe INTEGER NOT NULL,
+        PRIMARY KEY (ien, annee_scolaire),
+        FOREIGN KEY (ien) REFERENCES Eleves(ien),
+        FOREIGN KEY (id_classe) REFERENCES Classes(id)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inscriptions_classe ON Inscriptions (annee_scolaire, id_classe)")
+    
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_decisions_annee ON Decisions_Finales (annee_scolaire, ien)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_decisions_audit_annee ON Decisions_Audit (annee_scolaire, ien)")
+    
+    # Rangs calculés par niveau et pour l'établissement
+    for semestre in (1, 2):
+        _ajouter_colonne(cursor, f"Moyennes_Generales_S{semestre}", "rang_niveau", "INTEGER")
+        # Rang de classe tel que fourni par PLANETE (rang est toujours recalculé, voir rang_utils)
+        _ajouter_colonne(cursor, f"Moyennes_Generales_S{semestre}", "rang_import", "INTEGER")
+        _ajouter_colonne(cursor, f"Moyennes_Generales_S{semestre}", "rang_etablissement", "INTEGER")
+        _ajouter_colonne(cursor, f"Notes_S{semestre}", "rang_d_niveau", "INTEGER")
+        _ajouter_colonne(cursor, f"Notes_S{semestre}", "rang_d_etablissement", "INTEGER")
+        
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_moyennes_s{semestre}_annee ON Moyennes_Generales_S{semestre} (annee_scolaire, ien)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_moyennes_s{semestre}_rang ON Moyennes_Generales_S{semestre} (annee_scolaire, rang_etablissement)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_notes_s{semestre}_annee ON Notes_S{semestre} (annee_scolaire, id_discipline, rang_d)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_notes_s{semestre}_ien ON Notes_S{semestre} (ien)")
+
+        # Pagination par clé des tableaux (tri, id) : voir page_requete
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_moyennes_s{semestre}_tri_rang ON Moyennes_Generales_S{semestre} (annee_scolaire, rang, id)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_moyennes_s{semestre}_tri_moyenne ON Moyennes_Generales_S{semestre} (annee_scolaire, moyenne, id)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_notes_s{semestre}_tri_rang ON Notes_S{semestre} (annee_scolaire, id_discipline, rang_d, id)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_notes_s{semestre}_tri_moyenne ON Notes_S{semestre} (annee_scolaire, id_discipline, moy_d, id)")
+
+    # Version des données : incrémentée par déclencheur à chaque écriture dans une table
+    # utilisée par les rapports (sert de clé d'invalidation au cache des rapports)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Version_Donnees (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO Version_Donnees (id, version) VALUES (1, 0)")
+    # Identifiant propre à chaque base : une base recréée repart à la version 0 sans
+    # pouvoir retrouver les rapports en cache de la précédente (voir cache_utils)
+    _ajouter_colonne(cursor, "Version_Donnees", "identifiant", "TEXT")
+    
+    for table in TABLES_VERSIONNEES:
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_version_{table.lower()}_{operation.lower()}
+                AFTER {operation} ON {table}
+                BEGIN
+                    UPDATE Version_Donnees SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+    
+    # Rapports générés en arrière-plan (file de travaux, voir jobs_utils)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Rapports_Jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type_rapport TEXT NOT NULL,
+        libelle TEXT,
+        parametres TEXT,
+        statut TEXT NOT NULL DEFAULT 'en_attente',
+        progression REAL DEFAULT 0,
+        fichier TEXT,
+        nom_fichier TEXT,
+        mime TEXT,
+        message TEXT,
+        date_creation TEXT,
+        date_debut TEXT,
+        date_fin TEXT
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rapports_jobs_statut ON Rapports_Jobs (statut, id)")
+    
+    # Historique des imports PLANETE et profil de leurs étapes (voir import_utils)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Historique_Imports (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        semestre INTEGER NOT NULL,
+        niveau TEXT,
+        classe TEXT,
+        annee_scolaire TEXT,
+        fichier TEXT,
+        nb_eleves INTEGER,
+        statut TEXT,
+        message TEXT,
+        duree_ms REAL,
+        pic_rss_mo REAL,
+        alloc_pic_mo REAL,
+        etapes TEXT,
+        date_import TEXT
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_historique_imports_semestre ON Historique_Imports (semestre, id)")
+    
+    # Fichier d'archive des années closes, relatif à ARCHIVES_DIR (voir archive_utils)
+    _ajouter_colonne(cursor, "Annee_Scolaire", "fichier_archive", "TEXT")
+    
+    # Trajectoires des élèves d'une année à l'autre, recalculées à partir des données
+    # annuelles (archives comprises) quand la version des données change (voir cohorte_utils)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Trajectoires (
+        ien TEXT NOT NULL,
+        annee_scolaire TEXT NOT NULL,
+        id_classe INTEGER,
+        classe TEXT,
+        id_niveau INTEGER,
+        niveau TEXT,
+        moyenne_s1 REAL,
+        moyenne_s2 REAL,
+        moyenne_annuelle REAL,
+        decision TEXT,
+        annee_suivante TEXT,
+        niveau_suivant TEXT,
+        statut TEXT,
+        PRIMARY KEY (ien, annee_scolaire)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_trajectoires_cohorte ON Trajectoires (annee_scolaire, id_niveau)")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Trajectoires_Disciplines (
+        ien TEXT NOT NULL,
+        annee_scolaire TEXT NOT NULL,
+        id_discipline INTEGER NOT NULL,
+        discipline TEXT,
+        moyenne REAL,
+        PRIMARY KEY (ien, annee_scolaire, id_discipline)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Trajectoires_Etat (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER,
+        date_calcul TEXT
+    )
+    ''')
+    
+    # Règles par défaut (uniquement si la table est vide)
+    cursor.execute("SELECT COUNT(*) FROM Regles_Decision")
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany('''
+            INSERT INTO Regles_Decision (priorite, decision, niveau, moyenne_min, moyenne_max, conseil_discipline)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (10, "Exclusion", None, None, 8, 1),
+            (20, "Orientation", "3ème", 10, None, None),
+            (30, "Passage", None, 10, None, None),
+            (40, "Redoublement", None, 8, 10, None),
+            (50, "Exclusion", None, None, 8, None),
+        ])
+
+def _reprendre_inscriptions(conn):
+    """Inscriptions des bases antérieures : chaque année où un élève a des résultats, avec la seule classe connue"""
+    for table in ("Moyennes_Generales_S1", "Moyennes_Generales_S2"):
+        conn.execute(f'''
+            INSERT OR IGNORE INTO Inscriptions (ien, annee_scolaire, id_classe)
+            SELECT DISTINCT mg.ien, mg.annee_scolaire, e.id_classe
+            FROM {table} mg
+            JOIN Eleves e ON mg.ien = e.ien
+            WHERE mg.annee_scolaire IS NOT NULL AND e.id_classe IS NOT NULL
+        ''')
+
+def _identifier_base(conn):
+    """Identifiant des bases créées avant son introduction"""
+    conn.execute("UPDATE Version_Donnees SET identifiant = ? WHERE id = 1 AND identifiant IS NULL", (uuid.uuid4().hex,))
+
+# Reprises de données à exécuter une seule fois par base : la n-ième porte PRAGMA user_version à n
+MIGRATIONS = [
+    _reprendre_inscriptions,
+    _identifier_base,
+]
+
+def _migrer(conn, numero):
+    """Travail d'écriture : applique une reprise de données et enregistre le nouveau numéro de version"""
+    # Une autre session a pu l'appliquer entre la lecture du numéro et l'exécution du travail
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= numero:
+        return
+    MIGRATIONS[numero - 1](conn)
+    conn.execute(f"PRAGMA user_version = {numero}")
+
+def appliquer_migrations():
+    """Applique par le thread d'écriture les reprises de données pas encore exécutées sur la base"""
+    conn = connecter()
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+    for numero in range(version + 1, len(MIGRATIONS) + 1):
+        ecrire(_migrer, numero)
+
+def activer_wal(conn):
+    """
+    Passe la base en journal WAL (réglage conservé dans le fichier)
+
+    Les lectures des sessions ne sont plus bloquées pendant qu'une transaction
+    du thread d'écriture est en cours.
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+def _ajouter_colonne(cursor, table, colonne, type_colonne):
+    """Ajoute une colonne à une table si elle n'existe pas encore"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if colonne not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {colonne} {type_colonne}")
+
+def connecter():
+    """
+    Ouvre une connexion brute à la base (tracée si le traçage des requêtes est actif)
+
+    Réservée aux lectures : les écritures passent par le thread d'écriture (voir ecriture_utils).
+    """
+    return sqlite3.connect(DB_PATH, factory=fabrique_connexion(), timeout=DELAI_VERROU_SQLITE)
 
 def get_db_connection():
     """Établit et retourne une connexion à la base de données"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connecter()
     conn.row_factory = sqlite3.Row  # Pour accéder aux colonnes par nom
     return conn
 
+def get_version_donnees(conn=None):
+    """Retourne la version courante des données (0 si la base n'est pas encore initialisée)"""
+    fermer = conn is None
+    if fermer:
+        conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT version FROM Version_Donnees WHERE id = 1").fetchone()
+        return row[0] if row else 0
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        if fermer:
+            conn.close()
+
+def get_identifiant_base(conn=None):
+    """Retourne l'identifiant de la base, tiré au hasard à sa création (None si absent)"""
+    fermer = conn is None
+    if fermer:
+        conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT identifiant FROM Version_Donnees WHERE id = 1").fetchone()
+        return row[0] if row else None
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        if fermer:
+            conn.close()
+
 def execute_query(query, params=(), fetchall=False):
-    """Exécute une requête SQL et retourne le résultat"""
+    """Exécute une requête SQL et retourne le résultat (les écritures passent par le thread d'écriture)"""
+    if not fetchall:
+        ecrire(lambda conn: conn.execute(query, params))
+        return None
+
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    
-    result = None
-    if fetchall:
-        result = cursor.fetchall()
-    else:
-        conn.commit()
-    
-    conn.close()
-    return result
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
 
 def insert_data(table, data_dict):
     """Insère des données dans une table spécifiée"""
@@ -198,14 +534,7 @@ def insert_data(table, data_dict):
     
     query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, values)
-    last_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    
-    return last_id
+    return ecrire(lambda conn: conn.execute(query, values).lastrowid)
 
 def update_data(table, data_dict, condition):
     """Met à jour des données dans une table spécifiée selon une condition"""
@@ -214,11 +543,49 @@ def update_data(table, data_dict, condition):
     
     query = f"UPDATE {table} SET {set_clause} WHERE {condition}"
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, values)
-    rows_affected = cursor.rowcount
-    conn.commit()
-    conn.close()
-    
-    return rows_affected
\ No newline at end of file
+    return ecrire(lambda conn: conn.execute(query, values).rowcount)
+
+def sauvegarder_base(destination):
+    """
+    Copie la base dans un fichier par l'API de sauvegarde de SQLite
+
+    Contrairement à une copie du fichier, les transactions encore présentes
+    dans le journal WAL sont incluses.
+    """
+    source = connecter()
+    copie = sqlite3.connect(destination)
+    try:
+        source.backup(copie)
+    finally:
+        copie.close()
+        source.close()
+
+def _schema_perime():
+    global _schema_a_jour
+    with _verrou_schema:
+        _schema_a_jour = False
+
+def _fichiers_base():
+    return [DB_PATH, f"{DB_PATH}-wal", f"{DB_PATH}-shm"]
+
+def restaurer_base(sauvegarde):
+    """Remplace le contenu de la base par celui d'une sauvegarde, après les écritures déjà en file"""
+    def restaurer(conn):
+        source = sqlite3.connect(sauvegarde)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+    ecrire_exclusif(restaurer)
+    # La sauvegarde peut dater d'un schéma antérieur : il sera remis à jour au prochain affichage
+    _schema_perime()
+
+def supprimer_base():
+    """Supprime la base et ses fichiers de journal, après les écritures déjà en file"""
+    def supprimer(conn):
+        conn.close()
+        for chemin in _fichiers_base():
+            if os.path.exists(chemin):
+                os.remove(chemin)
+    ecrire_exclusif(supprimer)
+    _schema_perime()
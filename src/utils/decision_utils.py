@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from .db_utils import get_db_connection
+from .ecriture_utils import ecrire
+
+# Décision attribuée lorsqu'aucune règle ne s'applique à un élève
+DECISION_PAR_DEFAUT = "Cas à examiner"
+
+# Valeurs de la colonne C.D. considérées comme "pas de conseil de discipline"
+VALEURS_SANS_CONSEIL = {"", "0", "non", "nan", "none", "-"}
+
+def charger_regles(conn):
+    """
+    Charge les règles de décision actives, triées par priorité
+
+    Args:
+        conn: Connexion à la base de données
+
+    Returns:
+        DataFrame des règles (la première règle satisfaite l'emporte)
+    """
+    return pd.read_sql_query("""
+        SELECT id, priorite, decision, niveau, moyenne_min, moyenne_max,
+               absence_min, absence_max, retard_min, retard_max, conseil_discipline
+        FROM Regles_Decision
+        WHERE etat = 'actif'
+        ORDER BY priorite, id
+    """, conn)
+
+def charger_donnees_annuelles(conn, annee_scolaire):
+    """
+    Récupère en une seule requête les données des deux semestres pour tous les élèves d'une année
+
+    Seule la dernière ligne importée par élève et par semestre est retenue.
+
+    Args:
+        conn: Connexion à la base de données
+        annee_scolaire: Libellé de l'année scolaire
+
+    Returns:
+        DataFrame avec une ligne par élève (moyennes S1/S2, retards, absences, conseil de discipline)
+    """
+    query = """
+        WITH s1 AS (
+            SELECT ien, moyenne, retard, absence, conseil_discipline
+            FROM Moyennes_Generales_S1
+            WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S1 WHERE annee_scolaire = ? GROUP BY ien)
+        ),
+        s2 AS (
+            SELECT ien, moyenne, retard, absence, conseil_discipline
+            FROM Moyennes_Generales_S2
+            WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S2 WHERE annee_scolaire = ? GROUP BY ien)
+        )
+        SELECT e.ien, e.prenom, e.nom, i.id_classe, c.libelle as classe, n.libelle as niveau,
+               s1.moyenne as moyenne_s1, s2.moyenne as moyenne_s2,
+               COALESCE(s1.retard, 0) + COALESCE(s2.retard, 0) as retard,
+               COALESCE(s1.absence, 0) + COALESCE(s2.absence, 0) as absence,
+               s1.conseil_discipline as cd_s1, s2.conseil_discipline as cd_s2
+        FROM Eleves e
+        LEFT JOIN s1 ON s1.ien = e.ien
+        LEFT JOIN s2 ON s2.ien = e.ien
+        LEFT JOIN Inscriptions i ON i.ien = e.ien AND i.annee_scolaire = ?
+        LEFT JOIN Classes c ON i.id_classe = c.id
+        LEFT JOIN Niveaux n ON c.id_niveau = n.id
+        WHERE s1.ien IS NOT NULL OR s2.ien IS NOT NULL
+    """
+
+    df = pd.read_sql_query(query, conn, params=(annee_scolaire, annee_scolaire, annee_scolaire))
+
+    # Moyenne annuelle: moyenne des semestres disponibles
+    df['moyenne_annuelle'] = df[['moyenne_s1', 'moyenne_s2']].mean(axis=1).round(2)
+
+    # Un conseil de discipline sur l'un des deux semestres suffit
+    df['conseil_discipline'] = _conseil_renseigne(df['cd_s1']) | _conseil_renseigne(df['cd_s2'])
+
+    # Rang annuel dans la classe (ex aequo au même rang)
+    df['rang_annuel'] = df.groupby('id_classe')['moyenne_annuelle'].rank(method='min', ascending=False)
+
+    return df.drop(columns=['cd_s1', 'cd_s2'])
+
+def _conseil_renseigne(serie):
+    """Indique, pour chaque élève, si la colonne C.D. mentionne un conseil de discipline"""
+    valeurs = serie.fillna('').astype(str).str.strip().str.lower()
+    return ~valeurs.isin(VALEURS_SANS_CONSEIL)
+
+def evaluer_regles(df, regles):
+    """
+    Évalue les règles sur tous les élèves à la fois (masques vectorisés)
+
+    Les bornes minimales sont incluses et les bornes maximales exclues.
+    Une condition vide (NULL) est ignorée.
+
+    Args:
+        df: DataFrame issu de charger_donnees_annuelles
+        regles: DataFrame issu de charger_regles
+
+    Returns:
+        tuple (decisions, id_regles): tableaux NumPy alignés sur df
+    """
+    moyenne = df['moyenne_annuelle'].to_numpy(dtype=float)
+    absence = df['absence'].to_numpy(dtype=float)
+    retard = df['retard'].to_numpy(dtype=float)
+    conseil = df['conseil_discipline'].to_numpy(dtype=bool)
+    niveau = df['niveau'].fillna('').to_numpy(dtype=object)
+
+    conditions = []
+    decisions = []
+    id_regles = []
+
+    for regle in regles.itertuples(index=False):
+        masque = np.ones(len(df), dtype=bool)
+
+        if pd.notna(regle.niveau) and str(regle.niveau).strip():
+            masque &= niveau == str(regle.niveau).strip()
+        if pd.notna(regle.moyenne_min):
+            masque &= moyenne >= regle.moyenne_min
+        if pd.notna(regle.moyenne_max):
+            masque &= moyenne < regle.moyenne_max
+        if pd.notna(regle.absence_min):
+            masque &= absence >= regle.absence_min
+        if pd.notna(regle.absence_max):
+            masque &= absence < regle.absence_max
+        if pd.notna(regle.retard_min):
+            masque &= retard >= regle.retard_min
+        if pd.notna(regle.retard_max):
+            masque &= retard < regle.retard_max
+        if pd.notna(regle.conseil_discipline):
+            masque &= conseil == bool(regle.conseil_discipline)
+
+        conditions.append(masque)
+        decisions.append(regle.decision)
+        id_regles.append(regle.id)
+
+    if not conditions:
+        return np.full(len(df), DECISION_PAR_DEFAUT, dtype=object), np.zeros(len(df), dtype=int)
+
+    # np.select retient la première condition vraie, donc la règle la plus prioritaire
+    return (
+        np.select(conditions, decisions, default=DECISION_PAR_DEFAUT),
+        np.select(conditions, id_regles, default=0),
+    )
+
+def _enregistrer_decisions(conn, df, annee_scolaire, source):
+    """Travail d'écriture : remplace les décisions de l'année et journalise les changements"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT ien, decision FROM Decisions_Finales WHERE annee_scolaire = ?", (annee_scolaire,))
+    anciennes = {row['ien']: row['decision'] for row in cursor.fetchall()}
+
+    cursor.execute("DELETE FROM Decisions_Finales WHERE annee_scolaire = ?", (annee_scolaire,))
+    cursor.executemany("""
+        INSERT INTO Decisions_Finales (ien, decision, moyenne_annuelle, rang_annuel, annee_scolaire)
+        VALUES (?, ?, ?, ?, ?)
+    """, [
+        (
+            row.ien,
+            row.decision,
+            None if pd.isna(row.moyenne_annuelle) else float(row.moyenne_annuelle),
+            None if pd.isna(row.rang_annuel) else int(row.rang_annuel),
+            annee_scolaire
+        )
+        for row in df.itertuples(index=False)
+    ])
+
+    # Journaliser uniquement les décisions nouvelles ou modifiées
+    horodatage = datetime.now().isoformat(timespec="seconds")
+    cursor.executemany("""
+        INSERT INTO Decisions_Audit (ien, annee_scolaire, ancienne_decision, nouvelle_decision,
+                                     id_regle, source, date_decision)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (row.ien, annee_scolaire, anciennes.get(row.ien), row.decision,
+         int(row.id_regle) or None, source, horodatage)
+        for row in df.itertuples(index=False)
+        if anciennes.get(row.ien) != row.decision
+    ])
+
+def appliquer_decisions(annee_scolaire, source="regles"):
+    """
+    Calcule et enregistre les décisions finales de tous les élèves d'une année
+
+    Les décisions existantes de l'année sont remplacées et chaque changement
+    est tracé dans Decisions_Audit. Le calcul se fait sur une connexion de lecture ;
+    seul l'enregistrement passe par le thread d'écriture.
+
+    Args:
+        annee_scolaire: Libellé de l'année scolaire
+        source: Origine de la décision enregistrée dans le journal
+
+    Returns:
+        DataFrame des élèves avec leur décision calculée
+    """
+    conn = get_db_connection()
+    try:
+        df = charger_donnees_annuelles(conn, annee_scolaire)
+        if df.empty:
+            return df
+
+        regles = charger_regles(conn)
+        decisions, id_regles = evaluer_regles(df, regles)
+        df['decision'] = decisions
+        df['id_regle'] = id_regles
+    finally:
+        conn.close()
+
+    try:
+        ecrire(_enregistrer_decisions, df, annee_scolaire, source)
+    except Exception as e:
+        raise Exception(f"Erreur lors du calcul des décisions finales : {str(e)}")
+    return df
@@ -0,0 +1,205 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from ..config import DB_PATH, ECRITURE_FILE_TAILLE, ECRITURE_LOT_MAX, ECRITURE_DELAI_FILE, DELAI_VERROU_SQLITE
+from .trace_utils import fabrique_connexion
+from .metriques_utils import compteur, jauge, histogramme, ajouter_collecteur
+
+# Métriques de la file d'écriture
+ECRITURES = compteur("lcams_ecritures", "Travaux d'écriture exécutés par le thread d'écriture", ("statut",))
+ECRITURES_LOTS = histogramme(
+    "lcams_ecriture_lot_travaux", "Travaux validés par transaction", bornes=(1, 2, 4, 8, 16, 32, 64)
+)
+ECRITURES_FILE = jauge("lcams_ecriture_file_attente", "Travaux d'écriture en attente")
+
+class FileEcritureSaturee(RuntimeError):
+    """Aucune place ne s'est libérée dans la file d'écriture dans le délai imparti"""
+
+class _Travail:
+    __slots__ = ('fonction', 'args', 'kwargs', 'future', 'transaction')
+
+    def __init__(self, fonction, args, kwargs, transaction):
+        self.fonction = fonction
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.transaction = transaction
+
+    def executer(self, conn):
+        return self.fonction(conn, *self.args, **self.kwargs)
+
+def _ouvrir():
+    """Connexion du thread d'écriture : transactions pilotées explicitement (BEGIN / SAVEPOINT / COMMIT)"""
+    conn = sqlite3.connect(DB_PATH, factory=fabrique_connexion(), timeout=DELAI_VERROU_SQLITE,
+                           isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+class Ecrivain:
+    """
+    Thread unique d'écriture dans la base, alimenté par une file bornée
+
+    Un travail est une fonction recevant la connexion d'écriture en premier argument.
+    Les travaux en attente sont exécutés à la suite dans une même transaction, chacun
+    dans son propre SAVEPOINT : l'échec d'un travail annule ses seules écritures et
+    son exception est transmise à son appelant, les autres sont validés ensemble.
+    Un travail ne doit donc jamais appeler commit() ni rollback() lui-même.
+    """
+
+    def __init__(self, taille_file=ECRITURE_FILE_TAILLE, lot_max=ECRITURE_LOT_MAX):
+        self._file = queue.Queue(maxsize=taille_file)
+        self._lot_max = lot_max
+        self._reporte = None
+        self._verrou = threading.Lock()
+        self._thread = None
+        self._conn = None
+
+    def _demarrer(self):
+        with self._verrou:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._boucle, name="ecriture-sqlite", daemon=True)
+                self._thread.start()
+
+    def _dans_le_thread(self):
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def soumettre(self, fonction, *args, transaction=True, **kwargs):
+        """
+        Place un travail dans la file et retourne son Future
+
+        Appelé depuis un travail en cours, il est exécuté immédiatement dans la transaction
+        de celui-ci (attendre son résultat depuis le thread d'écriture le bloquerait).
+
+        Args:
+            fonction: Fonction (conn, *args, **kwargs) effectuant les écritures
+            transaction: False pour un travail exécuté seul hors transaction
+                (restauration d'une sauvegarde, suppression de la base...)
+
+        Raises:
+            FileEcritureSaturee: si la file est restée pleine pendant ECRITURE_DELAI_FILE secondes
+        """
+        travail = _Travail(fonction, args, kwargs, transaction)
+        if self._dans_le_thread() and self._conn is not None:
+            travail.future.set_running_or_notify_cancel()
+            try:
+                travail.future.set_result(travail.executer(self._conn))
+            except Exception as e:
+                travail.future.set_exception(e)
+            return travail.future
+
+        self._demarrer()
+        try:
+            self._file.put(travail, timeout=ECRITURE_DELAI_FILE)
+        except queue.Full:
+            raise FileEcritureSaturee(
+                f"La file d'écriture est pleine depuis {ECRITURE_DELAI_FILE} s ; réessayez dans un instant."
+            )
+        return travail.future
+
+    def en_attente(self):
+        return self._file.qsize()
+
+    def _lot_suivant(self):
+        """Premier travail en attente et ceux qui peuvent partager sa transaction"""
+        premier, self._reporte = self._reporte, None
+        if premier is None:
+            premier = self._file.get()
+        lot = [premier]
+        while premier.transaction and len(lot) < self._lot_max:
+            try:
+                suivant = self._file.get_nowait()
+            except queue.Empty:
+                break
+            if not suivant.transaction:
+                self._reporte = suivant
+                break
+            lot.append(suivant)
+        return lot
+
+    def _boucle(self):
+        while True:
+            lot = [travail for travail in self._lot_suivant() if travail.future.set_running_or_notify_cancel()]
+            if not lot:
+                continue
+            try:
+                if lot[0].transaction:
+                    self._executer_lot(lot)
+                else:
+                    self._executer_seul(lot[0])
+            except Exception as e:  # le thread d'écriture ne doit jamais s'arrêter
+                for travail in lot:
+                    if not travail.future.done():
+                        travail.future.set_exception(e)
+
+    def _executer_seul(self, travail):
+        conn = _ouvrir()
+        self._conn = conn
+        try:
+            travail.future.set_result(travail.executer(conn))
+            ECRITURES.incrementer(statut="termine")
+        except Exception as e:
+            ECRITURES.incrementer(statut="echec")
+            travail.future.set_exception(e)
+        finally:
+            self._conn = None
+            conn.close()
+
+    def _executer_lot(self, lot):
+        conn = _ouvrir()
+        self._conn = conn
+        resultats = []
+        try:
+            # Verrou d'écriture pris d'emblée : pas d'échec « database is locked » en cours de lot
+            conn.execute("BEGIN IMMEDIATE")
+            for travail in lot:
+                conn.execute("SAVEPOINT travail")
+                try:
+                    resultat = travail.executer(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO travail")
+                    conn.execute("RELEASE travail")
+                    resultats.append((travail, None, e))
+                else:
+                    conn.execute("RELEASE travail")
+                    resultats.append((travail, resultat, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Transaction impossible à ouvrir ou à valider : aucun travail du lot n'est enregistré
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            ECRITURES.incrementer(len(lot), statut="echec")
+            for travail in lot:
+                travail.future.set_exception(e)
+            return
+        finally:
+            self._conn = None
+            conn.close()
+
+        ECRITURES_LOTS.observer(len(lot))
+        for travail, resultat, erreur in resultats:
+            if erreur is None:
+                ECRITURES.incrementer(statut="termine")
+                travail.future.set_result(resultat)
+            else:
+                ECRITURES.incrementer(statut="echec")
+                travail.future.set_exception(erreur)
+
+# Écrivain partagé par toutes les sessions du serveur (thread démarré au premier travail)
+_ecrivain = Ecrivain()
+
+@ajouter_collecteur
+def _collecter_file():
+    ECRITURES_FILE.definir(_ecrivain.en_attente())
+
+def soumettre(fonction, *args, **kwargs):
+    """Confie un travail d'écriture (conn, *args, **kwargs) au thread d'écriture et retourne son Future"""
+    return _ecrivain.soumettre(fonction, *args, **kwargs)
+
+def ecrire(fonction, *args, **kwargs):
+    """Exécute un travail d'écriture et retourne son résultat (son exception est relevée dans l'appelant)"""
+    return _ecrivain.soumettre(fonction, *args, **kwargs).result()
+
+def ecrire_exclusif(fonction, *args, **kwargs):
+    """Exécute un travail seul et hors transaction, après les écritures déjà en file"""
+    return _ecrivain.soumettre(fonction, *args, transaction=False, **kwargs).result()
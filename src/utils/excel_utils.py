@@ -1,8 +1,11 @@
 import pandas as pd
-from io import BytesIO
 import os
-import sqlite3
-from ..config import FICHIER_CENTRAL, DB_PATH
+import time
+from ..config import FICHIER_CENTRAL
+from .ecriture_utils import ecrire
+from .rang_utils import calculer_rangs
+from .export_utils import exporter, ecrire_xlsx
+from .metriques_utils import observer_import
 
 def charger_et_nettoyer(fichier_excel):
     """
@@ -54,7 +57,7 @@ def charger_et_nettoyer(fichier_excel):
     except Exception as e:
         raise Exception(f"Erreur lors du chargement du fichier Excel: {str(e)}")
 
-def sauvegarder_dans_fichier_central(df_moyennes, df_detail, niveau, classe, semestre):
+def sauvegarder_dans_fichier_central(df_moyennes, df_detail, niveau, classe, semestre, profil=None):
     """
     Sauvegarde les données dans le fichier Excel central et dans la base SQLite
     
@@ -64,8 +67,12 @@ def sauvegarder_dans_fichier_central(df_moyennes, df_detail, niveau, classe, sem
         niveau: Niveau scolaire
         classe: Classe
         semestre: Semestre (1 ou 2)
+        profil: ProfilImport recevant la mesure de chaque étape (facultatif)
     """
+    marquer = profil.marquer if profil is not None else (lambda etape, lignes=0: None)
+    nb_eleves, debut = len(df_moyennes), time.perf_counter()
     try:
+        marquer("preparation", len(df_moyennes) + len(df_detail))
         df_moyennes = df_moyennes.copy()
         df_detail = df_detail.copy()
         
@@ -109,6 +116,11 @@ def sauvegarder_dans_fichier_central(df_moyennes, df_detail, niveau, classe, sem
         df_moyennes = df_moyennes[moyennes_cols]
         df_detail = df_detail[detail_cols]
         
+        # Élèves du fichier importé : seuls à être inscrits dans cette classe (le fichier central
+        # fusionné ci-dessous contient aussi les élèves des autres classes)
+        iens_importes = set(df_moyennes['IEN'].dropna()) if 'IEN' in df_moyennes.columns else set()
+        
+        marquer("fusion_central")
         # Vérifier si le fichier central existe
         if os.path.exists(FICHIER_CENTRAL):
             try:
@@ -138,174 +150,202 @@ def sauvegarder_dans_fichier_central(df_moyennes, df_detail, niveau, classe, sem
             # Concaténer avec les nouvelles données
             df_moyennes = pd.concat([df_moy_central, df_moyennes], ignore_index=True)
             df_detail = pd.concat([df_detail_central, df_detail], ignore_index=True)
+        if profil is not None:
+            profil.definir_lignes(len(df_moyennes) + len(df_detail))
         
         # Créer le dossier data s'il n'existe pas
         os.makedirs(os.path.dirname(FICHIER_CENTRAL), exist_ok=True)
         
         # Écriture dans le fichier Excel central
-        with pd.ExcelWriter(FICHIER_CENTRAL, engine='xlsxwriter') as writer:
-            df_moyennes.to_excel(writer, sheet_name="Moyennes eleves", index=False)
-            df_detail.to_excel(writer, sheet_name="Données détaillées", index=False)
+        marquer("ecriture_central", len(df_moyennes) + len(df_detail))
+        ecrire_fichier_central(df_moyennes, df_detail)
         
         # Sauvegarde dans la base SQLite
-        conn = sqlite3.connect(DB_PATH)
+        marquer("insertion_sqlite", len(df_moyennes) + len(df_detail))
         try:
-            # Déterminer quelle table doit être mise à jour selon le semestre
-            table_moyennes = f"Moyennes_Generales_S{semestre}"
-            table_notes = f"Notes_S{semestre}"
-            
-            # Récupérer l'année scolaire active
-            cursor = conn.cursor()
-            cursor.execute("SELECT libelle FROM Annee_Scolaire WHERE etat = 'actif' LIMIT 1")
-            result = cursor.fetchone()
-            annee_scolaire = result[0] if result else "Inconnue"
+            ecrire(_enregistrer_import, df_moyennes, df_detail, iens_importes, niveau, classe, semestre, marquer)
+        except Exception as e:
+            raise Exception(f"Erreur lors de la sauvegarde dans la base SQLite : {str(e)}")
             
-            # Récupérer l'ID de la classe
+    except Exception as e:
+        observer_import(semestre, "echec", nb_eleves, time.perf_counter() - debut)
+        raise Exception(f"Erreur lors du traitement : {str(e)}")
+    observer_import(semestre, "termine", nb_eleves, time.perf_counter() - debut)
+
+def _enregistrer_import(conn, df_moyennes, df_detail, iens_importes, niveau, classe, semestre, marquer):
+    """Travail d'écriture d'un import : élèves, moyennes, notes puis rangs du semestre (voir ecriture_utils)"""
+    # Déterminer quelle table doit être mise à jour selon le semestre
+    table_moyennes = f"Moyennes_Generales_S{semestre}"
+    table_notes = f"Notes_S{semestre}"
+
+    # Récupérer l'année scolaire active
+    cursor = conn.cursor()
+    cursor.execute("SELECT libelle FROM Annee_Scolaire WHERE etat = 'actif' LIMIT 1")
+    result = cursor.fetchone()
+    annee_scolaire = result[0] if result else "Inconnue"
+
+    # Récupérer l'ID de la classe
+    cursor.execute("""
+        SELECT c.id FROM Classes c
+        JOIN Niveaux n ON c.id_niveau = n.id
+        WHERE n.libelle = ? AND c.libelle = ?
+    """, (niveau, classe))
+
+    classe_id_result = cursor.fetchone()
+    if not classe_id_result:
+        # Créer la classe si elle n'existe pas
+        cursor.execute("SELECT id FROM Niveaux WHERE libelle = ?", (niveau,))
+        result = cursor.fetchone()
+        niveau_id = result[0] if result else None
+
+        if niveau_id:
             cursor.execute("""
-                SELECT c.id FROM Classes c
-                JOIN Niveaux n ON c.id_niveau = n.id
-                WHERE n.libelle = ? AND c.libelle = ?
-            """, (niveau, classe))
-            
-            classe_id_result = cursor.fetchone()
-            if not classe_id_result:
-                # Créer la classe si elle n'existe pas
-                cursor.execute("SELECT id FROM Niveaux WHERE libelle = ?", (niveau,))
+                INSERT INTO Classes (id_niveau, libelle, effectif) 
+                VALUES (?, ?, ?)
+            """, (niveau_id, classe, len(df_moyennes)))
+
+            classe_id = cursor.lastrowid
+        else:
+            raise Exception(f"Niveau '{niveau}' non trouvé dans la base de données")
+    else:
+        classe_id = classe_id_result[0]
+
+    # Pour chaque élève, insérer dans la table Eleves s'il n'existe pas déjà
+    for _, eleve in df_moyennes.iterrows():
+        ien = eleve.get('IEN')
+        if not ien:
+            continue  # Ignorer les lignes sans IEN
+        # Sécuriser les champs obligatoires
+        prenom = eleve.get('prenom', eleve.get('Prenom', ''))
+        nom = eleve.get('nom', eleve.get('Nom', ''))
+        if not prenom or pd.isna(prenom) or str(prenom).strip() == '':
+            prenom = "Non défini"
+        if not nom or pd.isna(nom) or str(nom).strip() == '':
+            nom = "Non défini"
+        cursor.execute("SELECT COUNT(*) FROM Eleves WHERE ien = ?", (ien,))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                INSERT INTO Eleves (ien, prenom, nom, sexe, date_naissance, lieu_naissance, id_classe, annee_scolaire)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                ien,
+                prenom,
+                nom,
+                eleve.get('sexe', eleve.get('Sexe', '')),
+                eleve.get('date_naissance', eleve.get('Date naissance', '')),
+                eleve.get('lieu_naissance', eleve.get('Lieu naissance', '')),
+                classe_id,
+                annee_scolaire
+            ))
+
+        # Classe de l'élève pour l'année en cours (un nouvel import de l'année la corrige) ;
+        # les lignes reprises du fichier central gardent l'inscription de leur propre import
+        if ien in iens_importes:
+            cursor.execute("""
+                INSERT INTO Inscriptions (ien, annee_scolaire, id_classe) VALUES (?, ?, ?)
+                ON CONFLICT (ien, annee_scolaire) DO UPDATE SET id_classe = excluded.id_classe
+            """, (ien, annee_scolaire, classe_id))
+
+        # Insérer les moyennes générales
+        try:
+            # Convertir les valeurs numériques de manière sécurisée
+            moyenne = 0
+            if 'moyenne' in eleve:
+                moyenne = float(eleve['moyenne']) if isinstance(eleve['moyenne'], (int, float, str)) and str(eleve['moyenne']).replace('.', '', 1).isdigit() else 0
+            elif 'Moy' in eleve:
+                moyenne = float(eleve['Moy']) if isinstance(eleve['Moy'], (int, float, str)) and str(eleve['Moy']).replace('.', '', 1).isdigit() else 0
+
+            rang = 0
+            if 'rang' in eleve:
+                rang = int(float(eleve['rang'])) if isinstance(eleve['rang'], (int, float, str)) and str(eleve['rang']).replace('.', '', 1).isdigit() else 0
+            elif 'Rang' in eleve:
+                rang = int(float(eleve['Rang'])) if isinstance(eleve['Rang'], (int, float, str)) and str(eleve['Rang']).replace('.', '', 1).isdigit() else 0
+
+            retard = 0
+            if 'retard' in eleve:
+                retard = int(float(eleve['retard'])) if isinstance(eleve['retard'], (int, float, str)) and str(eleve['retard']).replace('.', '', 1).isdigit() else 0
+            elif 'Retard' in eleve:
+                retard = int(float(eleve['Retard'])) if isinstance(eleve['Retard'], (int, float, str)) and str(eleve['Retard']).replace('.', '', 1).isdigit() else 0
+
+            absence = 0
+            if 'absence' in eleve:
+                absence = int(float(eleve['absence'])) if isinstance(eleve['absence'], (int, float, str)) and str(eleve['absence']).replace('.', '', 1).isdigit() else 0
+            elif 'Absence' in eleve:
+                absence = int(float(eleve['Absence'])) if isinstance(eleve['Absence'], (int, float, str)) and str(eleve['Absence']).replace('.', '', 1).isdigit() else 0
+
+            conseil_discipline = eleve.get('conseil_discipline', eleve.get('C.D.', ''))
+            appreciation = eleve.get('appreciation', eleve.get('Appréciation', ''))
+            observation = eleve.get('observation_conseil', eleve.get('Observation conseil', ''))
+
+            cursor.execute(f"""
+                INSERT INTO {table_moyennes} (ien, moyenne, rang, rang_import, retard, absence, conseil_discipline, 
+                                            appreciation, observation, annee_scolaire)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                ien,
+                moyenne,
+                rang,
+                rang or None,
+                retard,
+                absence,
+                conseil_discipline,
+                appreciation,
+                observation,
+                annee_scolaire
+            ))
+        except Exception as e:
+            print(f"Erreur lors de l'insertion des moyennes pour l'élève {ien}: {str(e)}")
+
+    # Pour chaque élève dans le détail, insérer les notes par discipline
+    for _, eleve in df_detail.iterrows():
+        # Récupérer l'IEN
+        ien = eleve.get('IEN')
+        if not ien:
+            continue  # Ignorer les lignes sans IEN
+
+        # Pour chaque matière, récupérer ou créer la discipline
+        for col in df_detail.columns:
+            if col not in ['IEN', 'Prénom', 'Nom', 'prenom', 'nom', 'sexe', 'Sexe', 'niveau', 'classe', 'semestre']:
+                cursor.execute("SELECT id FROM Disciplines WHERE libelle = ?", (col,))
                 result = cursor.fetchone()
-                niveau_id = result[0] if result else None
-                
-                if niveau_id:
-                    cursor.execute("""
-                        INSERT INTO Classes (id_niveau, libelle, effectif) 
-                        VALUES (?, ?, ?)
-                    """, (niveau_id, classe, len(df_moyennes)))
-                    
-                    classe_id = cursor.lastrowid
+
+                if result:
+                    discipline_id = result[0]
                 else:
-                    raise Exception(f"Niveau '{niveau}' non trouvé dans la base de données")
-            else:
-                classe_id = classe_id_result[0]
-            
-            # Pour chaque élève, insérer dans la table Eleves s'il n'existe pas déjà
-            for _, eleve in df_moyennes.iterrows():
-                ien = eleve.get('IEN')
-                if not ien:
-                    continue  # Ignorer les lignes sans IEN
-                # Sécuriser les champs obligatoires
-                prenom = eleve.get('prenom', eleve.get('Prenom', ''))
-                nom = eleve.get('nom', eleve.get('Nom', ''))
-                if not prenom or pd.isna(prenom) or str(prenom).strip() == '':
-                    prenom = "Non défini"
-                if not nom or pd.isna(nom) or str(nom).strip() == '':
-                    nom = "Non défini"
-                cursor.execute("SELECT COUNT(*) FROM Eleves WHERE ien = ?", (ien,))
-                if cursor.fetchone()[0] == 0:
-                    cursor.execute("""
-                        INSERT INTO Eleves (ien, prenom, nom, sexe, date_naissance, lieu_naissance, id_classe, annee_scolaire)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        ien,
-                        prenom,
-                        nom,
-                        eleve.get('sexe', eleve.get('Sexe', '')),
-                        eleve.get('date_naissance', eleve.get('Date naissance', '')),
-                        eleve.get('lieu_naissance', eleve.get('Lieu naissance', '')),
-                        classe_id,
-                        annee_scolaire
-                    ))
-                
-                # Insérer les moyennes générales
+                    cursor.execute("INSERT INTO Disciplines (libelle) VALUES (?)", (col,))
+                    discipline_id = cursor.lastrowid
+
+                # Insérer la note si elle existe et est un nombre
                 try:
-                    # Convertir les valeurs numériques de manière sécurisée
-                    moyenne = 0
-                    if 'moyenne' in eleve:
-                        moyenne = float(eleve['moyenne']) if isinstance(eleve['moyenne'], (int, float, str)) and str(eleve['moyenne']).replace('.', '', 1).isdigit() else 0
-                    elif 'Moy' in eleve:
-                        moyenne = float(eleve['Moy']) if isinstance(eleve['Moy'], (int, float, str)) and str(eleve['Moy']).replace('.', '', 1).isdigit() else 0
-                    
-                    rang = 0
-                    if 'rang' in eleve:
-                        rang = int(float(eleve['rang'])) if isinstance(eleve['rang'], (int, float, str)) and str(eleve['rang']).replace('.', '', 1).isdigit() else 0
-                    elif 'Rang' in eleve:
-                        rang = int(float(eleve['Rang'])) if isinstance(eleve['Rang'], (int, float, str)) and str(eleve['Rang']).replace('.', '', 1).isdigit() else 0
-                    
-                    retard = 0
-                    if 'retard' in eleve:
-                        retard = int(float(eleve['retard'])) if isinstance(eleve['retard'], (int, float, str)) and str(eleve['retard']).replace('.', '', 1).isdigit() else 0
-                    elif 'Retard' in eleve:
-                        retard = int(float(eleve['Retard'])) if isinstance(eleve['Retard'], (int, float, str)) and str(eleve['Retard']).replace('.', '', 1).isdigit() else 0
-                    
-                    absence = 0
-                    if 'absence' in eleve:
-                        absence = int(float(eleve['absence'])) if isinstance(eleve['absence'], (int, float, str)) and str(eleve['absence']).replace('.', '', 1).isdigit() else 0
-                    elif 'Absence' in eleve:
-                        absence = int(float(eleve['Absence'])) if isinstance(eleve['Absence'], (int, float, str)) and str(eleve['Absence']).replace('.', '', 1).isdigit() else 0
-                    
-                    conseil_discipline = eleve.get('conseil_discipline', eleve.get('C.D.', ''))
-                    appreciation = eleve.get('appreciation', eleve.get('Appréciation', ''))
-                    observation = eleve.get('observation_conseil', eleve.get('Observation conseil', ''))
-                    
-                    cursor.execute(f"""
-                        INSERT INTO {table_moyennes} (ien, moyenne, rang, retard, absence, conseil_discipline, 
-                                                    appreciation, observation, annee_scolaire)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        ien,
-                        moyenne,
-                        rang,
-                        retard,
-                        absence,
-                        conseil_discipline,
-                        appreciation,
-                        observation,
-                        annee_scolaire
-                    ))
+                    if col in eleve and not pd.isna(eleve[col]):
+                        # Vérifier si la valeur est un nombre
+                        if isinstance(eleve[col], (int, float)) or (isinstance(eleve[col], str) and str(eleve[col]).replace('.', '', 1).isdigit()):
+                            moy_d = float(eleve[col])
+                            cursor.execute(f"""
+                                INSERT INTO {table_notes} (ien, id_discipline, moy_d, annee_scolaire)
+                                VALUES (?, ?, ?, ?)
+                            """, (ien, discipline_id, moy_d, annee_scolaire))
                 except Exception as e:
-                    print(f"Erreur lors de l'insertion des moyennes pour l'élève {ien}: {str(e)}")
-            
-            # Pour chaque élève dans le détail, insérer les notes par discipline
-            for _, eleve in df_detail.iterrows():
-                # Récupérer l'IEN
-                ien = eleve.get('IEN')
-                if not ien:
-                    continue  # Ignorer les lignes sans IEN
-                
-                # Pour chaque matière, récupérer ou créer la discipline
-                for col in df_detail.columns:
-                    if col not in ['IEN', 'Prénom', 'Nom', 'prenom', 'nom', 'sexe', 'Sexe', 'niveau', 'classe', 'semestre']:
-                        cursor.execute("SELECT id FROM Disciplines WHERE libelle = ?", (col,))
-                        result = cursor.fetchone()
-                        
-                        if result:
-                            discipline_id = result[0]
-                        else:
-                            cursor.execute("INSERT INTO Disciplines (libelle) VALUES (?)", (col,))
-                            discipline_id = cursor.lastrowid
-                        
-                        # Insérer la note si elle existe et est un nombre
-                        try:
-                            if col in eleve and not pd.isna(eleve[col]):
-                                # Vérifier si la valeur est un nombre
-                                if isinstance(eleve[col], (int, float)) or (isinstance(eleve[col], str) and str(eleve[col]).replace('.', '', 1).isdigit()):
-                                    moy_d = float(eleve[col])
-                                    cursor.execute(f"""
-                                        INSERT INTO {table_notes} (ien, id_discipline, moy_d, annee_scolaire)
-                                        VALUES (?, ?, ?, ?)
-                                    """, (ien, discipline_id, moy_d, annee_scolaire))
-                        except Exception as e:
-                            print(f"Erreur lors de l'insertion de la note {col} pour l'élève {ien}: {str(e)}")
-            
-            conn.commit()
-            
-        except Exception as e:
-            conn.rollback()
-            raise Exception(f"Erreur lors de la sauvegarde dans la base SQLite : {str(e)}")
-        
-        finally:
-            conn.close()
-            
-    except Exception as e:
-        raise Exception(f"Erreur lors du traitement : {str(e)}")
+                    print(f"Erreur lors de l'insertion de la note {col} pour l'élève {ien}: {str(e)}")
+
+    # Recalculer tous les rangs du semestre (classe, niveau, établissement)
+    marquer("rangs")
+    calculer_rangs(conn, semestre, annee_scolaire)
+
+def ecrire_fichier_central(df_moyennes, df_detail):
+    """
+    Réécrit le fichier Excel central en flux (mode constant_memory)
+
+    Le classeur est d'abord écrit dans un fichier temporaire qui remplace ensuite
+    le fichier central : une écriture interrompue ne laisse pas de classeur tronqué.
+
+    Args:
+        df_moyennes: DataFrame de la feuille "Moyennes eleves"
+        df_detail: DataFrame de la feuille "Données détaillées"
+    """
+    fichier_temporaire = FICHIER_CENTRAL + ".tmp"
+    ecrire_xlsx([("Moyennes eleves", df_moyennes), ("Données détaillées", df_detail)], fichier_temporaire)
+    os.replace(fichier_temporaire, FICHIER_CENTRAL)
 
 def to_excel(df1, df2):
     """
@@ -318,11 +358,7 @@ def to_excel(df1, df2):
     Returns:
         bytes: Contenu du fichier Excel
     """
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df1.to_excel(writer, index=False, sheet_name='Moyennes eleves')
-        df2.to_excel(writer, index=False, sheet_name='Données détaillées')
-    return output.getvalue()
+    return exporter([('Moyennes eleves', df1), ('Données détaillées', df2)], "xlsx")
 
 def forcer_structure_moyennes_eleves(df):
     colonnes = [
@@ -348,14 +384,23 @@ def forcer_structure_donnees_detaillees(df, disciplines=None):
             df[col] = ''
     return df[base_cols + disciplines]
 
-def synchroniser_suppression_eleve(ien, niveau, classe, semestre):
+def _masque_contexte(df, niveau, classe=None, semestre=None):
     """
-    Supprime un élève de la base ET du fichier centralisé (toutes les feuilles)
+    Lignes du fichier centralisé correspondant à un niveau (et éventuellement une classe et un semestre)
+
+    Les colonnes de contexte sont recherchées sans tenir compte de la casse :
+    l'import les écrit en minuscules ("niveau", "classe", "semestre").
     """
-    import sqlite3
-    from ..config import DB_PATH
-    # Suppression dans la base
-    conn = sqlite3.connect(DB_PATH)
+    colonnes = {str(c).lower(): c for c in df.columns}
+    masque = df[colonnes['niveau']] == niveau
+    if classe is not None:
+        masque &= df[colonnes['classe']] == classe
+    if semestre is not None:
+        masque &= df[colonnes['semestre']] == semestre
+    return masque
+
+def _supprimer_eleve(conn, ien):
+    """Travail d'écriture : supprime un élève et toutes ses données de la base"""
     cursor = conn.cursor()
     cursor.execute("DELETE FROM Eleves WHERE ien = ?", (ien,))
     cursor.execute("DELETE FROM Moyennes_Generales_S1 WHERE ien = ?", (ien,))
@@ -363,47 +408,21 @@ def synchroniser_suppression_eleve(ien, niveau, classe, semestre):
     cursor.execute("DELETE FROM Notes_S1 WHERE ien = ?", (ien,))
     cursor.execute("DELETE FROM Notes_S2 WHERE ien = ?", (ien,))
     cursor.execute("DELETE FROM Decisions_Finales WHERE ien = ?", (ien,))
-    conn.commit()
-    conn.close()
-    # Suppression dans le fichier centralisé
-    if os.path.exists(FICHIER_CENTRAL):
-        xls = pd.ExcelFile(FICHIER_CENTRAL)
-        df_moy = pd.read_excel(xls, sheet_name="Moyennes eleves")
-        df_det = pd.read_excel(xls, sheet_name="Données détaillées")
-        # Filtrer
-        cond_moy = ~((df_moy['IEN'] == ien) & (df_moy['Niveau'] == niveau) & (df_moy['Classe'] == classe) & (df_moy['Semestre'] == semestre))
-        cond_det = ~((df_det['IEN'] == ien) & (df_det['Niveau'] == niveau) & (df_det['Classe'] == classe) & (df_det['Semestre'] == semestre))
-        df_moy = df_moy[cond_moy]
-        df_det = df_det[cond_det]
-        # Réécrire le fichier central
-        with pd.ExcelWriter(FICHIER_CENTRAL, engine='xlsxwriter') as writer:
-            df_moy.to_excel(writer, sheet_name="Moyennes eleves", index=False)
-            df_det.to_excel(writer, sheet_name="Données détaillées", index=False)
+    cursor.execute("DELETE FROM Inscriptions WHERE ien = ?", (ien,))
 
-def synchroniser_suppression_classe(niveau, classe, semestre):
-    """
-    Supprime une classe (tous les élèves de cette classe) dans la base ET le fichier centralisé
-    """
-    import sqlite3
-    from ..config import DB_PATH
-    # Suppression dans la base
-    conn = sqlite3.connect(DB_PATH)
+def _supprimer_classe(conn, niveau, classe):
+    """Travail d'écriture : supprime une classe et tous ses élèves de la base"""
     cursor = conn.cursor()
     # Trouver tous les IEN des élèves de la classe
     cursor.execute("""
-        SELECT ien FROM Eleves e
-        JOIN Classes c ON e.id_classe = c.id
+        SELECT DISTINCT i.ien FROM Inscriptions i
+        JOIN Classes c ON i.id_classe = c.id
         JOIN Niveaux n ON c.id_niveau = n.id
         WHERE n.libelle = ? AND c.libelle = ?
     """, (niveau, classe))
     iens = [row[0] for row in cursor.fetchall()]
     for ien in iens:
-        cursor.execute("DELETE FROM Eleves WHERE ien = ?", (ien,))
-        cursor.execute("DELETE FROM Moyennes_Generales_S1 WHERE ien = ?", (ien,))
-        cursor.execute("DELETE FROM Moyennes_Generales_S2 WHERE ien = ?", (ien,))
-        cursor.execute("DELETE FROM Notes_S1 WHERE ien = ?", (ien,))
-        cursor.execute("DELETE FROM Notes_S2 WHERE ien = ?", (ien,))
-        cursor.execute("DELETE FROM Decisions_Finales WHERE ien = ?", (ien,))
+        _supprimer_eleve(conn, ien)
     # Supprimer la classe elle-même
     cursor.execute("""
         DELETE FROM Classes WHERE id IN (
@@ -412,52 +431,68 @@ def synchroniser_suppression_classe(niveau, classe, semestre):
             WHERE n.libelle = ? AND c.libelle = ?
         )
     """, (niveau, classe))
-    conn.commit()
-    conn.close()
+
+def _supprimer_niveau(conn, niveau):
+    """Travail d'écriture : supprime un niveau, ses classes et leurs élèves de la base"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT libelle FROM Classes c JOIN Niveaux n ON c.id_niveau = n.id WHERE n.libelle = ?", (niveau,))
+    for classe in [row[0] for row in cursor.fetchall()]:
+        _supprimer_classe(conn, niveau, classe)
+    # Supprimer le niveau lui-même
+    cursor.execute("DELETE FROM Niveaux WHERE libelle = ?", (niveau,))
+
+def synchroniser_suppression_eleve(ien, niveau, classe, semestre):
+    """
+    Supprime un élève de la base ET du fichier centralisé (toutes les feuilles)
+    """
+    # Suppression dans la base
+    ecrire(_supprimer_eleve, ien)
+    # Suppression dans le fichier centralisé
+    if os.path.exists(FICHIER_CENTRAL):
+        xls = pd.ExcelFile(FICHIER_CENTRAL)
+        df_moy = pd.read_excel(xls, sheet_name="Moyennes eleves")
+        df_det = pd.read_excel(xls, sheet_name="Données détaillées")
+        # Filtrer
+        cond_moy = ~((df_moy['IEN'] == ien) & _masque_contexte(df_moy, niveau, classe, semestre))
+        cond_det = ~((df_det['IEN'] == ien) & _masque_contexte(df_det, niveau, classe, semestre))
+        df_moy = df_moy[cond_moy]
+        df_det = df_det[cond_det]
+        # Réécrire le fichier central
+        ecrire_fichier_central(df_moy, df_det)
+
+def synchroniser_suppression_classe(niveau, classe, semestre):
+    """
+    Supprime une classe (tous les élèves de cette classe) dans la base ET le fichier centralisé
+    """
+    # Suppression dans la base
+    ecrire(_supprimer_classe, niveau, classe)
     # Suppression dans le fichier centralisé
     if os.path.exists(FICHIER_CENTRAL):
         xls = pd.ExcelFile(FICHIER_CENTRAL)
         df_moy = pd.read_excel(xls, sheet_name="Moyennes eleves")
         df_det = pd.read_excel(xls, sheet_name="Données détaillées")
-        cond_moy = ~((df_moy['Niveau'] == niveau) & (df_moy['Classe'] == classe) & (df_moy['Semestre'] == semestre))
-        cond_det = ~((df_det['Niveau'] == niveau) & (df_det['Classe'] == classe) & (df_det['Semestre'] == semestre))
+        cond_moy = ~_masque_contexte(df_moy, niveau, classe, semestre)
+        cond_det = ~_masque_contexte(df_det, niveau, classe, semestre)
         df_moy = df_moy[cond_moy]
         df_det = df_det[cond_det]
-        with pd.ExcelWriter(FICHIER_CENTRAL, engine='xlsxwriter') as writer:
-            df_moy.to_excel(writer, sheet_name="Moyennes eleves", index=False)
-            df_det.to_excel(writer, sheet_name="Données détaillées", index=False)
+        ecrire_fichier_central(df_moy, df_det)
 
 def synchroniser_suppression_niveau(niveau, semestre):
     """
     Supprime un niveau (toutes les classes et élèves de ce niveau) dans la base ET le fichier centralisé
     """
-    import sqlite3
-    from ..config import DB_PATH
-    # Suppression dans la base
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    # Trouver toutes les classes du niveau
-    cursor.execute("SELECT libelle FROM Classes c JOIN Niveaux n ON c.id_niveau = n.id WHERE n.libelle = ?", (niveau,))
-    classes = [row[0] for row in cursor.fetchall()]
-    for classe in classes:
-        # Supprimer tous les élèves et la classe (réutilise la fonction classe)
-        synchroniser_suppression_classe(niveau, classe, semestre)
-    # Supprimer le niveau lui-même
-    cursor.execute("DELETE FROM Niveaux WHERE libelle = ?", (niveau,))
-    conn.commit()
-    conn.close()
+    # Suppression dans la base (classes, élèves et niveau dans une même transaction)
+    ecrire(_supprimer_niveau, niveau)
     # Suppression dans le fichier centralisé (toutes les lignes du niveau)
     if os.path.exists(FICHIER_CENTRAL):
         xls = pd.ExcelFile(FICHIER_CENTRAL)
         df_moy = pd.read_excel(xls, sheet_name="Moyennes eleves")
         df_det = pd.read_excel(xls, sheet_name="Données détaillées")
-        cond_moy = ~( (df_moy['Niveau'] == niveau) & (df_moy['Semestre'] == semestre) )
-        cond_det = ~( (df_det['Niveau'] == niveau) & (df_det['Semestre'] == semestre) )
+        cond_moy = ~_masque_contexte(df_moy, niveau, semestre=semestre)
+        cond_det = ~_masque_contexte(df_det, niveau, semestre=semestre)
         df_moy = df_moy[cond_moy]
         df_det = df_det[cond_det]
-        with pd.ExcelWriter(FICHIER_CENTRAL, engine='xlsxwriter') as writer:
-            df_moy.to_excel(writer, sheet_name="Moyennes eleves", index=False)
-            df_det.to_excel(writer, sheet_name="Données détaillées", index=False)
+        ecrire_fichier_central(df_moy, df_det)
 
 def synchroniser_suppression_import(df_moyennes, niveau, classe, semestre):
     """
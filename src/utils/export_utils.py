@@ -0,0 +1,272 @@
+import os
+import io
+import csv
+import math
+import zipfile
+import tempfile
+import datetime
+import xlsxwriter
+import pandas as pd
+from io import BytesIO
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+# Formats d'export : extension et type MIME d'un fichier contenant une seule feuille
+FORMATS_EXPORT = {
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (".csv", "text/csv"),
+}
+if PARQUET_DISPONIBLE:
+    FORMATS_EXPORT["parquet"] = (".parquet", "application/octet-stream")
+
+LIBELLES_FORMATS = {"xlsx": "Excel", "csv": "CSV", "parquet": "Parquet"}
+
+# Nombre de lignes lues à la fois depuis la base
+TAILLE_LOT = 5000
+
+def nom_feuille(libelle):
+    """Limite le nom d'une feuille à 31 caractères (limite Excel)"""
+    if len(libelle) > 31:
+        return libelle[:28] + "..."
+    return libelle
+
+def lignes_requete(conn, query, params=(), taille_lot=TAILLE_LOT):
+    """
+    Exécute une requête et itère sur ses lignes par lots, sans construire de DataFrame
+
+    Args:
+        conn: Connexion à la base de données
+        query: Requête SQL
+        params: Paramètres de la requête
+        taille_lot: Nombre de lignes lues à la fois
+
+    Returns:
+        tuple (noms de colonnes, itérateur de lignes)
+    """
+    cursor = conn.execute(query, params)
+    colonnes = [description[0] for description in cursor.description]
+
+    def lignes():
+        while True:
+            lot = cursor.fetchmany(taille_lot)
+            if not lot:
+                break
+            for ligne in lot:
+                yield tuple(ligne)
+
+    return colonnes, lignes()
+
+def _colonnes_et_lignes(source):
+    """
+    Ramène une source à des colonnes et un itérateur de lignes
+
+    Une source est un DataFrame, un tuple (colonnes, lignes) ou une fonction sans
+    argument renvoyant l'un des deux (la requête n'est alors exécutée qu'à l'écriture).
+    """
+    if callable(source):
+        source = source()
+    if isinstance(source, pd.DataFrame):
+        colonnes = [" ".join(map(str, c)) if isinstance(c, tuple) else str(c) for c in source.columns]
+        return colonnes, source.itertuples(index=False, name=None)
+    return source
+
+def _cellule(valeur):
+    """Convertit une valeur en type natif accepté par xlsxwriter et csv"""
+    if valeur is None or valeur is pd.NA or valeur is pd.NaT:
+        return None
+    if hasattr(valeur, 'item'):
+        valeur = valeur.item()
+    if isinstance(valeur, float) and (math.isnan(valeur) or math.isinf(valeur)):
+        return None
+    if isinstance(valeur, (datetime.date, datetime.datetime)):
+        return valeur.isoformat()
+    return valeur
+
+def ecrire_xlsx(feuilles, destination):
+    """
+    Écrit des feuilles dans un classeur Excel en mode constant_memory
+
+    Les lignes sont écrites une à une et vidées sur disque au fil de l'eau :
+    la mémoire utilisée ne dépend pas du nombre de lignes.
+
+    Args:
+        feuilles: Liste de tuples (nom de feuille, DataFrame ou (colonnes, lignes))
+        destination: Chemin du fichier ou objet fichier binaire
+    """
+    workbook = xlsxwriter.Workbook(destination, {
+        'constant_memory': True,
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+    })
+    entete = workbook.add_format({'bold': True, 'border': 1})
+
+    for nom, source in feuilles:
+        sheet = workbook.add_worksheet(nom_feuille(nom))
+        colonnes, lignes = _colonnes_et_lignes(source)
+        sheet.write_row(0, 0, colonnes, entete)
+        for i, ligne in enumerate(lignes, start=1):
+            sheet.write_row(i, 0, [_cellule(valeur) for valeur in ligne])
+
+    workbook.close()
+
+def _ecrire_csv_flux(flux_binaire, colonnes, lignes):
+    """Écrit un CSV (UTF-8) ligne par ligne dans un flux binaire"""
+    texte = io.TextIOWrapper(flux_binaire, encoding='utf-8', newline='')
+    writer = csv.writer(texte)
+    writer.writerow(colonnes)
+    for ligne in lignes:
+        writer.writerow(["" if v is None else v for v in map(_cellule, ligne)])
+    texte.flush()
+    texte.detach()
+
+def _ecrire_parquet_fichier(chemin, colonnes, lignes):
+    """Écrit un fichier Parquet par lots (nécessite pyarrow)"""
+    writer = None
+    try:
+        while True:
+            lot = [ligne for _, ligne in zip(range(TAILLE_LOT), lignes)]
+            if not lot and writer is not None:
+                break
+            table = pa.Table.from_pandas(
+                pd.DataFrame.from_records(lot, columns=colonnes),
+                schema=writer.schema if writer is not None else None,
+                preserve_index=False
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(chemin, table.schema)
+            writer.write_table(table)
+            if len(lot) < TAILLE_LOT:
+                break
+    finally:
+        if writer is not None:
+            writer.close()
+
+def ecrire_archive(feuilles, format_export, destination):
+    """
+    Écrit chaque feuille dans un fichier CSV ou Parquet ; plusieurs feuilles sont regroupées dans un ZIP
+
+    Args:
+        feuilles: Liste de tuples (nom de feuille, DataFrame ou (colonnes, lignes))
+        format_export: "csv" ou "parquet"
+        destination: Chemin du fichier produit
+    """
+    extension = FORMATS_EXPORT[format_export][0]
+
+    if len(feuilles) == 1:
+        colonnes, lignes = _colonnes_et_lignes(feuilles[0][1])
+        if format_export == "parquet":
+            _ecrire_parquet_fichier(destination, colonnes, lignes)
+        else:
+            with open(destination, "wb") as f:
+                _ecrire_csv_flux(f, colonnes, lignes)
+        return
+
+    with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for nom, source in feuilles:
+            colonnes, lignes = _colonnes_et_lignes(source)
+            if format_export == "parquet":
+                # pyarrow a besoin d'un fichier réel : passage par un fichier temporaire
+                descripteur, chemin = tempfile.mkstemp(suffix=extension)
+                os.close(descripteur)
+                try:
+                    _ecrire_parquet_fichier(chemin, colonnes, lignes)
+                    archive.write(chemin, f"{nom}{extension}")
+                finally:
+                    os.remove(chemin)
+            else:
+                with archive.open(f"{nom}{extension}", "w") as f:
+                    _ecrire_csv_flux(f, colonnes, lignes)
+
+def exporter(feuilles, format_export="xlsx", fichier_temporaire=False):
+    """
+    Produit un export au format demandé
+
+    Args:
+        feuilles: Liste de tuples (nom de feuille, DataFrame ou (colonnes, lignes))
+        format_export: "xlsx", "csv" ou "parquet"
+        fichier_temporaire: Écrire dans un fichier temporaire plutôt qu'en mémoire
+
+    Returns:
+        bytes, ou chemin du fichier temporaire (à supprimer par l'appelant) si fichier_temporaire
+    """
+    if format_export not in FORMATS_EXPORT:
+        raise ValueError(f"Format d'export non disponible : {format_export}")
+
+    # CSV et Parquet passent toujours par un fichier (archive ZIP ou écriture par lots)
+    if format_export == "xlsx" and not fichier_temporaire:
+        output = BytesIO()
+        ecrire_xlsx(feuilles, output)
+        return output.getvalue()
+
+    descripteur, chemin = tempfile.mkstemp(prefix="export_", suffix=FORMATS_EXPORT[format_export][0])
+    os.close(descripteur)
+    try:
+        if format_export == "xlsx":
+            ecrire_xlsx(feuilles, chemin)
+        else:
+            ecrire_archive(feuilles, format_export, chemin)
+    except Exception:
+        os.remove(chemin)
+        raise
+
+    if fichier_temporaire:
+        return chemin
+
+    try:
+        with open(chemin, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(chemin)
+
+def lire_export(feuilles, format_export):
+    """
+    Produit un export et retourne son contenu
+
+    Le fichier est écrit sur disque puis lu une seule fois, ce qui évite la copie
+    supplémentaire d'un tampon en mémoire pour les gros exports.
+
+    Args:
+        feuilles: Liste de tuples (nom de feuille, DataFrame ou (colonnes, lignes))
+        format_export: "xlsx", "csv" ou "parquet"
+
+    Returns:
+        bytes: Contenu du fichier
+    """
+    chemin = exporter(feuilles, format_export, fichier_temporaire=True)
+    try:
+        with open(chemin, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(chemin)
+
+def nom_export(nom_base, format_export, nb_feuilles):
+    """
+    Nom de fichier et type MIME d'un export (archive ZIP pour plusieurs feuilles en CSV/Parquet)
+
+    Returns:
+        tuple (nom de fichier, type MIME)
+    """
+    extension, mime = FORMATS_EXPORT[format_export]
+    if format_export != "xlsx" and nb_feuilles > 1:
+        extension, mime = ".zip", "application/zip"
+    return f"{nom_base}{extension}", mime
+
+def preparer_export(feuilles, format_export, nom_base):
+    """
+    Prépare un export pour st.download_button
+
+    Args:
+        feuilles: Liste de tuples (nom de feuille, DataFrame ou (colonnes, lignes))
+        format_export: "xlsx", "csv" ou "parquet"
+        nom_base: Nom du fichier sans extension
+
+    Returns:
+        tuple (contenu, nom de fichier, type MIME)
+    """
+    nom_fichier, mime = nom_export(nom_base, format_export, len(feuilles))
+    return lire_export(feuilles, format_export), nom_fichier, mime
@@ -0,0 +1,105 @@
+import pandas as pd
+from .export_utils import exporter
+
+def calculer_tableaux_honneur(conn, annee_scolaire, top_n, semestre=1):
+    """
+    Calcule en une seule requête les tableaux d'honneur global, par niveau et par classe
+
+    Les rangs sont calculés par fonctions de fenêtrage sur la dernière ligne importée
+    de chaque élève : RANK() pour les ex aequo (un élève à égalité avec le dernier
+    retenu est inclus) et ROW_NUMBER() pour un ordre d'affichage stable.
+
+    Args:
+        conn: Connexion à la base de données
+        annee_scolaire: Libellé de l'année scolaire
+        top_n: Nombre d'élèves par tableau d'honneur
+        semestre: Semestre (1 ou 2)
+
+    Returns:
+        DataFrame des élèves figurant dans au moins un tableau d'honneur
+    """
+    query = f"""
+        WITH classement AS (
+            SELECT e.ien, e.prenom, e.nom, e.sexe,
+                   n.libelle as niveau, n.etat as etat_niveau,
+                   c.libelle as classe, c.etat as etat_classe,
+                   mg.moyenne, mg.rang,
+                   RANK() OVER (ORDER BY mg.moyenne DESC) as rang_etablissement,
+                   RANK() OVER (PARTITION BY n.id ORDER BY mg.moyenne DESC) as rang_niveau,
+                   RANK() OVER (PARTITION BY c.id ORDER BY mg.moyenne DESC) as rang_classe,
+                   ROW_NUMBER() OVER (ORDER BY mg.moyenne DESC, e.nom, e.prenom) as ordre_etablissement,
+                   ROW_NUMBER() OVER (PARTITION BY n.id ORDER BY mg.moyenne DESC, e.nom, e.prenom) as ordre_niveau,
+                   ROW_NUMBER() OVER (PARTITION BY c.id ORDER BY mg.moyenne DESC, e.nom, e.prenom) as ordre_classe
+            FROM Moyennes_Generales_S{semestre} mg
+            JOIN Eleves e ON mg.ien = e.ien
+            JOIN Inscriptions i ON i.ien = mg.ien AND i.annee_scolaire = mg.annee_scolaire
+            JOIN Classes c ON i.id_classe = c.id
+            JOIN Niveaux n ON c.id_niveau = n.id
+            WHERE mg.annee_scolaire = ?
+              AND mg.id IN (SELECT MAX(id) FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ? GROUP BY ien)
+        )
+        SELECT * FROM classement
+        WHERE rang_etablissement <= ? OR rang_niveau <= ? OR rang_classe <= ?
+        ORDER BY niveau, classe, ordre_classe
+    """
+
+    return pd.read_sql_query(query, conn, params=(annee_scolaire, annee_scolaire, top_n, top_n, top_n))
+
+def tableau_global(df_honneur, top_n):
+    """
+    Extrait le tableau d'honneur de l'établissement
+
+    Args:
+        df_honneur: DataFrame issu de calculer_tableaux_honneur
+        top_n: Nombre d'élèves retenus (ex aequo inclus)
+
+    Returns:
+        DataFrame trié, avec la colonne rang_honneur en tête
+    """
+    df = df_honneur[df_honneur['rang_etablissement'] <= top_n].sort_values('ordre_etablissement')
+    df = df.rename(columns={'rang_etablissement': 'rang_honneur'})
+    return df[['rang_honneur', 'ien', 'prenom', 'nom', 'sexe', 'niveau', 'classe', 'moyenne', 'rang']].reset_index(drop=True)
+
+def tableaux_par_niveau(df_honneur, top_n):
+    """
+    Découpe le classement en un tableau d'honneur par niveau actif
+
+    Args:
+        df_honneur: DataFrame issu de calculer_tableaux_honneur
+        top_n: Nombre d'élèves retenus par niveau (ex aequo inclus)
+
+    Returns:
+        Liste de tuples (niveau, DataFrame)
+    """
+    df = df_honneur[(df_honneur['rang_niveau'] <= top_n) & (df_honneur['etat_niveau'] == 'actif')]
+    df = df.sort_values(['niveau', 'ordre_niveau']).rename(columns={'rang_niveau': 'rang_honneur'})
+    colonnes = ['rang_honneur', 'ien', 'prenom', 'nom', 'sexe', 'classe', 'moyenne', 'rang']
+    return [(niveau, groupe[colonnes].reset_index(drop=True)) for niveau, groupe in df.groupby('niveau', sort=True)]
+
+def tableaux_par_classe(df_honneur, top_n):
+    """
+    Découpe le classement en un tableau d'honneur par classe active
+
+    Args:
+        df_honneur: DataFrame issu de calculer_tableaux_honneur
+        top_n: Nombre d'élèves retenus par classe (ex aequo inclus)
+
+    Returns:
+        Liste de tuples ((niveau, classe), DataFrame)
+    """
+    df = df_honneur[(df_honneur['rang_classe'] <= top_n) & (df_honneur['etat_classe'] == 'actif')]
+    df = df.sort_values(['niveau', 'classe', 'ordre_classe']).rename(columns={'rang_classe': 'rang_honneur'})
+    colonnes = ['rang_honneur', 'ien', 'prenom', 'nom', 'sexe', 'moyenne', 'rang']
+    return [(cle, groupe[colonnes].reset_index(drop=True)) for cle, groupe in df.groupby(['niveau', 'classe'], sort=True)]
+
+def classeur_tableaux_honneur(feuilles):
+    """
+    Écrit une liste de tableaux d'honneur dans un classeur Excel en mémoire
+
+    Args:
+        feuilles: Liste de tuples (nom de feuille, DataFrame)
+
+    Returns:
+        bytes: Contenu du fichier Excel
+    """
+    return exporter(feuilles, "xlsx")
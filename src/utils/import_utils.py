@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+import tracemalloc
+from ..config import PROFIL_IMPORT_ALLOCATIONS
+
+try:
+    import psutil
+    PSUTIL_DISPONIBLE = True
+except ImportError:
+    PSUTIL_DISPONIBLE = False
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MO = 1024 * 1024
+
+# Libellés des étapes d'un import, dans l'ordre du traitement
+LIBELLES_ETAPES = {
+    "lecture": "Lecture du classeur (charger_et_nettoyer)",
+    "preparation": "Copie et renommage des colonnes",
+    "fusion_central": "Lecture et fusion du fichier central",
+    "ecriture_central": "Réécriture du fichier central",
+    "insertion_sqlite": "Insertions SQLite",
+    "rangs": "Calcul des rangs et validation",
+}
+
+def rss_courant_mo():
+    """Mémoire résidente actuelle du processus (Mo), ou None si elle n'est pas mesurable"""
+    if PSUTIL_DISPONIBLE:
+        return psutil.Process().memory_info().rss / MO
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MO
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def pic_rss_mo():
+    """Pic de mémoire résidente du processus depuis son démarrage (Mo), ou None"""
+    if resource is not None:
+        pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Octets sous macOS, kilo-octets sous Linux
+        return pic / MO if sys.platform == "darwin" else pic / 1024
+    if PSUTIL_DISPONIBLE:
+        return getattr(psutil.Process().memory_info(), 'peak_wset', 0) / MO or None
+    return None
+
+def _arrondi(valeur, decimales=2):
+    return None if valeur is None else round(valeur, decimales)
+
+# Imports profilés en cours dans le processus : tracemalloc, s'il a été démarré pour eux,
+# n'est arrêté qu'à la fin du dernier (deux sessions peuvent importer en même temps)
+_verrou_allocations = threading.Lock()
+_profils_suivis = 0
+_tracemalloc_par_profils = False
+
+def _prendre_tracemalloc():
+    global _profils_suivis, _tracemalloc_par_profils
+    with _verrou_allocations:
+        if _profils_suivis == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_par_profils = True
+        _profils_suivis += 1
+
+def _rendre_tracemalloc():
+    global _profils_suivis, _tracemalloc_par_profils
+    with _verrou_allocations:
+        _profils_suivis -= 1
+        if _profils_suivis == 0 and _tracemalloc_par_profils:
+            tracemalloc.stop()
+            _tracemalloc_par_profils = False
+
+class ProfilImport:
+    """
+    Mesure chaque étape d'un import : durée, lignes/s, mémoire résidente et allocations Python
+
+    Les étapes se suivent : marquer() clôt l'étape en cours et ouvre la suivante,
+    terminer() clôt la dernière. Les allocations sont suivies par tracemalloc
+    (démarré pour la durée de l'import s'il ne l'était pas déjà). terminer() doit
+    être appelé dans tous les cas, y compris en cas d'erreur : utiliser
+    try/finally ou le profil comme gestionnaire de contexte.
+    """
+
+    def __init__(self, suivre_allocations=PROFIL_IMPORT_ALLOCATIONS):
+        self.etapes = []
+        self._courante = None
+        self._allocations_prises = False
+        if suivre_allocations:
+            _prendre_tracemalloc()
+            self._allocations_prises = True
+        self._suivre_allocations = suivre_allocations and tracemalloc.is_tracing()
+        self._debut = time.perf_counter()
+        self._fin = None
+
+    def marquer(self, etape, lignes=0):
+        """Clôt l'étape en cours et commence la suivante"""
+        self._clore()
+        if self._suivre_allocations and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self._courante = {
+            'etape': etape,
+            'lignes': lignes,
+            'debut': time.perf_counter(),
+            'rss_debut': rss_courant_mo(),
+            'pic_debut': pic_rss_mo(),
+            'alloc_debut': tracemalloc.get_traced_memory()[0] if self._suivre_allocations else None,
+        }
+
+    def definir_lignes(self, lignes):
+        """Nombre de lignes traitées par l'étape en cours (s'il n'est connu qu'après coup)"""
+        if self._courante is not None:
+            self._courante['lignes'] = lignes
+
+    def _clore(self):
+        courante, self._courante = self._courante, None
+        if courante is None:
+            return
+
+        duree = time.perf_counter() - courante['debut']
+        rss_fin, pic_fin = rss_courant_mo(), pic_rss_mo()
+        mesure = {
+            'etape': courante['etape'],
+            'duree_ms': round(duree * 1000, 1),
+            'lignes': courante['lignes'],
+            'lignes_par_s': round(courante['lignes'] / duree, 1) if courante['lignes'] and duree > 0 else None,
+            'rss_fin_mo': _arrondi(rss_fin),
+            'rss_delta_mo': _arrondi(rss_fin - courante['rss_debut']) if rss_fin is not None else None,
+            'pic_rss_mo': _arrondi(pic_fin),
+            # Hausse du pic du processus pendant l'étape : désigne l'étape qui fait gonfler la mémoire
+            'hausse_pic_rss_mo': _arrondi(pic_fin - courante['pic_debut']) if pic_fin is not None else None,
+            'alloc_delta_mo': None,
+            'alloc_pic_mo': None,
+        }
+        if courante['alloc_debut'] is not None:
+            actuelle, pic = tracemalloc.get_traced_memory()
+            mesure['alloc_delta_mo'] = _arrondi((actuelle - courante['alloc_debut']) / MO)
+            mesure['alloc_pic_mo'] = _arrondi((pic - courante['alloc_debut']) / MO)
+        self.etapes.append(mesure)
+
+    def terminer(self):
+        """Clôt la dernière étape et libère tracemalloc (sans effet au second appel)"""
+        if self._fin is not None:
+            return
+        self._clore()
+        self._fin = time.perf_counter()
+        self._suivre_allocations = False
+        if self._allocations_prises:
+            self._allocations_prises = False
+            _rendre_tracemalloc()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.terminer()
+        return False
+
+    def resume(self):
+        """Totaux de l'import : durée, pic de mémoire résidente et pic d'allocations"""
+        pics_alloc = [etape['alloc_pic_mo'] for etape in self.etapes if etape['alloc_pic_mo'] is not None]
+        return {
+            'duree_ms': round(((self._fin or time.perf_counter()) - self._debut) * 1000, 1),
+            'pic_rss_mo': max((etape['pic_rss_mo'] for etape in self.etapes if etape['pic_rss_mo'] is not None), default=None),
+            'alloc_pic_mo': max(pics_alloc) if pics_alloc else None,
+        }
+
+def enregistrer_import(conn, profil, semestre, niveau, classe, annee_scolaire, fichier, nb_eleves,
+                       statut="termine", message=None):
+    """
+    Enregistre un import et le profil de ses étapes dans Historique_Imports
+
+    Travail d'écriture, à confier au thread d'écriture : ecrire(enregistrer_import, profil, ...)
+
+    Args:
+        conn: Connexion du thread d'écriture
+        profil: ProfilImport terminé
+        semestre: Semestre (1 ou 2)
+        niveau: Libellé du niveau
+        classe: Libellé de la classe
+        annee_scolaire: Libellé de l'année scolaire
+        fichier: Nom du fichier importé
+        nb_eleves: Nombre d'élèves du fichier
+        statut: "termine" ou "echec"
+        message: Message d'erreur éventuel
+
+    Returns:
+        int: Identifiant de l'enregistrement
+    """
+    resume = profil.resume()
+    cursor = conn.execute("""
+        INSERT INTO Historique_Imports (semestre, niveau, classe, annee_scolaire, fichier, nb_eleves,
+                                        statut, message, duree_ms, pic_rss_mo, alloc_pic_mo, etapes, date_import)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        semestre, niveau, classe, annee_scolaire, fichier, nb_eleves, statut, message,
+        resume['duree_ms'], resume['pic_rss_mo'], resume['alloc_pic_mo'],
+        json.dumps(profil.etapes, ensure_ascii=False),
+        datetime.datetime.now().isoformat(timespec='seconds'),
+    ))
+    return cursor.lastrowid
+
+def lister_imports(conn, semestre, limite=50):
+    """
+    Derniers imports d'un semestre, les plus récents d'abord
+
+    Returns:
+        list de dict (colonnes de Historique_Imports, 'etapes' décodé en liste de dict)
+    """
+    cursor = conn.execute("""
+        SELECT id, semestre, niveau, classe, annee_scolaire, fichier, nb_eleves, statut, message,
+               duree_ms, pic_rss_mo, alloc_pic_mo, etapes, date_import
+        FROM Historique_Imports
+        WHERE semestre = ?
+        ORDER BY id DESC
+        LIMIT ?
+    """, (semestre, limite))
+    colonnes = [description[0] for description in cursor.description]
+    imports = []
+    for ligne in cursor.fetchall():
+        enregistrement = dict(zip(colonnes, ligne))
+        enregistrement['etapes'] = json.loads(enregistrement['etapes'] or "[]")
+        imports.append(enregistrement)
+    return imports
@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import threading
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from ..config import RAPPORTS_JOBS_DIR, RAPPORTS_JOBS_TRAVAILLEURS
+from .db_utils import get_db_connection
+from .ecriture_utils import ecrire
+from .stats_utils import calculer_statistiques_discipline
+from .rapport_utils import construire_statistiques_globales, feuilles_statistiques_globales, feuilles_rapport_discipline
+from .bulletin_utils import charger_bulletins, generer_archive_bulletins
+from .export_utils import lire_export, nom_export
+from .cache_utils import artefact_rapport
+from .metriques_utils import TRAVAUX_DUREE
+
+# Statuts d'un travail, dans l'ordre de son cycle de vie
+LIBELLES_STATUTS = {
+    "en_attente": "⏳ En attente",
+    "en_cours": "⚙️ En cours",
+    "termine": "✅ Terminé",
+    "erreur": "❌ Erreur",
+}
+
+_executor = None
+_verrou = threading.Lock()
+
+def _maintenant():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _generer_statistiques_globales(conn, parametres, destination, progression):
+    """Rapport statistique global de l'établissement"""
+    semestre, format_export = parametres['semestre'], parametres['format']
+    feuilles = feuilles_statistiques_globales(
+        construire_statistiques_globales(conn, semestre, parametres['annee_scolaire'])
+    )
+    # Même clé que la page Rapports : un rapport déjà consulté n'est pas recalculé
+    contenu = artefact_rapport("statistiques_globales", parametres, lambda: lire_export(feuilles, format_export))
+    with open(destination, "wb") as f:
+        f.write(contenu)
+    return nom_export(f"Rapport_Statistique_Global_S{semestre}", format_export, len(feuilles))
+
+def _generer_rapport_discipline(conn, parametres, destination, progression):
+    """Rapport d'une discipline sur tous les niveaux"""
+    semestre, format_export = parametres['semestre'], parametres['format']
+    statistiques = calculer_statistiques_discipline(
+        conn, semestre, parametres['annee_scolaire'], parametres['id_discipline']
+    )
+    feuilles = feuilles_rapport_discipline(
+        conn, semestre, parametres['annee_scolaire'], parametres['id_discipline'], statistiques,
+        par_niveau=parametres['par_niveau'], par_sexe=parametres['par_sexe']
+    )
+    cle = {k: parametres[k] for k in ('semestre', 'annee_scolaire', 'id_discipline', 'par_niveau', 'par_sexe', 'format')}
+    contenu = artefact_rapport("rapport_discipline", cle, lambda: lire_export(feuilles, format_export))
+    with open(destination, "wb") as f:
+        f.write(contenu)
+    return nom_export(f"Rapport_{parametres['discipline']}_S{semestre}", format_export, len(feuilles))
+
+def _generer_bulletins(conn, parametres, destination, progression):
+    """Archive ZIP des bulletins d'une classe ou d'un niveau"""
+    bulletins = charger_bulletins(
+        conn, parametres['semestre'], parametres['annee_scolaire'],
+        id_classe=parametres.get('id_classe'), id_niveau=parametres.get('id_niveau')
+    )
+    if not bulletins:
+        raise ValueError("Aucun élève à traiter pour cette sélection.")
+    generer_archive_bulletins(
+        bulletins, parametres['format'], destination=destination,
+        nb_processus=parametres.get('nb_processus'), progression=progression
+    )
+    return f"Bulletins_{parametres['libelle']}_S{parametres['semestre']}.zip", "application/zip"
+
+# Générateurs disponibles : (conn, parametres, destination, progression) -> (nom de fichier, type MIME)
+GENERATEURS = {
+    "statistiques_globales": _generer_statistiques_globales,
+    "rapport_discipline": _generer_rapport_discipline,
+    "bulletins": _generer_bulletins,
+}
+
+def _pool():
+    """Pool de travailleurs partagé par toutes les sessions du serveur (créé au premier usage)"""
+    global _executor
+    with _verrou:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RAPPORTS_JOBS_TRAVAILLEURS, thread_name_prefix="rapports")
+            _reprendre_travaux(_executor)
+        return _executor
+
+def _remettre_en_attente(conn):
+    """Travail d'écriture : remet en attente les travaux interrompus et retourne la liste des travaux à exécuter"""
+    ids = [row['id'] for row in conn.execute(
+        "SELECT id FROM Rapports_Jobs WHERE statut IN ('en_attente', 'en_cours') ORDER BY id"
+    )]
+    conn.execute("UPDATE Rapports_Jobs SET statut = 'en_attente', progression = 0 WHERE statut = 'en_cours'")
+    return ids
+
+def _reprendre_travaux(executor):
+    """Relance les travaux interrompus par un arrêt du serveur"""
+    for id_job in ecrire(_remettre_en_attente):
+        executor.submit(_executer, id_job)
+
+def _mettre_a_jour(id_job, **valeurs):
+    colonnes = ", ".join(f"{colonne} = ?" for colonne in valeurs)
+    ecrire(lambda conn: conn.execute(
+        f"UPDATE Rapports_Jobs SET {colonnes} WHERE id = ?", list(valeurs.values()) + [id_job]
+    ))
+
+def _executer(id_job):
+    """Exécute un travail dans un thread du pool ; le résultat est écrit dans RAPPORTS_JOBS_DIR"""
+    conn = get_db_connection()
+    try:
+        job = conn.execute("SELECT * FROM Rapports_Jobs WHERE id = ?", (id_job,)).fetchone()
+        if job is None or job['statut'] != 'en_attente':
+            return
+
+        _mettre_a_jour(id_job, statut='en_cours', date_debut=_maintenant())
+        os.makedirs(RAPPORTS_JOBS_DIR, exist_ok=True)
+        destination = os.path.join(RAPPORTS_JOBS_DIR, f"rapport_{id_job}")
+        temporaire = f"{destination}.tmp"
+
+        def progression(traites, total):
+            _mettre_a_jour(id_job, progression=traites / total if total else 1)
+
+        debut = time.perf_counter()
+        try:
+            generer = GENERATEURS[job['type_rapport']]
+            nom_fichier, mime = generer(conn, json.loads(job['parametres']), temporaire, progression)
+            os.replace(temporaire, destination)
+        except Exception as e:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+            traceback.print_exc()
+            TRAVAUX_DUREE.observer(time.perf_counter() - debut, type_rapport=job['type_rapport'], statut='erreur')
+            _mettre_a_jour(id_job, statut='erreur', message=str(e), date_fin=_maintenant())
+            return
+
+        TRAVAUX_DUREE.observer(time.perf_counter() - debut, type_rapport=job['type_rapport'], statut='termine')
+        _mettre_a_jour(id_job, statut='termine', progression=1, fichier=destination,
+                       nom_fichier=nom_fichier, mime=mime, date_fin=_maintenant())
+    finally:
+        conn.close()
+
+def soumettre_rapport(type_rapport, parametres, libelle):
+    """
+    Enregistre un rapport à produire en arrière-plan et le confie au pool de travailleurs
+
+    Args:
+        type_rapport: Clé de GENERATEURS
+        parametres: dict des paramètres du générateur (sérialisable en JSON)
+        libelle: Description affichée dans la liste des rapports
+
+    Returns:
+        int: Identifiant du travail
+    """
+    if type_rapport not in GENERATEURS:
+        raise ValueError(f"Type de rapport inconnu : {type_rapport}")
+
+    id_job = ecrire(lambda conn: conn.execute("""
+        INSERT INTO Rapports_Jobs (type_rapport, libelle, parametres, statut, date_creation)
+        VALUES (?, ?, ?, 'en_attente', ?)
+    """, (type_rapport, libelle, json.dumps(parametres, sort_keys=True, default=str), _maintenant())).lastrowid)
+
+    _pool().submit(_executer, id_job)
+    return id_job
+
+def lister_rapports(limite=50):
+    """
+    Liste les derniers travaux, du plus récent au plus ancien
+
+    Returns:
+        DataFrame (id, type_rapport, libelle, statut, progression, nom_fichier, mime, message, dates)
+    """
+    # S'assure que les travaux interrompus sont relancés dès la première consultation
+    _pool()
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query("""
+            SELECT id, type_rapport, libelle, statut, progression, nom_fichier, mime, message,
+                   date_creation, date_debut, date_fin
+            FROM Rapports_Jobs
+            ORDER BY id DESC
+            LIMIT ?
+        """, conn, params=(limite,))
+    finally:
+        conn.close()
+
+def lire_rapport(id_job):
+    """Retourne le contenu d'un rapport terminé (None s'il n'est pas disponible)"""
+    conn = get_db_connection()
+    try:
+        job = conn.execute("SELECT statut, fichier FROM Rapports_Jobs WHERE id = ?", (id_job,)).fetchone()
+    finally:
+        conn.close()
+
+    if job is None or job['statut'] != 'termine' or not job['fichier']:
+        return None
+    try:
+        with open(job['fichier'], "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _supprimer_travail(conn, id_job):
+    """Travail d'écriture : supprime un travail terminé ou en erreur et retourne son fichier (None si conservé)"""
+    job = conn.execute("SELECT statut, fichier FROM Rapports_Jobs WHERE id = ?", (id_job,)).fetchone()
+    if job is None or job['statut'] in ('en_attente', 'en_cours'):
+        return None
+    conn.execute("DELETE FROM Rapports_Jobs WHERE id = ?", (id_job,))
+    return dict(job)
+
+def supprimer_rapport(id_job):
+    """Supprime un travail terminé ou en erreur ainsi que son fichier"""
+    # Statut relu et travail supprimé dans la même transaction
+    job = ecrire(_supprimer_travail, id_job)
+    if job is None:
+        return False
+
+    if job['fichier'] and os.path.exists(job['fichier']):
+        os.remove(job['fichier'])
+    return True
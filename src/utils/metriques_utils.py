@@ -0,0 +1,305 @@
+import os
+import time
+import bisect
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ..config import DB_PATH, METRIQUES_FICHIER, METRIQUES_PORT, METRIQUES_ADRESSE, METRIQUES_INTERVALLE
+
+# Type MIME du format OpenMetrics (compris par Prometheus et les agents compatibles)
+TYPE_OPENMETRICS = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Bornes des histogrammes (secondes)
+BORNES_REQUETES = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+BORNES_TRAITEMENTS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_verrou = threading.Lock()
+_metriques = {}
+_collecteurs = []
+
+def _echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _etiquettes(noms, valeurs, supplement=()):
+    paires = list(zip(noms, valeurs)) + list(supplement)
+    if not paires:
+        return ""
+    return "{" + ",".join(f'{nom}="{_echapper(valeur)}"' for nom, valeur in paires) + "}"
+
+def _nombre(valeur):
+    if valeur == float("inf"):
+        return "+Inf"
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+class _Metrique:
+    """Métrique du registre : une série par combinaison de valeurs d'étiquettes"""
+
+    type_metrique = None
+
+    def __init__(self, nom, aide, etiquettes=()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self._series = {}
+
+    def _cle(self, etiquettes):
+        if set(etiquettes) != set(self.etiquettes):
+            raise ValueError(f"Étiquettes attendues pour {self.nom} : {', '.join(self.etiquettes)}")
+        return tuple(str(etiquettes[nom]) for nom in self.etiquettes)
+
+    def vider(self):
+        """Oublie toutes les séries"""
+        with _verrou:
+            self._series.clear()
+
+    def _lignes(self):
+        raise NotImplementedError
+
+    def exposer(self):
+        with _verrou:
+            lignes = self._lignes()
+        return [f"# TYPE {self.nom} {self.type_metrique}", f"# HELP {self.nom} {self.aide}"] + lignes
+
+class Compteur(_Metrique):
+    type_metrique = "counter"
+
+    def incrementer(self, valeur=1, **etiquettes):
+        cle = self._cle(etiquettes)
+        with _verrou:
+            self._series[cle] = self._series.get(cle, 0) + valeur
+
+    def _lignes(self):
+        return [f"{self.nom}_total{_etiquettes(self.etiquettes, cle)} {_nombre(valeur)}"
+                for cle, valeur in sorted(self._series.items())]
+
+class Jauge(_Metrique):
+    type_metrique = "gauge"
+
+    def definir(self, valeur, **etiquettes):
+        cle = self._cle(etiquettes)
+        with _verrou:
+            self._series[cle] = valeur
+
+    def remplacer(self, series):
+        """
+        Remplace d'un bloc toutes les séries (jauges recalculées à chaque collecte)
+
+        L'échange se fait sous le verrou du registre : un export concurrent voit les
+        anciennes ou les nouvelles séries, jamais une jauge vidée en cours de collecte.
+
+        Args:
+            series: Itérable de tuples (valeur, dict des étiquettes) ; vide pour une jauge absente
+        """
+        nouvelles = {self._cle(etiquettes): valeur for valeur, etiquettes in series}
+        with _verrou:
+            self._series = nouvelles
+
+    def _lignes(self):
+        return [f"{self.nom}{_etiquettes(self.etiquettes, cle)} {_nombre(valeur)}"
+                for cle, valeur in sorted(self._series.items())]
+
+class Histogramme(_Metrique):
+    type_metrique = "histogram"
+
+    def __init__(self, nom, aide, etiquettes=(), bornes=BORNES_TRAITEMENTS):
+        super().__init__(nom, aide, etiquettes)
+        self.bornes = tuple(sorted(bornes))
+
+    def observer(self, valeur, **etiquettes):
+        cle = self._cle(etiquettes)
+        with _verrou:
+            serie = self._series.get(cle)
+            if serie is None:
+                # Effectif de chaque intervalle (le dernier au-delà de la plus grande borne), somme
+                serie = self._series[cle] = [[0] * (len(self.bornes) + 1), 0.0]
+            serie[0][bisect.bisect_left(self.bornes, valeur)] += 1
+            serie[1] += valeur
+
+    def _lignes(self):
+        lignes = []
+        for cle, (effectifs, somme) in sorted(self._series.items()):
+            cumul = 0
+            for borne, effectif in zip(self.bornes + (float("inf"),), effectifs):
+                cumul += effectif
+                lignes.append(f"{self.nom}_bucket{_etiquettes(self.etiquettes, cle, [('le', _nombre(borne))])} {cumul}")
+            lignes.append(f"{self.nom}_count{_etiquettes(self.etiquettes, cle)} {cumul}")
+            lignes.append(f"{self.nom}_sum{_etiquettes(self.etiquettes, cle)} {_nombre(somme)}")
+        return lignes
+
+def _enregistrer(classe, nom, aide, etiquettes, **options):
+    with _verrou:
+        metrique = _metriques.get(nom)
+        if metrique is None:
+            metrique = _metriques[nom] = classe(nom, aide, etiquettes, **options)
+    return metrique
+
+def compteur(nom, aide, etiquettes=()):
+    """Compteur du registre (créé au premier appel) ; le suffixe _total est ajouté à l'export"""
+    return _enregistrer(Compteur, nom, aide, etiquettes)
+
+def jauge(nom, aide, etiquettes=()):
+    """Jauge du registre (créée au premier appel)"""
+    return _enregistrer(Jauge, nom, aide, etiquettes)
+
+def histogramme(nom, aide, etiquettes=(), bornes=BORNES_TRAITEMENTS):
+    """Histogramme du registre (créé au premier appel avec ses bornes en secondes)"""
+    return _enregistrer(Histogramme, nom, aide, etiquettes, bornes=bornes)
+
+def ajouter_collecteur(fonction):
+    """Enregistre une fonction sans argument appelée avant chaque export (mise à jour des jauges)"""
+    if fonction not in _collecteurs:
+        _collecteurs.append(fonction)
+    return fonction
+
+# Métriques de l'application
+IMPORTS = compteur("lcams_imports", "Imports de classeurs PLANETE", ("semestre", "statut"))
+IMPORTS_LIGNES = compteur("lcams_imports_lignes", "Élèves importés", ("semestre",))
+IMPORTS_DUREE = histogramme("lcams_import_duree_secondes", "Durée des imports", ("semestre",))
+REQUETES_DUREE = histogramme(
+    "lcams_requete_sql_duree_secondes", "Durée d'exécution des requêtes SQL tracées", ("operation",),
+    bornes=BORNES_REQUETES
+)
+CACHE_RAPPORTS = compteur("lcams_cache_rapports", "Consultations du cache disque des rapports", ("type_rapport", "resultat"))
+RAPPORTS_DUREE = histogramme("lcams_rapport_generation_duree_secondes", "Génération d'un rapport absent du cache", ("type_rapport",))
+TRAVAUX_DUREE = histogramme("lcams_travail_rapport_duree_secondes", "Travaux de rapports en arrière-plan", ("type_rapport", "statut"))
+BASE_TAILLE = jauge("lcams_base_taille_octets", "Taille de la base SQLite (journal WAL compris)")
+TABLES_LIGNES = jauge("lcams_table_lignes", "Nombre de lignes par table", ("table",))
+SESSIONS_ACTIVES = jauge("lcams_sessions_actives", "Sessions Streamlit connectées")
+
+def observer_import(semestre, statut, nb_eleves, duree):
+    """Comptabilise un import terminé ou en échec (durée en secondes)"""
+    IMPORTS.incrementer(semestre=semestre, statut=statut)
+    if statut == "termine":
+        IMPORTS_LIGNES.incrementer(nb_eleves, semestre=semestre)
+    IMPORTS_DUREE.observer(duree, semestre=semestre)
+
+def observer_requete(requete, duree):
+    """Ajoute l'exécution d'une requête à l'histogramme de son type (SELECT, INSERT...)"""
+    mots = requete.split(None, 1)
+    REQUETES_DUREE.observer(duree, operation=mots[0].upper() if mots else "?")
+
+@ajouter_collecteur
+def _collecter_base():
+    """Taille de la base et lignes par table, lues sur une connexion non tracée en lecture seule"""
+    if not os.path.exists(DB_PATH):
+        BASE_TAILLE.remplacer([])
+        TABLES_LIGNES.remplacer([])
+        return
+    try:
+        taille = sum(
+            os.path.getsize(chemin) for chemin in (DB_PATH, f"{DB_PATH}-wal") if os.path.exists(chemin)
+        )
+        # Connexion directe : les requêtes de collecte ne doivent pas apparaître dans la trace SQL
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=5)
+        try:
+            tables = [ligne[0] for ligne in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            )]
+            lignes = [
+                (conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0], {'table': table})
+                for table in tables
+            ]
+        finally:
+            conn.close()
+    except (OSError, sqlite3.Error):
+        # Valeurs inconnues : séries absentes plutôt que celles d'une collecte précédente
+        BASE_TAILLE.remplacer([])
+        TABLES_LIGNES.remplacer([])
+        raise
+    BASE_TAILLE.remplacer([(taille, {})])
+    TABLES_LIGNES.remplacer(lignes)
+
+def _nombre_sessions():
+    """
+    Sessions connectées au serveur Streamlit, None si inconnu
+
+    Le nombre est lu dans le gestionnaire de sessions du runtime, qui n'a pas d'API
+    publique : hors de Streamlit ou si cet attribut interne change, la jauge est absente.
+    """
+    try:
+        from streamlit.runtime import Runtime
+        if not Runtime.exists():
+            return None
+        return int(Runtime.instance()._session_mgr.num_active_sessions())
+    except Exception:
+        return None
+
+@ajouter_collecteur
+def _collecter_sessions():
+    """Sessions connectées au serveur Streamlit (aucune série si le nombre est inconnu)"""
+    nombre = _nombre_sessions()
+    SESSIONS_ACTIVES.remplacer([] if nombre is None else [(nombre, {})])
+
+def exposer():
+    """Texte OpenMetrics de toutes les métriques, après mise à jour des jauges"""
+    for collecteur in list(_collecteurs):
+        try:
+            collecteur()
+        except Exception as e:  # une collecte en échec ne doit pas priver des autres métriques
+            print(f"Collecte des métriques impossible ({collecteur.__name__}) : {str(e)}")
+    with _verrou:
+        metriques = list(_metriques.values())
+    lignes = [ligne for metrique in metriques for ligne in metrique.exposer()]
+    return "\n".join(lignes + ["# EOF"]) + "\n"
+
+def ecrire_fichier(chemin=METRIQUES_FICHIER):
+    """Écrit les métriques dans un fichier, remplacé d'un bloc pour ne jamais être lu à moitié"""
+    os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        f.write(exposer())
+    os.replace(temporaire, chemin)
+
+class _Gestionnaire(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        contenu = exposer().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", TYPE_OPENMETRICS)
+        self.send_header("Content-Length", str(len(contenu)))
+        self.end_headers()
+        self.wfile.write(contenu)
+
+    def log_message(self, format, *args):
+        pass
+
+def _ecrire_en_boucle(chemin, intervalle):
+    while True:
+        try:
+            ecrire_fichier(chemin)
+        except OSError as e:
+            print(f"Écriture des métriques impossible : {str(e)}")
+        time.sleep(intervalle)
+
+_export_demarre = False
+
+def demarrer_export(fichier=METRIQUES_FICHIER, port=METRIQUES_PORT, adresse=METRIQUES_ADRESSE,
+                    intervalle=METRIQUES_INTERVALLE):
+    """
+    Démarre l'export des métriques dans des threads annexes (une seule fois par processus)
+
+    Args:
+        fichier: Fichier réécrit toutes les `intervalle` secondes (aucun si None)
+        port: Port du point /metrics servi sur `adresse` (aucun serveur si 0)
+        adresse: Adresse d'écoute du serveur (locale par défaut)
+        intervalle: Secondes entre deux écritures du fichier
+    """
+    global _export_demarre
+    with _verrou:
+        if _export_demarre:
+            return
+        _export_demarre = True
+
+    if fichier:
+        threading.Thread(target=_ecrire_en_boucle, args=(fichier, intervalle),
+                         name="metriques-fichier", daemon=True).start()
+    if port:
+        try:
+            serveur = ThreadingHTTPServer((adresse, port), _Gestionnaire)
+        except OSError as e:
+            print(f"Serveur de métriques indisponible sur {adresse}:{port} : {str(e)}")
+            return
+        serveur.daemon_threads = True
+        threading.Thread(target=serveur.serve_forever, name="metriques-http", daemon=True).start()
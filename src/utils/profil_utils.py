@@ -0,0 +1,298 @@
+import sys
+import json
+import time
+import datetime
+import functools
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+from ..config import PROFIL_VUES, PROFIL_HISTORIQUE_TAILLE, PROFIL_INTERVALLE_ECHANTILLON
+from .trace_utils import compteurs_thread
+
+# Clés de st.session_state : activation du profilage et sections de l'exécution en cours
+CLE_ACTIF = "profil_vues_actif"
+CLE_EXECUTION = "profil_vues_execution"
+
+# Historique de toutes les sessions (export JSON pour le suivi des tendances)
+_historique = deque(maxlen=PROFIL_HISTORIQUE_TAILLE)
+_verrou = threading.Lock()
+_ordre = itertools.count()
+
+# Pile des sections ouvertes dans le thread courant
+_local = threading.local()
+
+def profil_actif():
+    """Le profilage est-il activé pour la session courante ?"""
+    try:
+        return bool(st.session_state.get(CLE_ACTIF, PROFIL_VUES))
+    except Exception:
+        return PROFIL_VUES
+
+def _dans_pandas(frame):
+    """
+    La pile d'appels est-elle dans pandas (hors requête SQL) ?
+
+    Une requête lancée par pd.read_sql_query est comptée comme temps SQL, pas pandas.
+    """
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module == "src.utils.trace_utils":
+            return False
+        if module.startswith("pandas"):
+            return True
+        frame = frame.f_back
+    return False
+
+class _Echantillonneur:
+    """
+    Profileur statistique : relève périodiquement la pile des threads en cours de profilage
+    et compte les relevés tombant dans pandas (temps pandas estimé = relevés × intervalle)
+    """
+
+    def __init__(self, intervalle):
+        self.intervalle = intervalle
+        self._verrou = threading.Lock()
+        self._suivis = {}  # identifiant de thread -> [sections ouvertes, relevés dans pandas]
+        self._reveil = threading.Event()
+        self._thread = None
+
+    def suivre(self, ident):
+        with self._verrou:
+            self._suivis.setdefault(ident, [0, 0])[0] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._boucle, name="profil-vues", daemon=True)
+                self._thread.start()
+            self._reveil.set()
+
+    def liberer(self, ident):
+        with self._verrou:
+            compteur = self._suivis.get(ident)
+            if compteur is not None:
+                compteur[0] -= 1
+                if compteur[0] <= 0:
+                    del self._suivis[ident]
+            if not self._suivis:
+                self._reveil.clear()
+
+    def releves(self, ident):
+        with self._verrou:
+            compteur = self._suivis.get(ident)
+            return compteur[1] if compteur else 0
+
+    def _boucle(self):
+        while True:
+            self._reveil.wait()
+            time.sleep(self.intervalle)
+            frames = sys._current_frames()
+            with self._verrou:
+                for ident, compteur in self._suivis.items():
+                    if _dans_pandas(frames.get(ident)):
+                        compteur[1] += 1
+
+_echantillonneur = _Echantillonneur(PROFIL_INTERVALLE_ECHANTILLON)
+
+# Versions de Streamlit dont le contexte d'exécution expose sa fonction d'envoi _enqueue
+# (API interne, sous streamlit.runtime depuis 1.12) : ailleurs, le volume envoyé est inconnu
+_VERSIONS_ENVOI = ((1, 12), (2, 0))
+
+def _version_streamlit():
+    """Version (majeure, mineure) de Streamlit, None si illisible"""
+    try:
+        majeure, mineure = st.__version__.split(".")[:2]
+        return int(majeure), int("".join(itertools.takewhile(str.isdigit, mineure)) or 0)
+    except (AttributeError, ValueError):
+        return None
+
+@functools.lru_cache(maxsize=None)
+def mesure_envois_disponible():
+    """Le volume envoyé au navigateur peut-il être mesuré avec la version installée de Streamlit ?"""
+    version = _version_streamlit()
+    return version is not None and _VERSIONS_ENVOI[0] <= version < _VERSIONS_ENVOI[1]
+
+def _compteur_envois():
+    """
+    Compteur des octets envoyés au navigateur par l'exécution Streamlit courante
+
+    Les messages passent par le contexte d'exécution du script : sa fonction d'envoi
+    (attribut interne _enqueue) est enveloppée une fois pour cumuler leur taille.
+    Retourne None (volume inconnu) hors de Streamlit, sur une version non prise en
+    charge (voir _VERSIONS_ENVOI) ou si le contexte n'a plus la forme attendue.
+    """
+    if not mesure_envois_disponible():
+        return None
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        return None
+    if ctx is None or not callable(getattr(ctx, '_enqueue', None)):
+        return None
+
+    compteur = getattr(ctx, '_profil_octets', None)
+    if compteur is None:
+        compteur = [0]
+        envoyer = ctx._enqueue
+
+        def envoyer_et_compter(message):
+            try:
+                compteur[0] += message.ByteSize()
+            except Exception:
+                pass  # la mesure ne doit jamais empêcher l'envoi
+            envoyer(message)
+
+        try:
+            ctx._enqueue = envoyer_et_compter
+            ctx._profil_octets = compteur
+        except AttributeError:
+            return None
+    return compteur
+
+def _enregistrer(mesure):
+    with _verrou:
+        _historique.append(mesure)
+    try:
+        st.session_state.setdefault(CLE_EXECUTION, []).append(mesure)
+    except Exception:
+        pass
+
+@contextmanager
+def section(nom):
+    """
+    Mesure une section d'une vue : durée, temps SQL, temps pandas (estimé) et volume envoyé
+
+    Sans effet si le profilage n'est pas activé. Les sections peuvent être imbriquées ;
+    le chemin complet (« vue > section ») est enregistré.
+
+    Args:
+        nom: Libellé de la section
+    """
+    if not profil_actif():
+        yield
+        return
+
+    pile = getattr(_local, 'pile', None)
+    if pile is None:
+        pile = _local.pile = []
+    pile.append(nom)
+    chemin = " > ".join(pile)
+    ordre = next(_ordre)
+
+    ident = threading.get_ident()
+    _echantillonneur.suivre(ident)
+    envois = _compteur_envois()
+    sql_debut, lignes_debut = compteurs_thread()
+    releves_debut = _echantillonneur.releves(ident)
+    octets_debut = envois[0] if envois else 0
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        duree_ms = (time.perf_counter() - debut) * 1000
+        sql_fin, lignes_fin = compteurs_thread()
+        releves = _echantillonneur.releves(ident) - releves_debut
+        _echantillonneur.liberer(ident)
+        pile.pop()
+        _enregistrer({
+            'horodatage': datetime.datetime.now().isoformat(timespec='seconds'),
+            'ordre': ordre,
+            'section': nom,
+            'chemin': chemin,
+            'profondeur': len(pile),
+            'duree_ms': round(duree_ms, 2),
+            'sql_ms': round(sql_fin - sql_debut, 2),
+            'pandas_ms': round(releves * PROFIL_INTERVALLE_ECHANTILLON * 1000, 2),
+            'lignes_sql': lignes_fin - lignes_debut,
+            'octets_envoyes': envois[0] - octets_debut if envois else None,
+        })
+
+def profiler(nom=None):
+    """
+    Décorateur mesurant chaque appel d'une fonction de vue comme une section
+
+    S'emploie avec ou sans libellé : @profiler ou @profiler("Vue d'ensemble").
+    """
+    def decorateur(fonction):
+        libelle = nom or fonction.__name__
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            if not profil_actif():
+                return fonction(*args, **kwargs)
+            with section(libelle):
+                return fonction(*args, **kwargs)
+        return enveloppe
+
+    if callable(nom):
+        fonction, nom = nom, None
+        return decorateur(fonction)
+    return decorateur
+
+def debut_execution():
+    """Oublie les sections de l'exécution précédente (à appeler au début du script)"""
+    try:
+        st.session_state[CLE_EXECUTION] = []
+    except Exception:
+        pass
+
+def historique():
+    """Copie de l'historique des mesures, toutes sessions confondues"""
+    with _verrou:
+        return list(_historique)
+
+def afficher_hud():
+    """
+    Affiche le HUD de performances en bas de page : sections de l'exécution courante,
+    médianes de l'historique et export JSON
+
+    La barre latérale étant masquée par la mise en page, le HUD est un panneau repliable.
+    """
+    if not profil_actif():
+        return
+
+    mesures = st.session_state.get(CLE_EXECUTION, [])
+    with st.expander("⏱️ Performances de la page", expanded=False):
+        if not mesures:
+            st.info("Aucune section mesurée pendant cette exécution.")
+        else:
+            df = pd.DataFrame(mesures)
+            # Les sections sont enregistrées à leur fin : elles sont remises dans l'ordre de début
+            df = df.sort_values('ordre')
+            df['section'] = ["\u2003" * profondeur + section for profondeur, section in zip(df['profondeur'], df['section'])]
+            st.dataframe(
+                df[['section', 'duree_ms', 'sql_ms', 'pandas_ms', 'lignes_sql', 'octets_envoyes']],
+                column_config={
+                    "section": "Section",
+                    "duree_ms": st.column_config.NumberColumn("Durée (ms)", format="%.1f"),
+                    "sql_ms": st.column_config.NumberColumn("SQL (ms)", format="%.1f"),
+                    "pandas_ms": st.column_config.NumberColumn("pandas (ms)", format="%.1f"),
+                    "lignes_sql": st.column_config.NumberColumn("Lignes lues", format="%d"),
+                    "octets_envoyes": st.column_config.NumberColumn("Octets envoyés", format="%d"),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+            if not mesure_envois_disponible():
+                st.caption(f"Octets envoyés inconnus : mesure non prise en charge par Streamlit {st.__version__}.")
+
+        mesures_historique = historique()
+        if mesures_historique:
+            df_historique = pd.DataFrame(mesures_historique)
+            st.caption(f"Historique : {len(df_historique)} mesures (médianes par section)")
+            st.dataframe(
+                df_historique.groupby('chemin')
+                .agg(appels=('duree_ms', 'size'), duree_ms=('duree_ms', 'median'),
+                     sql_ms=('sql_ms', 'median'), pandas_ms=('pandas_ms', 'median'))
+                .sort_values('duree_ms', ascending=False)
+                .round(1),
+                use_container_width=True
+            )
+            st.download_button(
+                "Exporter l'historique (JSON)",
+                data=json.dumps(mesures_historique, ensure_ascii=False, indent=2),
+                file_name=f"profil_vues_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                key="profil_vues_export"
+            )
@@ -0,0 +1,82 @@
+import pandas as pd
+from ..config import METHODE_CLASSEMENT
+
+def _classer(df, colonne, groupes, methode):
+    """Classe les valeurs d'une colonne par ordre décroissant au sein de chaque groupe"""
+    if groupes:
+        rangs = df.groupby(groupes)[colonne].rank(method=methode, ascending=False)
+    else:
+        rangs = df[colonne].rank(method=methode, ascending=False)
+    return [None if pd.isna(rang) else int(rang) for rang in rangs]
+
+def calculer_rangs(conn, semestre, annee_scolaire, methode=METHODE_CLASSEMENT):
+    """
+    Calcule et enregistre tous les rangs d'un semestre en un seul passage vectorisé
+
+    Rangs calculés pour les moyennes générales et pour chaque discipline :
+    dans la classe, dans le niveau et dans l'établissement. Les trois rangs sont
+    toujours réécrits (méthode de classement incluse) et restent donc cohérents ;
+    le rang fourni par PLANETE est conservé à part dans rang_import.
+    Seule la dernière ligne importée de chaque élève (et discipline) est classée :
+    les lignes des imports précédents ne comptent pas dans l'effectif des groupes.
+
+    Args:
+        conn: Connexion à la base de données (la validation reste à la charge de l'appelant)
+        semestre: Semestre (1 ou 2)
+        annee_scolaire: Libellé de l'année scolaire
+        methode: "min" (classement avec sauts) ou "dense"
+
+    Returns:
+        tuple (nombre de moyennes classées, nombre de notes classées)
+    """
+    table_moyennes = f"Moyennes_Generales_S{semestre}"
+    table_notes = f"Notes_S{semestre}"
+    cursor = conn.cursor()
+
+    # Moyennes générales
+    df_moy = pd.read_sql_query(f"""
+        SELECT mg.id, mg.moyenne, i.id_classe, c.id_niveau
+        FROM {table_moyennes} mg
+        JOIN Eleves e ON mg.ien = e.ien
+        JOIN Inscriptions i ON i.ien = mg.ien AND i.annee_scolaire = mg.annee_scolaire
+        JOIN Classes c ON i.id_classe = c.id
+        WHERE mg.annee_scolaire = ?
+          AND mg.id IN (SELECT MAX(id) FROM {table_moyennes} WHERE annee_scolaire = ? GROUP BY ien)
+    """, conn, params=(annee_scolaire, annee_scolaire))
+
+    if not df_moy.empty:
+        cursor.executemany(f"""
+            UPDATE {table_moyennes}
+            SET rang = ?, rang_niveau = ?, rang_etablissement = ?
+            WHERE id = ?
+        """, zip(
+            _classer(df_moy, 'moyenne', ['id_classe'], methode),
+            _classer(df_moy, 'moyenne', ['id_niveau'], methode),
+            _classer(df_moy, 'moyenne', None, methode),
+            df_moy['id'].tolist()
+        ))
+
+    # Notes par discipline
+    df_notes = pd.read_sql_query(f"""
+        SELECT notes.id, notes.id_discipline, notes.moy_d, i.id_classe, c.id_niveau
+        FROM {table_notes} notes
+        JOIN Eleves e ON notes.ien = e.ien
+        JOIN Inscriptions i ON i.ien = notes.ien AND i.annee_scolaire = notes.annee_scolaire
+        JOIN Classes c ON i.id_classe = c.id
+        WHERE notes.annee_scolaire = ?
+          AND notes.id IN (SELECT MAX(id) FROM {table_notes} WHERE annee_scolaire = ? GROUP BY ien, id_discipline)
+    """, conn, params=(annee_scolaire, annee_scolaire))
+
+    if not df_notes.empty:
+        cursor.executemany(f"""
+            UPDATE {table_notes}
+            SET rang_d = ?, rang_d_niveau = ?, rang_d_etablissement = ?
+            WHERE id = ?
+        """, zip(
+            _classer(df_notes, 'moy_d', ['id_discipline', 'id_classe'], methode),
+            _classer(df_notes, 'moy_d', ['id_discipline', 'id_niveau'], methode),
+            _classer(df_notes, 'moy_d', ['id_discipline'], methode),
+            df_notes['id'].tolist()
+        ))
+
+    return len(df_moy), len(df_notes)
@@ -0,0 +1,237 @@
+import pandas as pd
+from .stats_utils import resume_statistiques, statistiques_groupees, tableau_statistiques, COLONNES_STATISTIQUES
+from .export_utils import exporter, nom_feuille, lignes_requete
+
+# Colonnes affichées pour le détail d'une discipline
+COLONNES_DISCIPLINE = ['prenom', 'nom', 'moy_dd', 'comp_d', 'moy_d', 'rang_d']
+
+def construire_rapport_classe(conn, semestre, annee_scolaire, id_classe):
+    """
+    Rassemble toutes les données d'un rapport de classe en deux requêtes
+
+    Les moyennes générales et l'ensemble des notes de la classe sont lues une seule
+    fois ; les notes sont ensuite pivotées en matrice élève × discipline et les
+    statistiques par discipline sont calculées en un passage par le noyau commun.
+
+    Args:
+        conn: Connexion à la base de données
+        semestre: Semestre (1 ou 2)
+        annee_scolaire: Libellé de l'année scolaire
+        id_classe: Identifiant de la classe
+
+    Returns:
+        dict avec les clés :
+            'eleves': moyennes générales des élèves (triées par rang)
+            'stats': statistiques de la classe (dict)
+            'notes': notes au format long (une ligne par élève et discipline)
+            'matrice': moyennes par discipline, une ligne par élève et une colonne par discipline
+            'stats_disciplines': statistiques par discipline (DataFrame)
+            'disciplines': liste de tuples (discipline, DataFrame du détail)
+    """
+    df_eleves = pd.read_sql_query(f"""
+        WITH mg AS (
+            SELECT * FROM Moyennes_Generales_S{semestre}
+            WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ? GROUP BY ien)
+        )
+        SELECT e.ien, e.prenom, e.nom, e.sexe, mg.moyenne, mg.rang,
+               mg.retard, mg.absence, mg.conseil_discipline, mg.appreciation
+        FROM Inscriptions i
+        JOIN Eleves e ON i.ien = e.ien
+        JOIN mg ON i.ien = mg.ien AND mg.annee_scolaire = i.annee_scolaire
+        WHERE i.id_classe = ? AND i.annee_scolaire = ?
+        ORDER BY mg.rang
+    """, conn, params=(annee_scolaire, id_classe, annee_scolaire))
+
+    df_notes = pd.read_sql_query(f"""
+        WITH notes AS (
+            SELECT * FROM Notes_S{semestre}
+            WHERE id IN (SELECT MAX(id) FROM Notes_S{semestre} WHERE annee_scolaire = ? GROUP BY ien, id_discipline)
+        )
+        SELECT e.ien, e.prenom, e.nom, d.libelle as discipline,
+               notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d
+        FROM Inscriptions i
+        JOIN Eleves e ON i.ien = e.ien
+        JOIN notes ON i.ien = notes.ien AND notes.annee_scolaire = i.annee_scolaire
+        JOIN Disciplines d ON notes.id_discipline = d.id
+        WHERE i.id_classe = ? AND i.annee_scolaire = ?
+        ORDER BY d.libelle, notes.rang_d
+    """, conn, params=(annee_scolaire, id_classe, annee_scolaire))
+
+    if df_notes.empty:
+        matrice = pd.DataFrame(columns=['ien', 'prenom', 'nom'])
+        stats_disciplines = pd.DataFrame(columns=COLONNES_STATISTIQUES)
+    else:
+        # En cas de réimport, la dernière note lue l'emporte
+        matrice = df_notes.pivot_table(
+            index=['ien', 'prenom', 'nom'], columns='discipline', values='moy_d', aggfunc='last'
+        ).reset_index()
+        matrice.columns.name = None
+        stats_disciplines = statistiques_groupees(df_notes['moy_d'], df_notes['discipline'])
+
+    return {
+        'eleves': df_eleves,
+        'stats': resume_statistiques(df_eleves['moyenne']),
+        'notes': df_notes,
+        'matrice': matrice,
+        'stats_disciplines': stats_disciplines,
+        'disciplines': [
+            (discipline, groupe[COLONNES_DISCIPLINE].reset_index(drop=True))
+            for discipline, groupe in df_notes.groupby('discipline', sort=True)
+        ],
+    }
+
+def tableau_statistiques_classe(stats):
+    """Présente les statistiques d'une classe sous forme de tableau Métrique / Valeur"""
+    return pd.DataFrame({
+        'Métrique': ['Effectif', 'Moyenne de classe', 'Élèves ≥ 10', 'Taux de réussite',
+                     'Médiane', 'Écart-type', 'Min', 'Max'],
+        'Valeur': [stats['effectif'], stats['moyenne'], stats['nb_moyenne'], f"{stats['taux_reussite']}%",
+                   stats['mediane'], stats['ecart_type'], stats['min'], stats['max']]
+    })
+
+def classeur_rapport_classe(rapport, inclure_disciplines=True):
+    """
+    Écrit un rapport de classe dans un classeur Excel en mémoire
+
+    Args:
+        rapport: dict issu de construire_rapport_classe
+        inclure_disciplines: Ajouter la matrice des notes et une feuille par discipline
+
+    Returns:
+        bytes: Contenu du fichier Excel
+    """
+    feuilles = [
+        ('Moyennes_Generales', rapport['eleves']),
+        ('Statistiques', tableau_statistiques_classe(rapport['stats'])),
+    ]
+
+    if inclure_disciplines and rapport['disciplines']:
+        feuilles.append(('Stats_Disciplines', rapport['stats_disciplines'].rename_axis('discipline').reset_index()))
+        feuilles.append(('Notes_Par_Discipline', rapport['matrice']))
+        feuilles.extend((nom_feuille(discipline), df_disc) for discipline, df_disc in rapport['disciplines'])
+
+    return exporter(feuilles, "xlsx")
+
+def construire_statistiques_globales(conn, semestre, annee_scolaire):
+    """
+    Statistiques de l'établissement : ensemble, par niveau, par classe et par discipline
+
+    Deux requêtes (moyennes générales et notes) alimentent le noyau commun.
+
+    Args:
+        conn: Connexion à la base de données
+        semestre: Semestre (1 ou 2)
+        annee_scolaire: Libellé de l'année scolaire
+
+    Returns:
+        dict : 'global' (dict de statistiques) et DataFrames 'niveaux', 'classes' et 'disciplines'
+    """
+    df_moyennes = pd.read_sql_query(f"""
+        WITH mg AS (
+            SELECT * FROM Moyennes_Generales_S{semestre}
+            WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ? GROUP BY ien)
+        )
+        SELECT n.libelle as niveau, c.libelle as classe, mg.moyenne
+        FROM mg
+        JOIN Eleves e ON mg.ien = e.ien
+        JOIN Inscriptions i ON i.ien = mg.ien AND i.annee_scolaire = mg.annee_scolaire
+        JOIN Classes c ON i.id_classe = c.id
+        JOIN Niveaux n ON c.id_niveau = n.id
+        WHERE mg.annee_scolaire = ?
+    """, conn, params=(annee_scolaire, annee_scolaire))
+
+    df_notes = pd.read_sql_query(f"""
+        WITH notes AS (
+            SELECT * FROM Notes_S{semestre}
+            WHERE id IN (SELECT MAX(id) FROM Notes_S{semestre} WHERE annee_scolaire = ? GROUP BY ien, id_discipline)
+        )
+        SELECT d.libelle as discipline, notes.moy_d
+        FROM notes
+        JOIN Disciplines d ON notes.id_discipline = d.id
+        WHERE notes.annee_scolaire = ?
+    """, conn, params=(annee_scolaire, annee_scolaire))
+
+    return {
+        'global': resume_statistiques(df_moyennes['moyenne']),
+        'niveaux': tableau_statistiques(
+            statistiques_groupees(df_moyennes['moyenne'], df_moyennes['niveau']), 'niveau'),
+        'classes': tableau_statistiques(
+            statistiques_groupees(df_moyennes['moyenne'], df_moyennes[['niveau', 'classe']]), ['niveau', 'classe']),
+        'disciplines': tableau_statistiques(
+            statistiques_groupees(df_notes['moy_d'], df_notes['discipline']), 'discipline'),
+    }
+
+def feuilles_statistiques_globales(statistiques):
+    """
+    Feuilles de l'export du rapport statistique global
+
+    Args:
+        statistiques: dict issu de construire_statistiques_globales
+
+    Returns:
+        list de tuples (nom de feuille, DataFrame)
+    """
+    stats_global = statistiques['global']
+    feuilles = [('Stats_Globales', pd.DataFrame({
+        'Métrique': ['Nombre d\'élèves', 'Moyenne générale', 'Élèves ≥ 10', 'Taux de réussite'],
+        'Valeur': [stats_global['effectif'], stats_global['moyenne'], stats_global['nb_moyenne'],
+                   f"{stats_global['taux_reussite']}%"]
+    }))]
+
+    for nom, cle in [('Stats_Par_Niveau', 'niveaux'), ('Stats_Par_Classe', 'classes'),
+                     ('Stats_Par_Discipline', 'disciplines')]:
+        if not statistiques[cle].empty:
+            feuilles.append((nom, statistiques[cle]))
+    return feuilles
+
+def feuilles_rapport_discipline(conn, semestre, annee_scolaire, id_discipline, statistiques,
+                                par_niveau=True, par_sexe=True):
+    """
+    Feuilles de l'export du rapport par discipline
+
+    Le détail des élèves n'est lu qu'à l'écriture du fichier, par lots.
+
+    Args:
+        conn: Connexion à la base de données (doit rester ouverte jusqu'à l'écriture)
+        semestre: Semestre (1 ou 2)
+        annee_scolaire: Libellé de l'année scolaire
+        id_discipline: Identifiant de la discipline
+        statistiques: dict issu de calculer_statistiques_discipline
+        par_niveau: Ajouter les statistiques par niveau
+        par_sexe: Ajouter les statistiques par sexe
+
+    Returns:
+        list de tuples (nom de feuille, source)
+    """
+    stats_global = statistiques['global']
+    feuilles = [('Stats_Globales', pd.DataFrame({
+        'Métrique': ['Nombre d\'élèves', 'Moyenne générale', 'Taux de réussite'],
+        'Valeur': [stats_global['effectif'], stats_global['moyenne'], f"{stats_global['taux_reussite']}%"]
+    }))]
+
+    if par_niveau:
+        feuilles.append(('Stats_Par_Niveau', tableau_statistiques(statistiques['niveau'], 'niveau')))
+
+    if par_sexe:
+        df_sexe = tableau_statistiques(statistiques['sexe'], 'sexe')
+        df_sexe['sexe'] = df_sexe['sexe'].replace({'M': 'Garçons', 'F': 'Filles'})
+        feuilles.append(('Stats_Par_Sexe', df_sexe))
+
+    query = f"""
+        WITH notes AS (
+            SELECT * FROM Notes_S{semestre}
+            WHERE id IN (SELECT MAX(id) FROM Notes_S{semestre} WHERE annee_scolaire = ? GROUP BY ien, id_discipline)
+        )
+        SELECT n.libelle as niveau, c.libelle as classe,
+               e.ien, e.prenom, e.nom, e.sexe,
+               notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d
+        FROM notes
+        JOIN Eleves e ON notes.ien = e.ien
+        JOIN Inscriptions i ON i.ien = notes.ien AND i.annee_scolaire = notes.annee_scolaire
+        JOIN Classes c ON i.id_classe = c.id
+        JOIN Niveaux n ON c.id_niveau = n.id
+        WHERE notes.id_discipline = ? AND notes.annee_scolaire = ?
+        ORDER BY n.libelle, c.libelle, notes.rang_d
+    """
+    feuilles.append(('Détails_Élèves', lambda: lignes_requete(conn, query, (annee_scolaire, id_discipline, annee_scolaire))))
+    return feuilles
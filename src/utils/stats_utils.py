@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from .db_utils import get_db_connection
+
+# Seuil de réussite (moyenne sur 20)
+SEUIL_REUSSITE = 10
+
+# Tranches de mentions : une note appartient à la tranche [borne, borne suivante[
+BORNES_MENTIONS = [10, 12, 14, 16]
+LIBELLES_MENTIONS = ["Insuffisant", "Assez Bien", "Bien", "Très Bien", "Excellent"]
+
+# Colonnes produites par le noyau de statistiques
+COLONNES_STATISTIQUES = [
+    'effectif', 'moyenne', 'mediane', 'ecart_type', 'min', 'max', 'q1', 'q3',
+    'nb_moyenne', 'taux_reussite'
+] + LIBELLES_MENTIONS
+
+def _quantile_trie(valeurs, debut, effectif, q):
+    """Quantile par interpolation linéaire (comme pandas) sur des segments déjà triés"""
+    position = debut + q * np.maximum(effectif - 1, 0)
+    bas = np.floor(position).astype(int)
+    haut = np.ceil(position).astype(int)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (position - bas)
+
+def statistiques_groupees(valeurs, groupes=None, seuil=SEUIL_REUSSITE):
+    """
+    Calcule toutes les statistiques descriptives par groupe en un seul passage NumPy
+
+    Les valeurs sont triées une fois par (groupe, valeur) ; les sommes, écarts-types
+    et effectifs par mention sont obtenus par np.bincount, les min/max/quantiles
+    par lecture directe des segments triés. Les valeurs manquantes sont ignorées.
+
+    Args:
+        valeurs: Série ou tableau des notes
+        groupes: Série, DataFrame (regroupement sur plusieurs colonnes) ou None pour un seul groupe
+        seuil: Note minimale de réussite
+
+    Returns:
+        DataFrame indexé par groupe (colonnes COLONNES_STATISTIQUES)
+    """
+    valeurs = np.asarray(valeurs, dtype=float)
+
+    if groupes is None:
+        codes = np.zeros(len(valeurs), dtype=int)
+        cles = pd.Index(["Ensemble"])
+    elif isinstance(groupes, pd.DataFrame):
+        codes, cles = pd.MultiIndex.from_frame(groupes).factorize(sort=True)
+    else:
+        codes, cles = pd.factorize(pd.Series(groupes), sort=True)
+        cles = pd.Index(cles, name=getattr(groupes, 'name', None))
+
+    nb_groupes = len(cles)
+    masque = ~np.isnan(valeurs) & (codes >= 0)
+    valeurs, codes = valeurs[masque], codes[masque]
+
+    # Un seul tri : par groupe puis par valeur
+    ordre = np.lexsort((valeurs, codes))
+    valeurs, codes = valeurs[ordre], codes[ordre]
+
+    effectif = np.bincount(codes, minlength=nb_groupes)
+    somme = np.bincount(codes, weights=valeurs, minlength=nb_groupes)
+    debut = np.concatenate(([0], np.cumsum(effectif)[:-1]))
+    non_vide = effectif > 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moyenne = somme / effectif
+        ecarts = np.bincount(codes, weights=(valeurs - moyenne[codes]) ** 2, minlength=nb_groupes)
+        ecart_type = np.sqrt(ecarts / (effectif - 1))
+    ecart_type[effectif < 2] = np.nan
+
+    resultats = {
+        'effectif': effectif,
+        'moyenne': moyenne,
+        'ecart_type': ecart_type,
+    }
+
+    # Min, max et quantiles lus dans les segments triés
+    if len(valeurs):
+        debut_sur = np.where(non_vide, debut, 0)
+        for nom, q in [('min', 0.0), ('q1', 0.25), ('mediane', 0.5), ('q3', 0.75), ('max', 1.0)]:
+            resultats[nom] = np.where(non_vide, _quantile_trie(valeurs, debut_sur, effectif, q), np.nan)
+    else:
+        for nom in ['min', 'q1', 'mediane', 'q3', 'max']:
+            resultats[nom] = np.full(nb_groupes, np.nan)
+
+    resultats['nb_moyenne'] = np.bincount(codes, weights=(valeurs >= seuil).astype(float), minlength=nb_groupes).astype(int)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        resultats['taux_reussite'] = np.where(non_vide, resultats['nb_moyenne'] / effectif * 100, 0)
+
+    # Effectifs par mention : une seule passe sur les indices (groupe, tranche)
+    tranches = np.digitize(valeurs, BORNES_MENTIONS)
+    nb_tranches = len(LIBELLES_MENTIONS)
+    mentions = np.bincount(codes * nb_tranches + tranches, minlength=nb_groupes * nb_tranches)
+    mentions = mentions.reshape(nb_groupes, nb_tranches)
+    for i, libelle in enumerate(LIBELLES_MENTIONS):
+        resultats[libelle] = mentions[:, i]
+
+    df = pd.DataFrame(resultats, index=cles)[COLONNES_STATISTIQUES]
+    colonnes_reelles = ['moyenne', 'mediane', 'ecart_type', 'min', 'max', 'q1', 'q3', 'taux_reussite']
+    df[colonnes_reelles] = df[colonnes_reelles].round(2)
+    return df
+
+def resume_statistiques(valeurs, seuil=SEUIL_REUSSITE):
+    """
+    Statistiques d'une seule série sous forme de dictionnaire (cartes de statistiques)
+
+    Args:
+        valeurs: Série ou tableau des notes
+        seuil: Note minimale de réussite
+
+    Returns:
+        dict avec les clés de COLONNES_STATISTIQUES
+    """
+    return statistiques_groupees(valeurs, seuil=seuil).to_dict('records')[0]
+
+def tableau_statistiques(df_stats, libelle):
+    """
+    Met en forme des statistiques groupées pour l'affichage et l'export
+
+    Args:
+        df_stats: DataFrame issu de statistiques_groupees
+        libelle: Nom de la colonne recevant les clés de regroupement (liste pour un regroupement multiple)
+
+    Returns:
+        DataFrame (libelle, nb_eleves, moyenne, nb_moyenne, taux_reussite)
+    """
+    libelles = [libelle] if isinstance(libelle, str) else list(libelle)
+    df = df_stats.rename_axis(libelles).reset_index()
+    df = df.rename(columns={'effectif': 'nb_eleves'})
+    return df[libelles + ['nb_eleves', 'moyenne', 'nb_moyenne', 'taux_reussite']]
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def statistiques_classe(semestre, annee_scolaire, id_classe, version):
+    """
+    Statistiques des moyennes générales d'une classe (résultat mis en cache)
+
+    Args:
+        semestre: Semestre (1 ou 2)
+        annee_scolaire: Libellé de l'année scolaire
+        id_classe: Identifiant de la classe
+        version: Version des données (get_version_donnees) : toute écriture invalide le cache
+
+    Returns:
+        dict de statistiques
+    """
+    conn = get_db_connection()
+    try:
+        df = pd.read_sql_query(f"""
+            WITH mg AS (
+                SELECT * FROM Moyennes_Generales_S{semestre}
+                WHERE id IN (SELECT MAX(id) FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ? GROUP BY ien)
+            )
+            SELECT mg.moyenne
+            FROM Inscriptions i
+            JOIN mg ON i.ien = mg.ien AND mg.annee_scolaire = i.annee_scolaire
+            WHERE i.id_classe = ? AND i.annee_scolaire = ?
+        """, conn, params=(annee_scolaire, id_classe, annee_scolaire))
+    finally:
+        conn.close()
+
+    return resume_statistiques(df['moyenne'])
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def statistiques_discipline(semestre, annee_scolaire, id_discipline, version, id_classe=None):
+    """Version mise en cache de calculer_statistiques_discipline, clé comprise la version des données"""
+    conn = get_db_connection()
+    try:
+        return calculer_statistiques_discipline(conn, semestre, annee_scolaire, id_discipline, id_classe)
+    finally:
+        conn.close()
+
+def calculer_statistiques_discipline(conn, semestre, annee_scolaire, id_discipline, id_classe=None):
+    """
+    Statistiques d'une discipline : ensemble, par niveau, par classe et par sexe
+
+    Les notes sont lues en une seule requête (dernière ligne importée par élève)
+    puis passées au noyau pour chaque regroupement.
+
+    Args:
+        conn: Connexion à la base de données
+        semestre: Semestre (1 ou 2)
+        annee_scolaire: Libellé de l'année scolaire
+        id_discipline: Identifiant de la discipline
+        id_classe: Restreindre à une classe (facultatif)
+
+    Returns:
+        dict : 'global' (dict de statistiques) et DataFrames 'niveau', 'classe' et 'sexe'
+    """
+    query = f"""
+        WITH notes AS (
+            SELECT * FROM Notes_S{semestre}
+            WHERE id IN (SELECT MAX(id) FROM Notes_S{semestre} WHERE annee_scolaire = ? GROUP BY ien, id_discipline)
+        )
+        SELECT n.libelle as niveau, c.libelle as classe, e.sexe, notes.moy_d
+        FROM notes
+        JOIN Eleves e ON notes.ien = e.ien
+        JOIN Inscriptions i ON i.ien = notes.ien AND i.annee_scolaire = notes.annee_scolaire
+        JOIN Classes c ON i.id_classe = c.id
+        JOIN Niveaux n ON c.id_niveau = n.id
+        WHERE notes.id_discipline = ? AND notes.annee_scolaire = ?
+    """
+    params = [annee_scolaire, id_discipline, annee_scolaire]
+    if id_classe is not None:
+        query += " AND i.id_classe = ?"
+        params.append(id_classe)
+
+    df = pd.read_sql_query(query, conn, params=params)
+
+    return {
+        'global': resume_statistiques(df['moy_d']),
+        'niveau': statistiques_groupees(df['moy_d'], df['niveau']),
+        'classe': statistiques_groupees(df['moy_d'], df[['niveau', 'classe']]),
+        'sexe': statistiques_groupees(df['moy_d'], df['sexe']),
+    }
@@ -0,0 +1,241 @@
+import re
+import sys
+import time
+import sqlite3
+import threading
+from collections import deque
+from ..config import TRACE_SQL, TRACE_SQL_TAILLE, TRACE_SQL_APPELANTS, SEUIL_REQUETE_LENTE_MS
+from .metriques_utils import observer_requete
+
+# Normalisation du texte des requêtes : littéraux remplacés par ?, listes IN réduites, espaces compactés
+_RE_CHAINES = re.compile(r"'(?:[^']|'')*'")
+_RE_NOMBRES = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTES = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACES = re.compile(r"\s+")
+
+# Modules ignorés lors de la recherche de l'appelant d'une requête
+_MODULES_INTERNES = (__name__, "src.utils.db_utils")
+# Cadres de pile examinés au plus pour trouver l'appelant
+_PROFONDEUR_APPELANT = 32
+APPELANT_NON_RELEVE = "non relevé"
+
+_verrou = threading.Lock()
+_journal = deque(maxlen=TRACE_SQL_TAILLE)
+_lentes = deque(maxlen=TRACE_SQL_TAILLE)
+_agregats = {}
+_actif = TRACE_SQL
+_appelants = TRACE_SQL_APPELANTS
+
+# Cumul du temps SQL et des lignes par thread (lu par le profileur de vues)
+_par_thread = threading.local()
+
+def normaliser(requete):
+    """Texte d'une requête sans ses littéraux ni ses variations d'espacement (clé de regroupement)"""
+    texte = _RE_CHAINES.sub("?", requete)
+    texte = _RE_NOMBRES.sub("?", texte)
+    texte = _RE_LISTES.sub("(?, ...)", texte)
+    return _RE_ESPACES.sub(" ", texte).strip()
+
+def _appelant():
+    """Fonction de l'application à l'origine de la requête (vue de préférence, sinon module utilitaire)"""
+    if not _appelants:
+        return APPELANT_NON_RELEVE
+    frame = sys._getframe(2)
+    utilitaire = None
+    for _ in range(_PROFONDEUR_APPELANT):
+        if frame is None:
+            break
+        module = frame.f_globals.get('__name__', '')
+        if ".views." in module:
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        if utilitaire is None and module.startswith("src.") and module not in _MODULES_INTERNES:
+            utilitaire = f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return utilitaire or "autre"
+
+def _enregistrer(requete, params):
+    """Ajoute une exécution au journal et retourne son entrée (complétée pendant la lecture des lignes)"""
+    entree = {
+        'horodatage': time.time(),
+        'requete': normaliser(requete),
+        'sql': requete,
+        'params': params,
+        'duree_ms': 0.0,
+        'lignes': 0,
+        'appelant': _appelant(),
+        'lente': False,
+    }
+    with _verrou:
+        _journal.append(entree)
+        agregat = _agregats.get(entree['requete'])
+        if agregat is None:
+            agregat = _agregats[entree['requete']] = {
+                'requete': entree['requete'], 'executions': 0, 'duree_totale_ms': 0.0,
+                'duree_max_ms': 0.0, 'lignes': 0, 'appelants': set(), 'exemple': entree,
+            }
+        agregat['executions'] += 1
+        agregat['appelants'].add(entree['appelant'])
+    return entree
+
+def _completer(entree, duree, lignes=0):
+    """Ajoute un temps (secondes) et un nombre de lignes à une exécution déjà enregistrée"""
+    duree_ms = duree * 1000
+    _par_thread.duree_ms = getattr(_par_thread, 'duree_ms', 0.0) + duree_ms
+    _par_thread.lignes = getattr(_par_thread, 'lignes', 0) + lignes
+    with _verrou:
+        entree['duree_ms'] += duree_ms
+        entree['lignes'] += lignes
+        agregat = _agregats.get(entree['requete'])
+        if agregat is not None:
+            agregat['duree_totale_ms'] += duree_ms
+            agregat['lignes'] += lignes
+            if entree['duree_ms'] > agregat['duree_max_ms']:
+                agregat['duree_max_ms'] = entree['duree_ms']
+                agregat['exemple'] = entree
+        if not entree['lente'] and entree['duree_ms'] >= SEUIL_REQUETE_LENTE_MS:
+            entree['lente'] = True
+            _lentes.append(entree)
+
+class CurseurTrace(sqlite3.Cursor):
+    """Curseur chronométrant chaque requête et comptant les lignes lues ou modifiées"""
+
+    _entree = None
+
+    def execute(self, requete, params=()):
+        self._entree = entree = _enregistrer(requete, params)
+        debut = time.perf_counter()
+        try:
+            return super().execute(requete, params)
+        finally:
+            duree = time.perf_counter() - debut
+            _completer(entree, duree, max(self.rowcount, 0))
+            observer_requete(requete, duree)
+
+    def executemany(self, requete, seq_params):
+        # Séquence transmise telle quelle : un générateur reste consommé au fil de l'insertion.
+        # Les paramètres d'exemple ne sont conservés que pour une liste ; rowcount cumule les lignes modifiées.
+        exemple = seq_params[0] if isinstance(seq_params, (list, tuple)) and seq_params else None
+        self._entree = entree = _enregistrer(requete, exemple)
+        debut = time.perf_counter()
+        try:
+            return super().executemany(requete, seq_params)
+        finally:
+            duree = time.perf_counter() - debut
+            _completer(entree, duree, max(self.rowcount, 0))
+            observer_requete(requete, duree)
+
+    def _lire(self, lecture, *args):
+        debut = time.perf_counter()
+        resultat = lecture(*args)
+        if self._entree is not None:
+            nb = len(resultat) if isinstance(resultat, list) else int(resultat is not None)
+            _completer(self._entree, time.perf_counter() - debut, nb)
+        return resultat
+
+    def fetchone(self):
+        return self._lire(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._lire(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._lire(super().fetchall)
+
+    def __next__(self):
+        ligne = self._lire(super().fetchone)
+        if ligne is None:
+            raise StopIteration
+        return ligne
+
+class ConnexionTrace(sqlite3.Connection):
+    """Connexion dont tous les curseurs (y compris ceux de conn.execute et de pandas) sont tracés"""
+
+    def cursor(self, factory=CurseurTrace):
+        return super().cursor(factory)
+
+    def execute(self, requete, params=()):
+        return self.cursor().execute(requete, params)
+
+    def executemany(self, requete, seq_params):
+        return self.cursor().executemany(requete, seq_params)
+
+def fabrique_connexion():
+    """Classe de connexion à passer à sqlite3.connect (connexion standard si le traçage est désactivé)"""
+    return ConnexionTrace if _actif else sqlite3.Connection
+
+def activer_trace(actif):
+    """Active ou désactive le traçage des nouvelles connexions"""
+    global _actif
+    _actif = actif
+
+def trace_active():
+    return _actif
+
+def activer_appelants(actif):
+    """Active ou désactive la recherche de la fonction appelante (parcours de la pile à chaque requête)"""
+    global _appelants
+    _appelants = actif
+
+def appelants_actifs():
+    return _appelants
+
+def compteurs_thread():
+    """Temps SQL (ms) et lignes cumulés depuis le démarrage du thread courant"""
+    return getattr(_par_thread, 'duree_ms', 0.0), getattr(_par_thread, 'lignes', 0)
+
+def vider_journal():
+    """Efface le journal, les requêtes lentes et les agrégats"""
+    with _verrou:
+        _journal.clear()
+        _lentes.clear()
+        _agregats.clear()
+
+def _copie_agregat(agregat):
+    copie = dict(agregat)
+    copie['appelants'] = sorted(agregat['appelants'])
+    copie['duree_moyenne_ms'] = agregat['duree_totale_ms'] / agregat['executions'] if agregat['executions'] else 0
+    return copie
+
+def requetes_agregees(tri="duree_totale_ms", limite=20):
+    """
+    Requêtes normalisées triées par durée totale, durée maximale ou nombre d'exécutions
+
+    Args:
+        tri: "duree_totale_ms", "duree_max_ms", "duree_moyenne_ms" ou "executions"
+        limite: Nombre de requêtes retournées (toutes si None)
+
+    Returns:
+        list de dict : 'requete', 'executions', 'duree_totale_ms', 'duree_moyenne_ms',
+        'duree_max_ms', 'lignes', 'appelants' et 'exemple' (exécution la plus lente)
+    """
+    with _verrou:
+        agregats = [_copie_agregat(agregat) for agregat in _agregats.values()]
+    return sorted(agregats, key=lambda agregat: agregat[tri], reverse=True)[:limite]
+
+def requetes_lentes(limite=100):
+    """Dernières exécutions ayant dépassé SEUIL_REQUETE_LENTE_MS (les plus récentes d'abord)"""
+    with _verrou:
+        return list(_lentes)[::-1][:limite]
+
+def nombre_requetes():
+    """Nombre d'exécutions présentes dans le journal glissant"""
+    with _verrou:
+        return len(_journal)
+
+def plan_requete(conn, requete, params=()):
+    """
+    Plan d'exécution d'une requête (EXPLAIN QUERY PLAN), indenté selon l'arborescence
+
+    La requête n'est pas exécutée : seuls ses paramètres sont liés (aucun pour
+    un executemany alimenté par un générateur).
+
+    Returns:
+        list de str, une ligne par étape du plan
+    """
+    lignes = conn.execute(f"EXPLAIN QUERY PLAN {requete}", params or ()).fetchall()
+    profondeurs = {0: -1}
+    plan = []
+    for identifiant, parent, _, detail in lignes:
+        profondeurs[identifiant] = profondeurs.get(parent, -1) + 1
+        plan.append("  " * profondeurs[identifiant] + detail)
+    return plan
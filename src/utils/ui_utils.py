@@ -0,0 +1,196 @@
+import pandas as pd
+import streamlit as st
+from .db_utils import get_db_connection
+
+# st.fragment (Streamlit >= 1.37), st.experimental_fragment (1.33 à 1.36)
+_FRAGMENT = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+FRAGMENTS_DISPONIBLES = _FRAGMENT is not None
+
+def fragment(fonction):
+    """
+    Déclare une section de page réexécutable seule
+
+    Un widget modifié à l'intérieur d'un fragment ne relance que ce fragment, et non
+    tout le script (initialisation de la base, barre latérale, année active...).
+    Sur une version de Streamlit sans fragments, la fonction est exécutée normalement.
+    """
+    if _FRAGMENT is None:
+        return fonction
+    return _FRAGMENT(fonction)
+
+# Nombre de lignes affichées par page dans les tableaux paginés
+TAILLE_PAGE = 50
+
+def _valeur_sql(valeur):
+    """Convertit une valeur pandas/NumPy en type accepté par sqlite3"""
+    if valeur is None or (isinstance(valeur, float) and valeur != valeur):
+        return None
+    return valeur.item() if hasattr(valeur, 'item') else valeur
+
+def page_requete(conn, requete, params, tri, cle_unique, descendant=False,
+                 filtre="", colonnes_recherche=(), curseur=None, limite=TAILLE_PAGE):
+    """
+    Lit une page d'une requête par pagination par clé (keyset)
+
+    La requête de base se termine par sa clause WHERE : le filtre, la condition de
+    curseur et l'ordre y sont ajoutés sur les colonnes des tables de base, si bien
+    qu'un index (annee_scolaire, tri, id) sert à la fois la condition et l'ordre
+    sans trier tout le résultat. La page suivante est celle des lignes strictement
+    après le curseur dans l'ordre (tri, cle_unique) : (tri, id) > (?, ?) ORDER BY
+    tri, id LIMIT ?. cle_unique doit être unique (identifiant de ligne) pour
+    qu'aucune ligne ne soit sautée entre deux pages. Les NULL de la colonne de tri
+    viennent en tête en ordre croissant et en fin en ordre décroissant (ordre de SQLite).
+
+    Args:
+        conn: Connexion à la base de données
+        requete: Requête SELECT de base, terminée par sa clause WHERE
+        params: Paramètres de la requête de base
+        tri: Expression de tri sur une table de base (ex: "mg.rang")
+        cle_unique: Expression unique départageant les ex aequo (ex: "mg.id")
+        descendant: Tri décroissant
+        filtre: Texte recherché (LIKE, insensible à la casse ASCII) dans colonnes_recherche
+        colonnes_recherche: Expressions concernées par le filtre (ex: "e.nom")
+        curseur: tuple (valeur de tri, valeur unique) de la dernière ligne de la page précédente
+        limite: Nombre maximal de lignes lues
+
+    Returns:
+        DataFrame de la page
+    """
+    conditions, valeurs = _filtre_sql(filtre, colonnes_recherche)
+
+    if curseur is not None:
+        condition, valeurs_curseur = _condition_curseur(tri, cle_unique, curseur, descendant)
+        conditions.append(condition)
+        valeurs.extend(valeurs_curseur)
+
+    ordre = "DESC" if descendant else "ASC"
+    where = "".join(f" AND {condition}" for condition in conditions)
+    return pd.read_sql_query(f"""
+        {requete}{where}
+        ORDER BY {tri} {ordre}, {cle_unique} {ordre}
+        LIMIT ?
+    """, conn, params=list(params) + valeurs + [limite])
+
+def _condition_curseur(tri, cle_unique, curseur, descendant):
+    """Lignes situées après le curseur dans l'ordre (tri, cle_unique), NULL compris"""
+    valeur, unique = curseur
+    if valeur is None:
+        if descendant:
+            return f"{tri} IS NULL AND {cle_unique} < ?", [unique]
+        return f"(({tri} IS NULL AND {cle_unique} > ?) OR {tri} IS NOT NULL)", [unique]
+    if descendant:
+        return f"(({tri}, {cle_unique}) < (?, ?) OR {tri} IS NULL)", [valeur, unique]
+    return f"({tri}, {cle_unique}) > (?, ?)", [valeur, unique]
+
+def compter_lignes(conn, requete, params, filtre="", colonnes_recherche=()):
+    """Nombre de lignes de la requête (terminée par sa clause WHERE) après filtre"""
+    conditions, valeurs = _filtre_sql(filtre, colonnes_recherche)
+    where = "".join(f" AND {condition}" for condition in conditions)
+    return conn.execute(
+        f"SELECT COUNT(*) FROM ({requete}{where})", list(params) + valeurs
+    ).fetchone()[0]
+
+def _filtre_sql(filtre, colonnes_recherche):
+    if not filtre or not colonnes_recherche:
+        return [], []
+    conditions = " OR ".join(f"{colonne} LIKE ?" for colonne in colonnes_recherche)
+    return [f"({conditions})"], [f"%{filtre}%"] * len(colonnes_recherche)
+
+def _changer_page(cle, curseur):
+    etat = st.session_state[cle]
+    if curseur is None:
+        etat['curseurs'].pop()
+    else:
+        etat['curseurs'].append(curseur)
+
+def tableau_pagine(cle, requete, params=(), expressions=None, colonnes_tri=None, colonne_unique="id",
+                   colonnes_recherche=(), taille_page=TAILLE_PAGE, column_config=None,
+                   tri_defaut=None, descendant_defaut=False):
+    """
+    Affiche le résultat d'une requête page par page, avec tri et recherche côté serveur
+
+    Seule la page visible est lue dans la base et envoyée au navigateur. La colonne
+    unique (identifiant de ligne) sert de curseur mais n'est pas affichée.
+
+    Args:
+        cle: Identifiant unique du tableau dans la page (clé des widgets et de l'état)
+        requete: Requête SELECT de base, terminée par sa clause WHERE (voir page_requete)
+        params: Paramètres de la requête
+        expressions: dict {colonne du résultat: expression SQL sur une table de base}
+            pour les colonnes de tri, de recherche et la colonne unique
+        colonnes_tri: dict {colonne: libellé} des tris proposés
+        colonne_unique: Colonne unique départageant les ex aequo (identifiant de ligne)
+        colonnes_recherche: Colonnes interrogées par le champ de recherche
+        taille_page: Nombre de lignes par page
+        column_config: Configuration des colonnes de st.dataframe
+        tri_defaut: Colonne de tri initiale (première de colonnes_tri par défaut)
+        descendant_defaut: Ordre initial décroissant
+    """
+    expressions = expressions or {}
+    colonnes_tri = colonnes_tri or {colonne_unique: colonne_unique}
+    tri_defaut = tri_defaut or next(iter(colonnes_tri))
+    cle_etat = f"pagination_{cle}"
+
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        filtre = st.text_input("Rechercher", key=f"{cle}_filtre", placeholder="Nom, prénom...") if colonnes_recherche else ""
+    with col2:
+        tri = st.selectbox("Trier par", options=list(colonnes_tri), format_func=colonnes_tri.get,
+                           index=list(colonnes_tri).index(tri_defaut), key=f"{cle}_tri")
+    with col3:
+        descendant = st.selectbox("Ordre", options=[False, True], index=int(descendant_defaut),
+                                  format_func=lambda d: "Décroissant" if d else "Croissant", key=f"{cle}_ordre")
+
+    # Toute modification de la requête, du tri ou du filtre ramène à la première page
+    signature = (requete, tuple(params), tri, descendant, filtre)
+    etat = st.session_state.get(cle_etat)
+    if etat is None or etat['signature'] != signature:
+        etat = st.session_state[cle_etat] = {'signature': signature, 'curseurs': []}
+
+    recherche = [expressions.get(colonne, colonne) for colonne in colonnes_recherche]
+    conn = get_db_connection()
+    try:
+        total = compter_lignes(conn, requete, params, filtre, recherche)
+        curseur = etat['curseurs'][-1] if etat['curseurs'] else None
+        # Une ligne de plus que la page indique s'il existe une page suivante
+        df_page = page_requete(conn, requete, params, expressions.get(tri, tri),
+                               expressions.get(colonne_unique, colonne_unique), descendant,
+                               filtre, recherche, curseur, taille_page + 1)
+    finally:
+        conn.close()
+
+    page_suivante = len(df_page) > taille_page
+    df_page = df_page.head(taille_page)
+
+    st.dataframe(df_page.drop(columns=colonne_unique), column_config=column_config,
+                 hide_index=True, use_container_width=True)
+
+    numero = len(etat['curseurs'])
+    debut = numero * taille_page
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        st.button("◀ Précédent", key=f"{cle}_precedent", disabled=numero == 0,
+                  on_click=_changer_page, args=(cle_etat, None), use_container_width=True)
+    with col2:
+        if total:
+            st.caption(f"Lignes {debut + 1} à {debut + len(df_page)} sur {total} — page {numero + 1} / {-(-total // taille_page)}")
+        else:
+            st.caption("Aucune ligne")
+    with col3:
+        derniere = df_page.iloc[-1] if not df_page.empty else None
+        suivant = None if derniere is None else (
+            _valeur_sql(derniere[tri]), _valeur_sql(derniere[colonne_unique])
+        )
+        st.button("Suivant ▶", key=f"{cle}_suivant", disabled=not page_suivante,
+                  on_click=_changer_page, args=(cle_etat, suivant), use_container_width=True)
+
+def apercu_pagine(cle, df, taille_page=TAILLE_PAGE):
+    """Affiche un DataFrame déjà chargé page par page (seule la page visible est envoyée)"""
+    nb_pages = max(-(-len(df) // taille_page), 1)
+    if nb_pages > 1:
+        page = st.number_input(f"Page (sur {nb_pages})", min_value=1, max_value=nb_pages, value=1, key=f"{cle}_page")
+    else:
+        page = 1
+    debut = (page - 1) * taille_page
+    st.dataframe(df.iloc[debut:debut + taille_page], use_container_width=True)
+    st.caption(f"Lignes {min(debut + 1, len(df))} à {min(debut + taille_page, len(df))} sur {len(df)}")
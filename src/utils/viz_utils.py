@@ -1,12 +1,131 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
-import numpy as np
+from .stats_utils import statistiques_groupees
+
+# Plotly n'est importé qu'au premier graphique : les pages sans graphique
+# (accueil, paramètres, importation) ne paient pas son temps de chargement.
+
+# Les graphiques reçoivent des données agrégées côté serveur : la taille de la
+# figure envoyée au navigateur ne dépend pas du nombre d'élèves représentés.
+NB_CLASSES_HISTOGRAMME = 20
+NOTE_MIN, NOTE_MAX = 0, 20
+MAX_POINTS_NUAGE = 2000
 
-def plot_distribution_moyennes(df, title="Distribution des moyennes", column="Moy"):
+COULEURS_SEXE = {'Garçons': '#3498db', 'Filles': '#e74c3c'}
+
+def histogramme(valeurs, nb_classes=NB_CLASSES_HISTOGRAMME, borne_min=NOTE_MIN, borne_max=NOTE_MAX):
+    """
+    Compte les valeurs par classe d'égale largeur (valeurs manquantes ignorées)
+
+    Les valeurs hors de [borne_min, borne_max] sont rattachées à la première ou
+    à la dernière classe.
+
+    Returns:
+        tuple (centres des classes, effectifs, largeur d'une classe)
+    """
+    valeurs = np.asarray(valeurs, dtype=float)
+    valeurs = np.clip(valeurs[~np.isnan(valeurs)], borne_min, borne_max)
+    effectifs, bornes = np.histogram(valeurs, bins=nb_classes, range=(borne_min, borne_max))
+    largeur = (borne_max - borne_min) / nb_classes
+    return bornes[:-1] + largeur / 2, effectifs, largeur
+
+def quartiles_boites(valeurs, groupes):
+    """
+    Calcule les éléments d'une boîte à moustaches par groupe
+
+    Les moustaches suivent la règle de Tukey (comme Plotly) : elles s'arrêtent à la
+    valeur la plus extrême située à moins de 1,5 écart interquartile de la boîte.
+
+    Returns:
+        DataFrame indexé par groupe (q1, mediane, q3, moyenne, moustache_basse, moustache_haute)
+    """
+    valeurs = pd.Series(np.asarray(valeurs, dtype=float))
+    groupes = pd.Series(np.asarray(groupes))
+    stats = statistiques_groupees(valeurs, groupes)
+    stats = stats[stats['effectif'] > 0]
+
+    ecart = stats['q3'] - stats['q1']
+    limite_basse = groupes.map(stats['q1'] - 1.5 * ecart)
+    limite_haute = groupes.map(stats['q3'] + 1.5 * ecart)
+
+    boites = stats[['q1', 'mediane', 'q3', 'moyenne']].copy()
+    boites['moustache_basse'] = valeurs[valeurs >= limite_basse].groupby(groupes).min()
+    boites['moustache_haute'] = valeurs[valeurs <= limite_haute].groupby(groupes).max()
+    return boites
+
+def echantillonner(df, max_points=MAX_POINTS_NUAGE):
+    """
+    Réduit un DataFrame à au plus max_points lignes régulièrement espacées
+
+    L'ordre des lignes est conservé : triées au préalable, elles gardent l'allure
+    de la courbe ou du nuage d'origine.
+    """
+    if len(df) <= max_points:
+        return df
+    positions = np.linspace(0, len(df) - 1, max_points).round().astype(int)
+    return df.iloc[np.unique(positions)]
+
+# Nombre de figures gardées en mémoire par figure_barres (les moins récemment utilisées sont évincées)
+TAILLE_CACHE_FIGURES = 128
+
+@st.cache_resource(show_spinner=False, max_entries=TAILLE_CACHE_FIGURES)
+def figure_barres(df, x, y, titre, etiquettes, plage_y, palette="Bold", inclinaison_x=0, taille_graduations_x=12):
+    """
+    Crée un graphique en barres (une couleur par barre) avec la mise en forme de l'application
+    
+    La figure est mémorisée : la clé combine l'empreinte du contenu de df et tous
+    les paramètres du graphique. Tant que les données ne changent pas, une
+    réexécution de la page réutilise la figure sans la reconstruire. La figure
+    renvoyée est partagée et ne doit pas être modifiée par l'appelant.
+    
+    Args:
+        df: DataFrame agrégé (une ligne par barre)
+        x: Colonne de l'axe x (catégories)
+        y: Colonne de l'axe y
+        titre: Titre du graphique
+        etiquettes: dict {colonne: libellé affiché}
+        plage_y: tuple (min, max) de l'axe y
+        palette: Nom d'une palette qualitative Plotly ("Bold", "Pastel"...)
+        inclinaison_x: Angle des libellés de l'axe x
+        taille_graduations_x: Taille de police des libellés de l'axe x
+    
+    Returns:
+        fig: Figure Plotly
+    """
+    import plotly.express as px
+    
+    fig = px.bar(
+        df,
+        x=x,
+        y=y,
+        color=x,
+        title=titre,
+        labels=etiquettes,
+        color_discrete_sequence=getattr(px.colors.qualitative, palette)
+    )
+    
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Arial", size=12),
+        margin=dict(l=20, r=20, t=40, b=20),
+        legend_title_text="",
+        xaxis=dict(
+            title=dict(font=dict(size=14)),
+            tickfont=dict(size=taille_graduations_x),
+            tickangle=inclinaison_x
+        ),
+        yaxis=dict(
+            title=dict(font=dict(size=14)),
+            tickfont=dict(size=12),
+            range=list(plage_y)
+        )
+    )
+    
+    return fig
+
+def plot_distribution_moyennes(df, title="Distribution des moyennes", column="Moy", couleur='#3498db'):
     """
     Crée un histogramme de distribution des moyennes
     
@@ -14,19 +133,26 @@ def plot_distribution_moyennes(df, title="Distribution des moyennes", column="Mo
         df: DataFrame contenant une colonne de moyennes
         title: Titre du graphique
         column: Nom de la colonne à utiliser pour l'axe x
+        couleur: Couleur des barres
     
     Returns:
         fig: Figure Plotly
     """
-    fig = px.histogram(
-        df, 
-        x=column, 
-        nbins=20,
-        color_discrete_sequence=['#3498db'],
-        title=title
-    )
+    import plotly.graph_objects as go
+    
+    centres, effectifs, largeur = histogramme(df[column])
+    
+    fig = go.Figure(go.Bar(
+        x=centres,
+        y=effectifs,
+        width=largeur * 0.9,
+        marker_color=couleur,
+        hovertemplate="%{customdata}<br>%{y} élève(s)<extra></extra>",
+        customdata=[f"[{c - largeur / 2:g} ; {c + largeur / 2:g}[" for c in centres]
+    ))
     
     fig.update_layout(
+        title=title,
         xaxis_title="Moyenne",
         yaxis_title="Nombre d'élèves",
         bargap=0.1
@@ -46,32 +172,77 @@ def plot_repartition_par_sexe(df, column="Moy", title="Répartition par sexe"):
     Returns:
         fig: Figure Plotly
     """
+    import plotly.graph_objects as go
+    
     # Support both lowercase and proper case column
-    df_copy = df.copy()
-    if 'sexe' in df_copy.columns:
-        df_copy.rename(columns={'sexe': 'Sexe'}, inplace=True)
-    if 'Sexe' not in df_copy.columns:
+    colonne_sexe = 'sexe' if 'sexe' in df.columns else 'Sexe'
+    if colonne_sexe not in df.columns:
         st.warning("La colonne 'Sexe' n'est pas disponible dans les données.")
         return None
     # Remplacer les valeurs de sexe pour plus de clarté
-    df_copy['Sexe'] = df_copy['Sexe'].replace({'M': 'Garçons', 'F': 'Filles'})
+    sexes = df[colonne_sexe].replace({'M': 'Garçons', 'F': 'Filles'})
     
-    fig = px.box(
-        df_copy, 
-        x="Sexe", 
-        y=column,
-        color="Sexe",
-        title=title,
-        color_discrete_map={'Garçons': '#3498db', 'Filles': '#e74c3c'}
-    )
+    # Quartiles calculés ici : seules cinq valeurs par boîte sont transmises
+    boites = quartiles_boites(df[column], sexes)
+    
+    fig = go.Figure()
+    for sexe, boite in boites.iterrows():
+        fig.add_trace(go.Box(
+            name=sexe,
+            x=[sexe],
+            q1=[boite['q1']],
+            median=[boite['mediane']],
+            q3=[boite['q3']],
+            mean=[boite['moyenne']],
+            lowerfence=[boite['moustache_basse']],
+            upperfence=[boite['moustache_haute']],
+            marker_color=COULEURS_SEXE.get(sexe)
+        ))
     
     fig.update_layout(
+        title=title,
         xaxis_title="Sexe",
         yaxis_title=column
     )
     
     return fig
 
+def plot_nuage_points(df, x, y, title="", couleur='#3498db', max_points=MAX_POINTS_NUAGE):
+    """
+    Crée un nuage de points limité à max_points points
+    
+    Au-delà, un échantillon régulier (après tri sur x) est affiché et le titre
+    indique la taille de l'échantillon.
+    
+    Args:
+        df: DataFrame contenant les colonnes x et y
+        x: Colonne de l'axe x
+        y: Colonne de l'axe y
+        title: Titre du graphique
+        couleur: Couleur des points
+        max_points: Nombre maximal de points transmis
+    
+    Returns:
+        fig: Figure Plotly
+    """
+    import plotly.graph_objects as go
+    
+    donnees = df[[x, y]].dropna()
+    echantillon = echantillonner(donnees.sort_values(x), max_points)
+    if len(echantillon) < len(donnees):
+        title = f"{title} (échantillon de {len(echantillon)} sur {len(donnees)})"
+    
+    fig = go.Figure(go.Scattergl(
+        x=echantillon[x],
+        y=echantillon[y],
+        mode='markers',
+        marker=dict(color=couleur, size=6, opacity=0.7)
+    ))
+    
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    
+    return fig
+
 def plot_comparaison_disciplines(df, disciplines, title="Comparaison des disciplines"):
     """
     Crée un graphique radar pour comparer les moyennes par discipline
@@ -84,6 +255,8 @@ def plot_comparaison_disciplines(df, disciplines, title="Comparaison des discipl
     Returns:
         fig: Figure Plotly
     """
+    import plotly.graph_objects as go
+    
     # Calculer les moyennes par discipline
     moyennes = []
     for discipline in disciplines:
@@ -115,48 +288,78 @@ def plot_comparaison_disciplines(df, disciplines, title="Comparaison des discipl
     
     return fig
 
-def plot_evolution_semestres(df_s1, df_s2, title="Évolution entre les deux semestres"):
+def plot_evolution_semestres(df_groupes, groupe="classe", title="Évolution entre les deux semestres"):
     """
-    Crée un graphique pour comparer les moyennes entre S1 et S2
+    Crée un graphique comparant les moyennes S1 et S2 par groupe (classe, niveau, discipline)
     
     Args:
-        df_s1: DataFrame contenant les moyennes du S1
-        df_s2: DataFrame contenant les moyennes du S2
+        df_groupes: DataFrame agrégé contenant les colonnes groupe, 'moyenne_s1' et 'moyenne_s2'
+        groupe: Nom de la colonne de regroupement pour l'axe x
         title: Titre du graphique
     
     Returns:
         fig: Figure Plotly
     """
-    # Fusionner les données
-    df_merged = pd.merge(
-        df_s1[['IEN', 'Moy']], 
-        df_s2[['IEN', 'Moy']], 
-        on='IEN', 
-        suffixes=('_S1', '_S2')
-    )
-    
-    # Calculer la progression
-    df_merged['Evolution'] = df_merged['Moy_S2'] - df_merged['Moy_S1']
+    import plotly.graph_objects as go
     
-    # Créer le graphique
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
-        x=df_merged['IEN'],
-        y=df_merged['Evolution'],
-        marker_color=['#2ecc71' if x >= 0 else '#e74c3c' for x in df_merged['Evolution']],
-        name='Évolution'
+        x=df_groupes[groupe],
+        y=df_groupes['moyenne_s1'],
+        name='Semestre 1',
+        marker_color='#3498db'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=df_groupes[groupe],
+        y=df_groupes['moyenne_s2'],
+        name='Semestre 2',
+        marker_color='#2ecc71'
     ))
     
     fig.update_layout(
         title=title,
-        xaxis_title="Élèves (IEN)",
-        yaxis_title="Évolution (points)",
-        xaxis=dict(
-            tickmode='array',
-            tickvals=df_merged['IEN'],
-            ticktext=[f"Élève {i+1}" for i in range(len(df_merged))]
-        )
+        barmode='group',
+        xaxis_title=groupe.capitalize(),
+        yaxis_title="Moyenne",
+        yaxis=dict(range=[0, 20])
+    )
+    
+    return fig
+
+def plot_repartition_evolution(df_groupes, tranches, groupe="niveau", title="Répartition des évolutions"):
+    """
+    Crée un histogramme empilé du nombre d'élèves par tranche d'évolution et par groupe
+    
+    Args:
+        df_groupes: DataFrame agrégé contenant une colonne par tranche
+        tranches: Liste ordonnée des colonnes de tranches
+        groupe: Nom de la colonne de regroupement pour l'axe x
+        title: Titre du graphique
+    
+    Returns:
+        fig: Figure Plotly
+    """
+    import plotly.graph_objects as go
+    
+    couleurs = ['#c0392b', '#e74c3c', '#95a5a6', '#2ecc71', '#27ae60']
+    
+    fig = go.Figure()
+    
+    for tranche, couleur in zip(tranches, couleurs):
+        fig.add_trace(go.Bar(
+            x=df_groupes[groupe],
+            y=df_groupes[tranche],
+            name=tranche,
+            marker_color=couleur
+        ))
+    
+    fig.update_layout(
+        title=title,
+        barmode='stack',
+        xaxis_title=groupe.capitalize(),
+        yaxis_title="Nombre d'élèves"
     )
     
     return fig
@@ -4,7 +4,15 @@ import os
 import sqlite3
 from ..config import DB_PATH
 from ..utils.db_utils import get_db_connection
-from ..utils.viz_utils import plot_evolution_semestres
+from ..utils.viz_utils import plot_evolution_semestres, plot_repartition_evolution
+from ..utils.comparaison_utils import comparer_eleves, comparer_disciplines, agreger_evolution, plus_fortes_evolutions, LIBELLES_EVOLUTION
+from ..utils.decision_utils import appliquer_decisions
+from ..utils.ecriture_utils import ecrire
+from ..utils.profil_utils import profiler
+from ..utils.archive_utils import connexion_historique, tendances_annuelles
+from ..utils.cohorte_utils import (
+    trajectoires_a_jour, calculer_trajectoires, cohortes_disponibles, suivi_cohorte, disciplines_cohorte, parcours_eleve
+)
 
 def show_general_view():
     """Affiche le module Général"""
@@ -14,8 +22,10 @@ def show_general_view():
     # Barre latérale pour la navigation interne
     page = st.sidebar.radio(
         "Navigation Module Général",
-        ["Analyse Moyennes", "Analyse Disciplines", "Comparaison des semestres", "Décision finale", "Rapports annuels"],
-        captions=["Moyennes annuelles", "Performance par discipline", "Évolution S1 vs S2", "Résultats finaux", "Rapports de synthèse"]
+        ["Analyse Moyennes", "Analyse Disciplines", "Comparaison des semestres", "Décision finale", "Rapports annuels",
+         "Tendances pluriannuelles", "Suivi de cohortes"],
+        captions=["Moyennes annuelles", "Performance par discipline", "Évolution S1 vs S2", "Résultats finaux", "Rapports de synthèse",
+                  "Années archivées comprises", "Parcours d'une année à l'autre"]
     )
     
     # Afficher la page correspondante
@@ -29,7 +39,12 @@ def show_general_view():
         show_decisions_finales()
     elif page == "Rapports annuels":
         show_rapports_annuels()
+    elif page == "Tendances pluriannuelles":
+        show_tendances_pluriannuelles()
+    elif page == "Suivi de cohortes":
+        show_suivi_cohortes()
 
+@profiler
 def show_moyennes_analysis():
     """Affiche l'analyse des moyennes annuelles"""
     
@@ -58,6 +73,7 @@ def show_moyennes_analysis():
     st.info("Module en cours de développement. Veuillez commencer par utiliser les modules Semestre 1 et Semestre 2.")
     conn.close()
 
+@profiler
 def show_disciplines_analysis():
     """Affiche l'analyse par discipline sur l'année"""
     
@@ -86,6 +102,7 @@ def show_disciplines_analysis():
     st.info("Module en cours de développement. Veuillez commencer par utiliser les modules Semestre 1 et Semestre 2.")
     conn.close()
 
+@profiler
 def show_semestres_comparison():
     """Affiche la comparaison entre les deux semestres"""
     
@@ -111,9 +128,76 @@ def show_semestres_comparison():
         conn.close()
         return
     
-    st.info("Module en cours de développement. Veuillez commencer par utiliser les modules Semestre 1 et Semestre 2.")
+    cursor.execute("SELECT libelle FROM Annee_Scolaire WHERE etat = 'actif' LIMIT 1")
+    annee_result = cursor.fetchone()
+    
+    if not annee_result:
+        st.warning("Aucune année scolaire active. Veuillez configurer l'année scolaire dans les paramètres.")
+        conn.close()
+        return
+    
+    annee_scolaire = annee_result[0]
+    
+    df_eleves = comparer_eleves(conn, annee_scolaire)
+    df_disciplines = comparer_disciplines(conn, annee_scolaire)
     conn.close()
+    
+    if df_eleves.empty:
+        st.info(f"Aucun élève n'a de moyenne aux deux semestres pour l'année scolaire {annee_scolaire}.")
+        return
+    
+    # Indicateurs globaux
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Élèves comparés", len(df_eleves))
+    col2.metric("Moyenne S1", round(df_eleves['moyenne_s1'].mean(), 2))
+    col3.metric("Moyenne S2", round(df_eleves['moyenne_s2'].mean(), 2),
+                delta=round(df_eleves['evolution'].mean(), 2))
+    col4.metric("Élèves en progression", int((df_eleves['evolution'] > 0).sum()))
+    
+    # Évolution par niveau
+    df_niveaux = agreger_evolution(df_eleves, ['niveau'])
+    st.markdown("#### Évolution par niveau")
+    st.dataframe(df_niveaux, hide_index=True, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(plot_evolution_semestres(df_niveaux, "niveau", "Moyennes S1 / S2 par niveau"), use_container_width=True)
+    with col2:
+        st.plotly_chart(plot_repartition_evolution(df_niveaux, LIBELLES_EVOLUTION, "niveau"), use_container_width=True)
+    
+    # Évolution par classe
+    df_classes = agreger_evolution(df_eleves, ['niveau', 'classe'])
+    df_classes['classe'] = df_classes['niveau'] + " " + df_classes['classe']
+    st.markdown("#### Évolution par classe")
+    st.dataframe(df_classes, hide_index=True, use_container_width=True)
+    st.plotly_chart(plot_evolution_semestres(df_classes, "classe", "Moyennes S1 / S2 par classe"), use_container_width=True)
+    
+    # Évolution par discipline
+    if not df_disciplines.empty:
+        st.markdown("#### Évolution par discipline")
+        st.dataframe(df_disciplines, hide_index=True, use_container_width=True)
+        st.plotly_chart(plot_evolution_semestres(df_disciplines, "discipline", "Moyennes S1 / S2 par discipline"), use_container_width=True)
+    
+    # Plus fortes évolutions individuelles
+    nb_eleves = st.number_input("Nombre d'élèves à afficher", min_value=1, max_value=100, value=10)
+    progressions, regressions = plus_fortes_evolutions(df_eleves, nb_eleves)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Plus fortes progressions")
+        st.dataframe(progressions, hide_index=True, use_container_width=True)
+    with col2:
+        st.markdown("#### Plus fortes régressions")
+        st.dataframe(regressions, hide_index=True, use_container_width=True)
+    
+    st.download_button(
+        label="📥 Télécharger les évolutions par élève en CSV",
+        data=df_eleves.to_csv(index=False).encode('utf-8'),
+        file_name=f"Evolution_S1_S2_{annee_scolaire}.csv",
+        mime="text/csv"
+    )
 
+@profiler
 def show_decisions_finales():
     """Affiche les décisions finales"""
     
@@ -139,9 +223,133 @@ def show_decisions_finales():
         conn.close()
         return
     
-    st.info("Module en cours de développement. Veuillez commencer par utiliser les modules Semestre 1 et Semestre 2.")
+    cursor.execute("SELECT libelle FROM Annee_Scolaire WHERE etat = 'actif' LIMIT 1")
+    annee_result = cursor.fetchone()
+    
+    if not annee_result:
+        st.warning("Aucune année scolaire active. Veuillez configurer l'année scolaire dans les paramètres.")
+        conn.close()
+        return
+    
+    annee_scolaire = annee_result[0]
+    
+    # Règles de décision modifiables
+    with st.expander("Règles de décision"):
+        st.caption("Les règles sont évaluées par priorité croissante : la première règle satisfaite détermine la décision. "
+                   "Les bornes minimales sont incluses, les bornes maximales exclues, une case vide est ignorée. "
+                   "Conseil de discipline : 1 = requis, 0 = absent.")
+        
+        regles_db = pd.read_sql_query("SELECT * FROM Regles_Decision ORDER BY priorite, id", conn)
+        
+        edited_regles = st.data_editor(
+            regles_db,
+            column_config={
+                "id": st.column_config.NumberColumn("ID", disabled=True),
+                "priorite": st.column_config.NumberColumn("Priorité", required=True),
+                "decision": st.column_config.SelectboxColumn(
+                    "Décision",
+                    options=["Passage", "Redoublement", "Exclusion", "Orientation"],
+                    required=True
+                ),
+                "niveau": st.column_config.TextColumn("Niveau"),
+                "moyenne_min": st.column_config.NumberColumn("Moyenne min", format="%.2f"),
+                "moyenne_max": st.column_config.NumberColumn("Moyenne max", format="%.2f"),
+                "absence_min": st.column_config.NumberColumn("Absences min"),
+                "absence_max": st.column_config.NumberColumn("Absences max"),
+                "retard_min": st.column_config.NumberColumn("Retards min"),
+                "retard_max": st.column_config.NumberColumn("Retards max"),
+                "conseil_discipline": st.column_config.NumberColumn("Conseil de discipline", min_value=0, max_value=1),
+                "etat": st.column_config.SelectboxColumn("État", options=["actif", "inactif"], required=True)
+            },
+            hide_index=True,
+            num_rows="dynamic",
+            key="regles_decision_editor"
+        )
+        
+        if st.button("Enregistrer les règles"):
+            colonnes = ['priorite', 'decision', 'niveau', 'moyenne_min', 'moyenne_max', 'absence_min',
+                        'absence_max', 'retard_min', 'retard_max', 'conseil_discipline', 'etat']
+            
+            ids_conserves = set(edited_regles['id'].dropna().astype(int))
+            
+            def enregistrer_regles(conn_ecriture):
+                # Supprimer les règles retirées du tableau
+                for regle_id in set(regles_db['id']) - ids_conserves:
+                    conn_ecriture.execute("DELETE FROM Regles_Decision WHERE id = ?", (int(regle_id),))
+                
+                for _, row in edited_regles.iterrows():
+                    valeurs = [None if pd.isna(row[col]) else row[col] for col in colonnes]
+                    if not pd.isna(row['id']) and row['id'] in regles_db['id'].values:
+                        conn_ecriture.execute(
+                            f"UPDATE Regles_Decision SET {', '.join(f'{col} = ?' for col in colonnes)} WHERE id = ?",
+                            (*valeurs, int(row['id']))
+                        )
+                    else:
+                        conn_ecriture.execute(
+                            f"INSERT INTO Regles_Decision ({', '.join(colonnes)}) VALUES ({', '.join(['?'] * len(colonnes))})",
+                            valeurs
+                        )
+            
+            ecrire(enregistrer_regles)
+            st.success("✅ Règles enregistrées avec succès")
+    
+    # Calcul des décisions pour toute l'année
+    if st.button("Calculer les décisions finales", type="primary", use_container_width=True):
+        with st.spinner("Calcul des décisions en cours..."):
+            try:
+                df_resultats = appliquer_decisions(annee_scolaire)
+                st.success(f"✅ Décisions calculées pour {len(df_resultats)} élèves")
+            except Exception as e:
+                st.error(f"❌ {str(e)}")
+    
+    # Décisions enregistrées
+    df_decisions = pd.read_sql_query("""
+        SELECT n.libelle as niveau, c.libelle as classe, e.ien, e.prenom, e.nom,
+               df.moyenne_annuelle, df.rang_annuel, df.decision
+        FROM Decisions_Finales df
+        JOIN Eleves e ON df.ien = e.ien
+        LEFT JOIN Inscriptions i ON i.ien = df.ien AND i.annee_scolaire = df.annee_scolaire
+        LEFT JOIN Classes c ON i.id_classe = c.id
+        LEFT JOIN Niveaux n ON c.id_niveau = n.id
+        WHERE df.annee_scolaire = ?
+        ORDER BY n.libelle, c.libelle, df.rang_annuel
+    """, conn, params=(annee_scolaire,))
     conn.close()
+    
+    if df_decisions.empty:
+        st.info(f"Aucune décision enregistrée pour l'année scolaire {annee_scolaire}.")
+        return
+    
+    # Synthèse par niveau
+    st.markdown("#### Synthèse par niveau")
+    df_synthese = pd.crosstab(df_decisions['niveau'], df_decisions['decision'], margins=True, margins_name="Total")
+    st.dataframe(df_synthese, use_container_width=True)
+    
+    st.markdown("#### Décisions par élève")
+    st.dataframe(
+        df_decisions,
+        column_config={
+            "niveau": "Niveau",
+            "classe": "Classe",
+            "ien": st.column_config.TextColumn("IEN"),
+            "prenom": "Prénom",
+            "nom": "Nom",
+            "moyenne_annuelle": st.column_config.NumberColumn("Moyenne annuelle", format="%.2f"),
+            "rang_annuel": st.column_config.NumberColumn("Rang annuel", format="%d"),
+            "decision": "Décision"
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    st.download_button(
+        label="📥 Télécharger les décisions en CSV",
+        data=df_decisions.to_csv(index=False).encode('utf-8'),
+        file_name=f"Decisions_Finales_{annee_scolaire}.csv",
+        mime="text/csv"
+    )
 
+@profiler
 def show_rapports_annuels():
     """Affiche les rapports annuels"""
     
@@ -168,4 +376,119 @@ def show_rapports_annuels():
         return
     
     st.info("Module en cours de développement. Veuillez commencer par utiliser les modules Semestre 1 et Semestre 2.")
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+@profiler
+def show_tendances_pluriannuelles():
+    """Affiche l'évolution des résultats d'une année à l'autre, archives comprises"""
+    
+    st.subheader("Tendances pluriannuelles")
+    
+    if not os.path.exists(DB_PATH):
+        st.info("Aucune donnée disponible. Veuillez importer des données via les modules Semestre 1 et Semestre 2.")
+        return
+    
+    # Les années archivées sont attachées en lecture seule le temps de la requête
+    with connexion_historique() as conn:
+        df_tendances = tendances_annuelles(conn)
+    
+    if df_tendances.empty:
+        st.info("Aucune moyenne enregistrée pour le moment.")
+        return
+    
+    st.dataframe(
+        df_tendances.rename(columns={
+            'annee_scolaire': 'Année scolaire', 'semestre': 'Semestre', 'eleves': 'Élèves',
+            'moyenne': 'Moyenne générale', 'taux_reussite': 'Taux de réussite (%)'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    semestre = st.radio("Semestre", [1, 2], horizontal=True, key="semestre_tendances")
+    df_semestre = df_tendances[df_tendances['semestre'] == semestre].set_index('annee_scolaire')
+    st.line_chart(df_semestre[['moyenne', 'taux_reussite']])
+
+@profiler
+def show_suivi_cohortes():
+    """Affiche le devenir d'une cohorte (un niveau une année donnée) et le parcours d'un élève"""
+    
+    st.subheader("Suivi de cohortes")
+    
+    if not os.path.exists(DB_PATH):
+        st.info("Aucune donnée disponible. Veuillez importer des données via les modules Semestre 1 et Semestre 2.")
+        return
+    
+    # Trajectoires précalculées, recalculées seulement après une modification des données
+    conn = get_db_connection()
+    a_jour = trajectoires_a_jour(conn)
+    conn.close()
+    if not a_jour:
+        with st.spinner("Calcul des trajectoires en cours..."):
+            try:
+                calculer_trajectoires()
+            except Exception as e:
+                st.error(f"❌ Erreur lors du calcul des trajectoires : {str(e)}")
+                return
+    
+    conn = get_db_connection()
+    df_cohortes = cohortes_disponibles(conn)
+    if df_cohortes.empty:
+        st.info("Aucune inscription enregistrée pour le moment.")
+        conn.close()
+        return
+    
+    # Choix de la cohorte
+    options = {
+        f"{row.niveau} {row.annee_scolaire} ({row.effectif} élèves)": (row.annee_scolaire, row.id_niveau)
+        for row in df_cohortes.itertuples(index=False)
+    }
+    selection = st.selectbox("Cohorte", list(options.keys()), key="cohorte_select")
+    annee_scolaire, id_niveau = options[selection]
+    
+    df_suivi = suivi_cohorte(conn, annee_scolaire, id_niveau)
+    df_disciplines = disciplines_cohorte(conn, annee_scolaire, id_niveau)
+    
+    col1, col2, col3 = st.columns(3)
+    derniere = df_suivi.iloc[-1]
+    with col1:
+        st.metric("Effectif initial", int(df_suivi['inscrits'].iloc[0]))
+    with col2:
+        st.metric(f"Rétention en {derniere['annee_scolaire']}", f"{derniere['taux_retention']} %")
+    with col3:
+        st.metric("Redoublements (total)", int(df_suivi['redoublements'].sum()))
+    
+    st.dataframe(
+        df_suivi.rename(columns={
+            'annee_scolaire': 'Année scolaire', 'inscrits': 'Inscrits', 'passages': 'Passages',
+            'redoublements': 'Redoublements', 'sorties': 'Sorties', 'moyenne': 'Moyenne annuelle',
+            'taux_retention': 'Rétention (%)', 'taux_redoublement': 'Redoublement (%)'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    if not df_disciplines.empty:
+        st.write("#### Évolution par discipline")
+        st.line_chart(df_disciplines.pivot(index='annee_scolaire', columns='discipline', values='moyenne'))
+    
+    # Parcours individuel, chargé à la demande
+    st.write("#### Parcours d'un élève")
+    ien = st.text_input("IEN de l'élève", key="cohorte_ien").strip()
+    if ien:
+        df_parcours, df_notes = parcours_eleve(conn, ien)
+        if df_parcours.empty:
+            st.info(f"Aucune inscription trouvée pour l'IEN {ien}.")
+        else:
+            st.dataframe(
+                df_parcours.rename(columns={
+                    'annee_scolaire': 'Année scolaire', 'niveau': 'Niveau', 'classe': 'Classe',
+                    'moyenne_s1': 'Moyenne S1', 'moyenne_s2': 'Moyenne S2', 'moyenne_annuelle': 'Moyenne annuelle',
+                    'decision': 'Décision', 'statut': 'Année suivante'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+            if not df_notes.empty:
+                st.dataframe(df_notes, use_container_width=True)
+    conn.close()
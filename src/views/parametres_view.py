@@ -2,10 +2,24 @@ import streamlit as st
 import pandas as pd
 import os
 import sqlite3
-import shutil
 from datetime import datetime
-from ..config import DB_PATH, DATA_DIR, DEFAULT_ETABLISSEMENT, NIVEAUX
-from ..utils.db_utils import get_db_connection, execute_query, insert_data, update_data
+from ..config import (
+    DATA_DIR, DEFAULT_ETABLISSEMENT, NIVEAUX, SEUIL_REQUETE_LENTE_MS, PROFIL_VUES,
+    METRIQUES_FICHIER, METRIQUES_PORT, METRIQUES_ADRESSE, METRIQUES_INTERVALLE, ARCHIVES_DIR
+)
+from ..utils.db_utils import (
+    get_db_connection, execute_query, insert_data, update_data, sauvegarder_base, restaurer_base, supprimer_base
+)
+from ..utils.ecriture_utils import ecrire
+from ..utils.rang_utils import calculer_rangs
+from ..utils.archive_utils import archiver_annee, reintegrer_annee
+from ..utils.cache_utils import vider_cache_rapports
+from ..utils.trace_utils import (
+    activer_trace, trace_active, activer_appelants, appelants_actifs, vider_journal,
+    requetes_agregees, requetes_lentes, nombre_requetes, plan_requete
+)
+from ..utils.profil_utils import CLE_ACTIF as CLE_PROFIL_VUES
+from ..utils.metriques_utils import exposer
 
 def show_parametres_view():
     """Affiche la page des paramètres de l'application"""
@@ -13,7 +27,7 @@ def show_parametres_view():
     st.title("⚙️ Paramètres")
     
     # Créer des onglets pour les différentes sections de paramètres
-    tab1, tab2, tab3, tab4 = st.tabs(["Informations de base", "Configuration académique", "Année scolaire", "Sauvegarde/Restauration"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Informations de base", "Configuration académique", "Année scolaire", "Sauvegarde/Restauration", "Performances"])
     
     # Onglet 1: Informations de base
     with tab1:
@@ -30,6 +44,10 @@ def show_parametres_view():
     # Onglet 4: Sauvegarde/Restauration
     with tab4:
         show_backup_restore_settings()
+    
+    # Onglet 5: Performances (requêtes SQL tracées)
+    with tab5:
+        show_performance_settings()
 
 def show_info_base_settings():
     """Affiche et gère les paramètres d'informations de base"""
@@ -130,26 +148,23 @@ def show_academic_settings():
         
         # Bouton pour sauvegarder les modifications
         if st.button("Enregistrer les niveaux"):
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            def enregistrer_niveaux(conn):
+                # Pour chaque niveau modifié
+                for _, row in edited_niveaux.iterrows():
+                    if row['id'] in niveaux_db['id'].values:
+                        # Mise à jour
+                        conn.execute(
+                            "UPDATE Niveaux SET libelle = ?, etat = ? WHERE id = ?",
+                            (row['libelle'], row['etat'], row['id'])
+                        )
+                    else:
+                        # Insertion nouveau niveau
+                        conn.execute(
+                            "INSERT INTO Niveaux (libelle, etat) VALUES (?, ?)",
+                            (row['libelle'], row['etat'])
+                        )
             
-            # Pour chaque niveau modifié
-            for _, row in edited_niveaux.iterrows():
-                if row['id'] in niveaux_db['id'].values:
-                    # Mise à jour
-                    cursor.execute(
-                        "UPDATE Niveaux SET libelle = ?, etat = ? WHERE id = ?",
-                        (row['libelle'], row['etat'], row['id'])
-                    )
-                else:
-                    # Insertion nouveau niveau
-                    cursor.execute(
-                        "INSERT INTO Niveaux (libelle, etat) VALUES (?, ?)",
-                        (row['libelle'], row['etat'])
-                    )
-            
-            conn.commit()
-            conn.close()
+            ecrire(enregistrer_niveaux)
             st.success("✅ Niveaux enregistrés avec succès")
             st.experimental_rerun()
     
@@ -200,29 +215,26 @@ def show_academic_settings():
         
         # Bouton pour sauvegarder les modifications
         if st.button("Enregistrer les classes"):
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Pour chaque classe modifiée
-            for _, row in edited_classes.iterrows():
-                # S'assurer que id_niveau est défini
-                row_id_niveau = row.get('id_niveau', niveau_id)
-                
-                if 'id' in row and not pd.isna(row['id']) and row['id'] in classes_db['id'].values:
-                    # Mise à jour
-                    cursor.execute(
-                        "UPDATE Classes SET libelle = ?, effectif = ?, etat = ? WHERE id = ?",
-                        (row['libelle'], row['effectif'], row['etat'], row['id'])
-                    )
-                else:
-                    # Insertion nouvelle classe
-                    cursor.execute(
-                        "INSERT INTO Classes (id_niveau, libelle, effectif, etat) VALUES (?, ?, ?, ?)",
-                        (row_id_niveau, row['libelle'], row['effectif'], row['etat'])
-                    )
+            def enregistrer_classes(conn):
+                # Pour chaque classe modifiée
+                for _, row in edited_classes.iterrows():
+                    # S'assurer que id_niveau est défini
+                    row_id_niveau = row.get('id_niveau', niveau_id)
+                    
+                    if 'id' in row and not pd.isna(row['id']) and row['id'] in classes_db['id'].values:
+                        # Mise à jour
+                        conn.execute(
+                            "UPDATE Classes SET libelle = ?, effectif = ?, etat = ? WHERE id = ?",
+                            (row['libelle'], row['effectif'], row['etat'], row['id'])
+                        )
+                    else:
+                        # Insertion nouvelle classe
+                        conn.execute(
+                            "INSERT INTO Classes (id_niveau, libelle, effectif, etat) VALUES (?, ?, ?, ?)",
+                            (row_id_niveau, row['libelle'], row['effectif'], row['etat'])
+                        )
             
-            conn.commit()
-            conn.close()
+            ecrire(enregistrer_classes)
             st.success("✅ Classes enregistrées avec succès")
             st.experimental_rerun()
 
@@ -248,7 +260,8 @@ def show_school_year_settings():
                 required=True
             ),
             "date_debut": st.column_config.DateColumn("Date début"),
-            "date_fin": st.column_config.DateColumn("Date fin")
+            "date_fin": st.column_config.DateColumn("Date fin"),
+            "fichier_archive": st.column_config.TextColumn("Archive", disabled=True)
         },
         hide_index=True,
         num_rows="dynamic"
@@ -256,34 +269,85 @@ def show_school_year_settings():
     
     # Bouton pour sauvegarder les modifications
     if st.button("Enregistrer les années scolaires"):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Si une année est marquée comme active, désactiver les autres
-        active_years = edited_annees[edited_annees['etat'] == 'actif']
-        if not active_years.empty:
-            active_id = active_years.iloc[0]['id']
-            cursor.execute("UPDATE Annee_Scolaire SET etat = 'inactif' WHERE id != ?", (active_id,))
-        
-        # Pour chaque année modifiée
-        for _, row in edited_annees.iterrows():
-            if row['id'] in annees_db['id'].values:
-                # Mise à jour
-                cursor.execute(
-                    "UPDATE Annee_Scolaire SET libelle = ?, etat = ?, date_debut = ?, date_fin = ? WHERE id = ?",
-                    (row['libelle'], row['etat'], row['date_debut'], row['date_fin'], row['id'])
-                )
-            else:
-                # Insertion nouvelle année
-                cursor.execute(
-                    "INSERT INTO Annee_Scolaire (libelle, etat, date_debut, date_fin) VALUES (?, ?, ?, ?)",
-                    (row['libelle'], row['etat'], row['date_debut'], row['date_fin'])
-                )
+        def enregistrer_annees(conn):
+            # Si une année est marquée comme active, désactiver les autres
+            active_years = edited_annees[edited_annees['etat'] == 'actif']
+            if not active_years.empty:
+                active_id = active_years.iloc[0]['id']
+                conn.execute("UPDATE Annee_Scolaire SET etat = 'inactif' WHERE id != ?", (active_id,))
+            
+            # Pour chaque année modifiée
+            for _, row in edited_annees.iterrows():
+                if row['id'] in annees_db['id'].values:
+                    # Mise à jour
+                    conn.execute(
+                        "UPDATE Annee_Scolaire SET libelle = ?, etat = ?, date_debut = ?, date_fin = ? WHERE id = ?",
+                        (row['libelle'], row['etat'], row['date_debut'], row['date_fin'], row['id'])
+                    )
+                else:
+                    # Insertion nouvelle année
+                    conn.execute(
+                        "INSERT INTO Annee_Scolaire (libelle, etat, date_debut, date_fin) VALUES (?, ?, ?, ?)",
+                        (row['libelle'], row['etat'], row['date_debut'], row['date_fin'])
+                    )
         
-        conn.commit()
-        conn.close()
+        ecrire(enregistrer_annees)
         st.success("✅ Années scolaires enregistrées avec succès")
         st.experimental_rerun()
+    
+    # Recalcul des rangs (classe, niveau, établissement) pour une année
+    st.subheader("Classements")
+    
+    if not annees_db.empty:
+        col1, col2 = st.columns(2)
+        with col1:
+            annee_rangs = st.selectbox("Année scolaire", annees_db['libelle'].tolist(), key="annee_rangs")
+        with col2:
+            semestre_rangs = st.selectbox("Semestre", [1, 2], key="semestre_rangs")
+        
+        if st.button("Recalculer les rangs"):
+            try:
+                nb_moyennes, nb_notes = ecrire(calculer_rangs, semestre_rangs, annee_rangs)
+                st.success(f"✅ Rangs recalculés : {nb_moyennes} moyennes générales et {nb_notes} notes")
+            except Exception as e:
+                st.error(f"Erreur lors du recalcul des rangs : {str(e)}")
+    
+    # Archivage des années closes dans leur propre base (consultées en lecture seule)
+    st.subheader("Archives")
+    
+    annees_inactives = annees_db[(annees_db['etat'] != 'actif') & annees_db['fichier_archive'].isna()]['libelle'].tolist()
+    annees_archives = annees_db[annees_db['fichier_archive'].notna()]['libelle'].tolist()
+    
+    if annees_archives:
+        st.write("Années archivées : " + ", ".join(annees_archives))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if annees_inactives:
+            annee_a_archiver = st.selectbox("Année à archiver", annees_inactives, key="annee_archivage")
+            if st.button("Archiver l'année"):
+                try:
+                    with st.spinner("Archivage en cours..."):
+                        lignes = archiver_annee(annee_a_archiver)
+                    st.success(f"✅ Année {annee_a_archiver} archivée ({sum(lignes.values())} lignes déplacées)")
+                    st.experimental_rerun()
+                except Exception as e:
+                    st.error(f"Erreur lors de l'archivage : {str(e)}")
+        else:
+            st.info("Aucune année inactive à archiver.")
+    with col2:
+        if annees_archives:
+            annee_a_reintegrer = st.selectbox("Année à réintégrer", annees_archives, key="annee_reintegration")
+            if st.button("Réintégrer l'année"):
+                try:
+                    with st.spinner("Réintégration en cours..."):
+                        lignes = reintegrer_annee(annee_a_reintegrer)
+                    st.success(f"✅ Année {annee_a_reintegrer} réintégrée ({sum(lignes.values())} lignes)")
+                    st.experimental_rerun()
+                except Exception as e:
+                    st.error(f"Erreur lors de la réintégration : {str(e)}")
+    
+    st.caption(f"Les archives sont conservées dans {ARCHIVES_DIR} et ne font pas partie des sauvegardes de la base.")
 
 def show_backup_restore_settings():
     """Affiche et gère les paramètres de sauvegarde et restauration"""
@@ -305,9 +369,9 @@ def show_backup_restore_settings():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_file = os.path.join(backup_dir, f"lcams_backup_{timestamp}.db")
             
-            # Copier la base de données
+            # Copier la base de données (journal WAL compris)
             try:
-                shutil.copy2(DB_PATH, backup_file)
+                sauvegarder_base(backup_file)
                 st.success(f"✅ Sauvegarde créée avec succès: {os.path.basename(backup_file)}")
             except Exception as e:
                 st.error(f"❌ Erreur lors de la sauvegarde: {str(e)}")
@@ -336,10 +400,13 @@ def show_backup_restore_settings():
                     try:
                         # Créer une sauvegarde de la base actuelle avant restauration
                         current_backup = os.path.join(backup_dir, f"lcams_pre_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
-                        shutil.copy2(DB_PATH, current_backup)
+                        sauvegarder_base(current_backup)
                         
-                        # Restaurer la sauvegarde
-                        shutil.copy2(backup_path, DB_PATH)
+                        # Restaurer la sauvegarde (après les écritures en attente)
+                        restaurer_base(backup_path)
+                        
+                        # La sauvegarde restaurée peut porter une version de données déjà vue
+                        vider_cache_rapports()
                         st.success("✅ Base de données restaurée avec succès")
                     except Exception as e:
                         st.error(f"❌ Erreur lors de la restauration: {str(e)}")
@@ -365,15 +432,12 @@ def show_backup_restore_settings():
             
             if st.button("Purger les données du semestre"):
                 if annee_scolaire:
-                    conn = get_db_connection()
-                    cursor = conn.cursor()
-                    
-                    # Supprimer les données du semestre spécifié
-                    cursor.execute(f"DELETE FROM Notes_S{semestre} WHERE annee_scolaire = ?", (annee_scolaire,))
-                    cursor.execute(f"DELETE FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ?", (annee_scolaire,))
+                    def purger_semestre(conn):
+                        # Supprimer les données du semestre spécifié
+                        conn.execute(f"DELETE FROM Notes_S{semestre} WHERE annee_scolaire = ?", (annee_scolaire,))
+                        conn.execute(f"DELETE FROM Moyennes_Generales_S{semestre} WHERE annee_scolaire = ?", (annee_scolaire,))
                     
-                    conn.commit()
-                    conn.close()
+                    ecrire(purger_semestre)
                     st.success(f"✅ Données du semestre {semestre} pour l'année {annee_scolaire} supprimées avec succès")
                 else:
                     st.warning("⚠️ Veuillez confirmer l'année scolaire")
@@ -390,11 +454,11 @@ def show_backup_restore_settings():
                     
                     try:
                         # Créer sauvegarde
-                        shutil.copy2(DB_PATH, backup_file)
+                        sauvegarder_base(backup_file)
                         
-                        # Supprimer la base actuelle
-                        if os.path.exists(DB_PATH):
-                            os.remove(DB_PATH)
+                        # Supprimer la base actuelle et ses fichiers de journal
+                        supprimer_base()
+                        vider_cache_rapports()
                         
                         # Réinitialiser la base (sera recréée au prochain démarrage)
                         st.success("✅ Base de données réinitialisée avec succès. Veuillez redémarrer l'application.")
@@ -402,4 +466,138 @@ def show_backup_restore_settings():
                     except Exception as e:
                         st.error(f"❌ Erreur lors de la réinitialisation: {str(e)}")
                 else:
-                    st.warning("⚠️ Confirmation incorrecte")
\ No newline at end of file
+                    st.warning("⚠️ Confirmation incorrecte")
+
+# Critères de tri proposés pour les requêtes tracées
+TRIS_REQUETES = {
+    "Durée totale": "duree_totale_ms",
+    "Durée maximale": "duree_max_ms",
+    "Durée moyenne": "duree_moyenne_ms",
+    "Nombre d'exécutions": "executions",
+}
+
+def show_performance_settings():
+    """Affiche le profilage des pages, les métriques exportées et les requêtes SQL tracées (plus lentes, plus fréquentes, plan d'exécution)"""
+    
+    st.subheader("Temps d'affichage des pages")
+    # Valeur gardée hors de la clé du widget : elle doit survivre à l'affichage des autres pages
+    st.session_state[CLE_PROFIL_VUES] = st.checkbox(
+        "Afficher le panneau de performances en bas de chaque page",
+        value=st.session_state.get(CLE_PROFIL_VUES, PROFIL_VUES),
+        help="Durée, temps SQL, temps pandas et volume envoyé pour chaque section des vues (historique exportable en JSON)"
+    )
+
+    st.subheader("Métriques d'exploitation")
+    exports = []
+    if METRIQUES_FICHIER:
+        exports.append(f"fichier `{METRIQUES_FICHIER}` (toutes les {METRIQUES_INTERVALLE} s)")
+    if METRIQUES_PORT:
+        exports.append(f"http://{METRIQUES_ADRESSE}:{METRIQUES_PORT}/metrics")
+    if exports:
+        st.caption("Export OpenMetrics : " + " et ".join(exports))
+    else:
+        st.caption("Export désactivé : définir LCAMS_METRIQUES_FICHIER et/ou LCAMS_METRIQUES_PORT au lancement.")
+    st.download_button(
+        "Télécharger les métriques (OpenMetrics)",
+        data=exposer(),
+        file_name=f"lcams_metriques_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prom",
+        mime="text/plain"
+    )
+
+    st.subheader("Requêtes SQL")
+
+    actif = st.checkbox("Tracer les requêtes SQL", value=trace_active(),
+                        help="S'applique aux connexions ouvertes après le changement")
+    if actif != trace_active():
+        activer_trace(actif)
+    appelants = st.checkbox("Relever la fonction appelante de chaque requête", value=appelants_actifs(),
+                            help="Parcourt la pile d'appels à chaque requête : à réserver au diagnostic")
+    if appelants != appelants_actifs():
+        activer_appelants(appelants)
+    
+    agregats = requetes_agregees(limite=None)
+    lentes = requetes_lentes()
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Exécutions dans le journal", nombre_requetes())
+    col2.metric("Requêtes distinctes", len(agregats))
+    col3.metric(f"Exécutions ≥ {SEUIL_REQUETE_LENTE_MS} ms", len(lentes))
+    
+    if st.button("Vider le journal"):
+        vider_journal()
+        st.experimental_rerun()
+    
+    if not agregats:
+        st.info("Aucune requête tracée pour le moment. Parcourez l'application puis revenez sur cet onglet.")
+        return
+    
+    tri = st.selectbox("Trier par", list(TRIS_REQUETES.keys()))
+    agregats = requetes_agregees(tri=TRIS_REQUETES[tri], limite=50)
+    
+    df_requetes = pd.DataFrame([{
+        'requete': agregat['requete'],
+        'executions': agregat['executions'],
+        'duree_totale_ms': round(agregat['duree_totale_ms'], 2),
+        'duree_moyenne_ms': round(agregat['duree_moyenne_ms'], 2),
+        'duree_max_ms': round(agregat['duree_max_ms'], 2),
+        'lignes': agregat['lignes'],
+        'appelants': ", ".join(agregat['appelants']),
+    } for agregat in agregats])
+    
+    st.dataframe(
+        df_requetes,
+        column_config={
+            "requete": st.column_config.TextColumn("Requête", width="large"),
+            "executions": st.column_config.NumberColumn("Exécutions", format="%d"),
+            "duree_totale_ms": st.column_config.NumberColumn("Total (ms)", format="%.2f"),
+            "duree_moyenne_ms": st.column_config.NumberColumn("Moyenne (ms)", format="%.2f"),
+            "duree_max_ms": st.column_config.NumberColumn("Max (ms)", format="%.2f"),
+            "lignes": st.column_config.NumberColumn("Lignes", format="%d"),
+            "appelants": "Appelée depuis",
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    # Plan d'exécution de l'exécution la plus lente de la requête choisie
+    st.write("#### Plan d'exécution")
+    index = st.selectbox(
+        "Requête à analyser",
+        options=range(len(agregats)),
+        format_func=lambda i: f"{i + 1}. {agregats[i]['requete'][:120]}"
+    )
+    exemple = agregats[index]['exemple']
+    st.code(exemple['sql'].strip(), language="sql")
+    
+    if st.button("EXPLAIN QUERY PLAN"):
+        conn = get_db_connection()
+        try:
+            st.code("\n".join(plan_requete(conn, exemple['sql'], exemple['params'])) or "(plan vide)")
+        except sqlite3.Error as e:
+            st.warning(f"Plan indisponible pour cette requête : {str(e)}")
+        finally:
+            conn.close()
+    
+    # Journal des requêtes lentes
+    with st.expander(f"Requêtes lentes (≥ {SEUIL_REQUETE_LENTE_MS} ms)"):
+        if lentes:
+            st.dataframe(
+                pd.DataFrame([{
+                    'heure': datetime.fromtimestamp(entree['horodatage']).strftime("%H:%M:%S"),
+                    'duree_ms': round(entree['duree_ms'], 2),
+                    'lignes': entree['lignes'],
+                    'appelant': entree['appelant'],
+                    'requete': entree['requete'],
+                } for entree in lentes]),
+                column_config={
+                    "heure": "Heure",
+                    "duree_ms": st.column_config.NumberColumn("Durée (ms)", format="%.2f"),
+                    "lignes": st.column_config.NumberColumn("Lignes", format="%d"),
+                    "appelant": "Appelée depuis",
+                    "requete": st.column_config.TextColumn("Requête", width="large"),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("Aucune requête lente enregistrée.")
@@ -4,11 +4,28 @@ import os
 import sqlite3
 import plotly.express as px
 import plotly.graph_objects as go
-from io import BytesIO
 from ..config import FICHIER_CENTRAL, DB_PATH, THEME_COLORS, APP_NAME, APP_VERSION
-from ..utils.db_utils import get_db_connection
+from ..utils.db_utils import get_db_connection, get_version_donnees
+from ..utils.ecriture_utils import ecrire
 from ..utils.excel_utils import charger_et_nettoyer, sauvegarder_dans_fichier_central, to_excel
-from ..utils.viz_utils import plot_distribution_moyennes, plot_repartition_par_sexe, plot_comparaison_disciplines
+from ..utils.viz_utils import plot_distribution_moyennes, plot_repartition_par_sexe, plot_comparaison_disciplines, echantillonner, figure_barres
+from ..utils.honneur_utils import calculer_tableaux_honneur, tableau_global, tableaux_par_niveau, tableaux_par_classe, classeur_tableaux_honneur
+from ..utils.stats_utils import statistiques_classe, statistiques_discipline, tableau_statistiques
+from ..utils.rapport_utils import (
+    construire_rapport_classe, classeur_rapport_classe, construire_statistiques_globales,
+    feuilles_statistiques_globales, feuilles_rapport_discipline
+)
+from ..utils.bulletin_utils import charger_bulletins, generer_archive_bulletins, FORMATS_BULLETIN
+from ..utils.export_utils import lire_export, nom_export, FORMATS_EXPORT, LIBELLES_FORMATS
+from ..utils.cache_utils import artefact_rapport
+from ..utils.analyse_utils import (
+    niveaux_disponibles, classes_disponibles, disciplines_classe, moyennes_classe, notes_discipline_classe,
+    requete_liste_classe, requete_notes_discipline, EXPRESSIONS_LISTE_CLASSE, EXPRESSIONS_NOTES_DISCIPLINE
+)
+from ..utils.ui_utils import fragment, tableau_pagine, apercu_pagine
+from ..utils.profil_utils import profiler
+from ..utils.import_utils import ProfilImport, enregistrer_import, lister_imports, LIBELLES_ETAPES
+from ..utils.jobs_utils import soumettre_rapport, lister_rapports, lire_rapport, supprimer_rapport, LIBELLES_STATUTS
 
 def show_semestre1_view():
     """Affiche le module Semestre 1 avec design amélioré"""
@@ -58,6 +75,7 @@ def show_semestre1_view():
         unsafe_allow_html=True
     )
 
+@profiler
 def show_overview():
     """Affiche la vue d'ensemble du semestre 1 avec design amélioré"""
     
@@ -203,7 +221,8 @@ def show_overview():
                SUM(CASE WHEN mg.moyenne >= 10 THEN 1 ELSE 0 END) as nb_moyenne
         FROM Moyennes_Generales_S1 mg
         JOIN Eleves e ON mg.ien = e.ien
-        JOIN Classes c ON e.id_classe = c.id
+        JOIN Inscriptions i ON i.ien = mg.ien AND i.annee_scolaire = mg.annee_scolaire
+        JOIN Classes c ON i.id_classe = c.id
         JOIN Niveaux n ON c.id_niveau = n.id
         WHERE mg.annee_scolaire = ?
         GROUP BY n.libelle
@@ -260,62 +279,23 @@ def show_overview():
         
         with col1:
             # Graphique en barres des moyennes par niveau
-            fig_moyennes = px.bar(
-                df_niveaux, 
-                x="niveau", 
-                y="moyenne",
-                color="niveau",
-                labels={"niveau": "Niveau", "moyenne": "Moyenne générale"},
-                title="Moyenne générale par niveau",
-                color_discrete_sequence=px.colors.qualitative.Bold
-            )
-            
-            fig_moyennes.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(family="Arial", size=12),
-                margin=dict(l=20, r=20, t=40, b=20),
-                legend_title_text="",
-                xaxis=dict(
-                    title=dict(font=dict(size=14)),
-                    tickfont=dict(size=12)
-                ),
-                yaxis=dict(
-                    title=dict(font=dict(size=14)),
-                    tickfont=dict(size=12),
-                    range=[0, 20]
-                )
+            fig_moyennes = figure_barres(
+                df_niveaux, "niveau", "moyenne",
+                "Moyenne générale par niveau",
+                {"niveau": "Niveau", "moyenne": "Moyenne générale"},
+                (0, 20)
             )
             
             st.plotly_chart(fig_moyennes, use_container_width=True)
         
         with col2:
             # Graphique en barres du taux de réussite par niveau
-            fig_taux = px.bar(
-                df_niveaux, 
-                x="niveau", 
-                y="taux",
-                color="niveau",
-                labels={"niveau": "Niveau", "taux": "Taux de réussite (%)"},
-                title="Taux de réussite par niveau",
-                color_discrete_sequence=px.colors.qualitative.Pastel
-            )
-            
-            fig_taux.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(family="Arial", size=12),
-                margin=dict(l=20, r=20, t=40, b=20),
-                legend_title_text="",
-                xaxis=dict(
-                    title=dict(font=dict(size=14)),
-                    tickfont=dict(size=12)
-                ),
-                yaxis=dict(
-                    title=dict(font=dict(size=14)),
-                    tickfont=dict(size=12),
-                    range=[0, 100]
-                )
+            fig_taux = figure_barres(
+                df_niveaux, "niveau", "taux",
+                "Taux de réussite par niveau",
+                {"niveau": "Niveau", "taux": "Taux de réussite (%)"},
+                (0, 100),
+                palette="Pastel"
             )
             
             st.plotly_chart(fig_taux, use_container_width=True)
@@ -329,7 +309,8 @@ def show_overview():
                    mg.moyenne, mg.rang
             FROM Moyennes_Generales_S1 mg
             JOIN Eleves e ON mg.ien = e.ien
-            JOIN Classes c ON e.id_classe = c.id
+            JOIN Inscriptions i ON i.ien = mg.ien AND i.annee_scolaire = mg.annee_scolaire
+            JOIN Classes c ON i.id_classe = c.id
             JOIN Niveaux n ON c.id_niveau = n.id
             WHERE mg.annee_scolaire = ?
             ORDER BY mg.moyenne DESC
@@ -395,6 +376,7 @@ def show_overview():
     )
 
 
+@profiler
 def show_moyennes_analysis():
     """Affiche l'analyse des moyennes générales du semestre 1 avec un design amélioré"""
     
@@ -424,6 +406,7 @@ def show_moyennes_analysis():
     cursor = conn.cursor()
     cursor.execute("SELECT libelle FROM Annee_Scolaire WHERE etat = 'actif' LIMIT 1")
     annee_result = cursor.fetchone()
+    conn.close()
     
     if not annee_result:
         st.warning("Aucune année scolaire active. Veuillez configurer l'année scolaire dans les paramètres.")
@@ -431,18 +414,19 @@ def show_moyennes_analysis():
     
     annee_scolaire = annee_result[0]
     
-    # Récupérer les niveaux disponibles
-    cursor.execute("""
-        SELECT DISTINCT n.id, n.libelle
-        FROM Niveaux n
-        JOIN Classes c ON n.id = c.id_niveau
-        JOIN Eleves e ON c.id = e.id_classe
-        JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-        WHERE mg.annee_scolaire = ? AND n.etat = 'actif'
-        ORDER BY n.libelle
-    """, (annee_scolaire,))
+    # Filtres et résultats : un changement de niveau ou de classe ne relance que ce fragment
+    _analyse_moyennes(annee_scolaire)
+
+@fragment
+@profiler
+def _analyse_moyennes(annee_scolaire):
+    """Filtres, statistiques, tableaux et graphiques de l'analyse des moyennes"""
     
-    niveaux = cursor.fetchall()
+    # Les données mises en cache sont renouvelées à chaque modification de la base
+    version = get_version_donnees()
+    
+    # Récupérer les niveaux disponibles
+    niveaux = niveaux_disponibles(1, annee_scolaire, version)
     
     if not niveaux:
         st.info(f"Aucune donnée disponible pour l'année scolaire {annee_scolaire}.")
@@ -480,16 +464,7 @@ def show_moyennes_analysis():
     niveau_id = niveau_options[selected_niveau]
     
     # Récupérer les classes du niveau sélectionné
-    cursor.execute("""
-        SELECT DISTINCT c.id, c.libelle
-        FROM Classes c
-        JOIN Eleves e ON c.id = e.id_classe
-        JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-        WHERE c.id_niveau = ? AND mg.annee_scolaire = ? AND c.etat = 'actif'
-        ORDER BY c.libelle
-    """, (niveau_id, annee_scolaire))
-    
-    classes = cursor.fetchall()
+    classes = classes_disponibles(1, annee_scolaire, niveau_id, version)
     
     if not classes:
         st.markdown("</div>", unsafe_allow_html=True)
@@ -511,17 +486,7 @@ def show_moyennes_analysis():
     classe_id = classe_options[selected_classe]
     
     # Récupérer les données de la classe sélectionnée
-    query = """
-        SELECT e.ien, e.prenom, e.nom, e.sexe, mg.moyenne, mg.rang, 
-               mg.retard, mg.absence, mg.conseil_discipline, mg.appreciation
-        FROM Eleves e
-        JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-        WHERE e.id_classe = ? AND mg.annee_scolaire = ?
-        ORDER BY mg.rang
-    """
-    
-    df_classe = pd.read_sql_query(query, conn, params=(classe_id, annee_scolaire))
-    conn.close()
+    df_classe = moyennes_classe(1, annee_scolaire, classe_id, version)
     
     if df_classe.empty:
         st.info(f"Aucune donnée disponible pour la classe {selected_classe}.")
@@ -537,18 +502,8 @@ def show_moyennes_analysis():
         unsafe_allow_html=True
     )
     
-    # Calcul des statistiques
-    stats = {
-        'effectif': len(df_classe),
-        'moyenne_classe': round(df_classe['moyenne'].mean(), 2),
-        'mediane': round(df_classe['moyenne'].median(), 2),
-        'ecart_type': round(df_classe['moyenne'].std(), 2),
-        'min': round(df_classe['moyenne'].min(), 2),
-        'max': round(df_classe['moyenne'].max(), 2),
-        'nb_moyenne': (df_classe['moyenne'] >= 10).sum(),
-    }
-    
-    stats['taux_reussite'] = round((stats['nb_moyenne'] / stats['effectif']) * 100, 2) if stats['effectif'] > 0 else 0
+    # Calcul des statistiques (noyau commun, résultat mis en cache)
+    stats = statistiques_classe(1, annee_scolaire, classe_id, version)
     
     # Afficher les statistiques avec des cartes améliorées
     col1, col2, col3, col4 = st.columns(4)
@@ -571,7 +526,7 @@ def show_moyennes_analysis():
             f"""
             <div style="background-color: white; padding: 1rem; border-radius: 5px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
                 <div style="font-size: 2rem; color: {THEME_COLORS['info']}; margin-bottom: 0.5rem;">
-                    {stats['moyenne_classe']}
+                    {stats['moyenne']}
                 </div>
                 <p style="font-size: 0.9rem; color: #2c3e50; margin: 0;">Moyenne de classe</p>
             </div>
@@ -678,18 +633,15 @@ def show_moyennes_analysis():
         "Insuffisant"
     )
     
-    # Ajouter une colonne de couleur pour les mentions
-    df_classe['color'] = df_classe['mention'].apply(lambda x: 
-        "#28a745" if x == "Excellent" else
-        "#17a2b8" if x == "Très Bien" else
-        "#007bff" if x == "Bien" else
-        "#6c757d" if x == "Assez Bien" else
-        "#dc3545"
-    )
-    
-    # Afficher le tableau
-    st.dataframe(
-        df_classe,
+    # Afficher le tableau page par page (tri et recherche exécutés en SQL)
+    requete, params = requete_liste_classe(1, annee_scolaire, classe_id)
+    tableau_pagine(
+        "liste_classe_s1",
+        requete,
+        params,
+        expressions=EXPRESSIONS_LISTE_CLASSE,
+        colonnes_tri={"rang": "Rang", "moyenne": "Moyenne", "nom": "Nom", "prenom": "Prénom"},
+        colonnes_recherche=("nom", "prenom", "ien"),
         column_config={
             "ien": st.column_config.TextColumn("IEN"),
             "prenom": "Prénom",
@@ -701,11 +653,8 @@ def show_moyennes_analysis():
             "retard": "Retards",
             "absence": "Absences",
             "conseil_discipline": "Conseil de discipline",
-            "appreciation": "Appréciation",
-            "color": None  # Cacher la colonne de couleur
-        },
-        hide_index=True,
-        use_container_width=True
+            "appreciation": "Appréciation"
+        }
     )
     
     # Visualisations avec un design amélioré
@@ -861,6 +810,7 @@ def show_moyennes_analysis():
         )
 
 
+@profiler
 def show_disciplines_analysis():
     """Affiche l'analyse par discipline du semestre 1 avec design amélioré"""
     
@@ -890,6 +840,7 @@ def show_disciplines_analysis():
     cursor = conn.cursor()
     cursor.execute("SELECT libelle FROM Annee_Scolaire WHERE etat = 'actif' LIMIT 1")
     annee_result = cursor.fetchone()
+    conn.close()
     
     if not annee_result:
         st.warning("Aucune année scolaire active. Veuillez configurer l'année scolaire dans les paramètres.")
@@ -897,18 +848,19 @@ def show_disciplines_analysis():
     
     annee_scolaire = annee_result[0]
     
-    # Récupérer les niveaux disponibles
-    cursor.execute("""
-        SELECT DISTINCT n.id, n.libelle
-        FROM Niveaux n
-        JOIN Classes c ON n.id = c.id_niveau
-        JOIN Eleves e ON c.id = e.id_classe
-        JOIN Notes_S1 notes ON e.ien = notes.ien
-        WHERE notes.annee_scolaire = ? AND n.etat = 'actif'
-        ORDER BY n.libelle
-    """, (annee_scolaire,))
+    # Filtres et résultats : un changement de sélection ne relance que ce fragment
+    _analyse_disciplines(annee_scolaire)
+
+@fragment
+@profiler
+def _analyse_disciplines(annee_scolaire):
+    """Filtres, statistiques, tableaux et graphiques de l'analyse par discipline"""
     
-    niveaux = cursor.fetchall()
+    # Les données mises en cache sont renouvelées à chaque modification de la base
+    version = get_version_donnees()
+    
+    # Récupérer les niveaux disponibles
+    niveaux = niveaux_disponibles(1, annee_scolaire, version, source="notes")
     
     if not niveaux:
         st.info(f"Aucune donnée disponible pour l'année scolaire {annee_scolaire}.")
@@ -946,16 +898,7 @@ def show_disciplines_analysis():
     niveau_id = niveau_options[selected_niveau]
     
     # Récupérer les classes du niveau sélectionné
-    cursor.execute("""
-        SELECT DISTINCT c.id, c.libelle
-        FROM Classes c
-        JOIN Eleves e ON c.id = e.id_classe
-        JOIN Notes_S1 notes ON e.ien = notes.ien
-        WHERE c.id_niveau = ? AND notes.annee_scolaire = ? AND c.etat = 'actif'
-        ORDER BY c.libelle
-    """, (niveau_id, annee_scolaire))
-    
-    classes = cursor.fetchall()
+    classes = classes_disponibles(1, annee_scolaire, niveau_id, version, source="notes")
     
     if not classes:
         st.markdown("</div>", unsafe_allow_html=True)
@@ -975,16 +918,7 @@ def show_disciplines_analysis():
     classe_id = classe_options[selected_classe]
     
     # Récupérer les disciplines disponibles pour cette classe
-    cursor.execute("""
-        SELECT DISTINCT d.id, d.libelle
-        FROM Disciplines d
-        JOIN Notes_S1 notes ON d.id = notes.id_discipline
-        JOIN Eleves e ON notes.ien = e.ien
-        WHERE e.id_classe = ? AND notes.annee_scolaire = ?
-        ORDER BY d.libelle
-    """, (classe_id, annee_scolaire))
-    
-    disciplines = cursor.fetchall()
+    disciplines = disciplines_classe(1, annee_scolaire, classe_id, version)
     
     if not disciplines:
         st.markdown("</div>", unsafe_allow_html=True)
@@ -1005,32 +939,8 @@ def show_disciplines_analysis():
     
     discipline_id = discipline_options[selected_discipline]
     
-    # Récupérer les notes de la discipline sélectionnée
-    query = """
-        SELECT e.ien, e.prenom, e.nom, e.sexe, 
-               notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d
-        FROM Eleves e
-        JOIN Notes_S1 notes ON e.ien = notes.ien
-        WHERE e.id_classe = ? AND notes.id_discipline = ? AND notes.annee_scolaire = ?
-        ORDER BY notes.rang_d
-    """
-    
-    df_notes = pd.read_sql_query(query, conn, params=(classe_id, discipline_id, annee_scolaire))
-    
-    # Récupérer les moyennes générales pour avoir une vue complète
-    query_moy = """
-        SELECT e.ien, mg.moyenne as moyenne_generale, mg.rang as rang_general
-        FROM Eleves e
-        JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-        WHERE e.id_classe = ? AND mg.annee_scolaire = ?
-    """
-    
-    df_moy = pd.read_sql_query(query_moy, conn, params=(classe_id, annee_scolaire))
-    
-    conn.close()
-    
-    # Fusionner les données
-    df_discipline = pd.merge(df_notes, df_moy, on='ien')
+    # Notes de la discipline, avec la moyenne et le rang généraux de chaque élève
+    df_discipline = notes_discipline_classe(1, annee_scolaire, classe_id, discipline_id, version)
     
     if df_discipline.empty:
         st.info(f"Aucune donnée disponible pour la discipline {selected_discipline}.")
@@ -1046,18 +956,8 @@ def show_disciplines_analysis():
         unsafe_allow_html=True
     )
     
-    # Calcul des statistiques
-    stats = {
-        'effectif': len(df_discipline),
-        'moyenne_discipline': round(df_discipline['moy_d'].mean(), 2),
-        'mediane': round(df_discipline['moy_d'].median(), 2),
-        'ecart_type': round(df_discipline['moy_d'].std(), 2),
-        'min': round(df_discipline['moy_d'].min(), 2),
-        'max': round(df_discipline['moy_d'].max(), 2),
-        'nb_moyenne': (df_discipline['moy_d'] >= 10).sum(),
-    }
-    
-    stats['taux_reussite'] = round((stats['nb_moyenne'] / stats['effectif']) * 100, 2) if stats['effectif'] > 0 else 0
+    # Calcul des statistiques (noyau commun, résultat mis en cache)
+    stats = statistiques_discipline(1, annee_scolaire, discipline_id, version, classe_id)['global']
     
     # Afficher les statistiques avec des cartes améliorées
     col1, col2, col3, col4 = st.columns(4)
@@ -1080,7 +980,7 @@ def show_disciplines_analysis():
             f"""
             <div style="background-color: white; padding: 1rem; border-radius: 5px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
                 <div style="font-size: 2rem; color: {THEME_COLORS['info']}; margin-bottom: 0.5rem;">
-                    {stats['moyenne_discipline']}
+                    {stats['moyenne']}
                 </div>
                 <p style="font-size: 0.9rem; color: #2c3e50; margin: 0;">Moyenne de discipline</p>
             </div>
@@ -1187,9 +1087,15 @@ def show_disciplines_analysis():
         "Insuffisant"
     )
     
-    # Afficher le tableau
-    st.dataframe(
-        df_discipline,
+    # Afficher le tableau page par page (tri et recherche exécutés en SQL)
+    requete, params = requete_notes_discipline(1, annee_scolaire, classe_id, discipline_id)
+    tableau_pagine(
+        "notes_discipline_s1",
+        requete,
+        params,
+        expressions=EXPRESSIONS_NOTES_DISCIPLINE,
+        colonnes_tri={"rang_d": "Rang discipline", "moy_d": "Moyenne", "rang_general": "Rang général", "nom": "Nom"},
+        colonnes_recherche=("nom", "prenom", "ien"),
         column_config={
             "ien": st.column_config.TextColumn("IEN"),
             "prenom": "Prénom",
@@ -1202,9 +1108,7 @@ def show_disciplines_analysis():
             "moyenne_generale": st.column_config.NumberColumn("Moyenne Générale", format="%.2f"),
             "rang_general": "Rang Général",
             "mention": "Mention"
-        },
-        hide_index=True,
-        use_container_width=True
+        }
     )
     
     # Visualisations avec un design amélioré
@@ -1221,12 +1125,11 @@ def show_disciplines_analysis():
     
     # Distribution des notes
     with col1:
-        fig = px.histogram(
-            df_discipline, 
-            x="moy_d", 
-            nbins=20,
-            color_discrete_sequence=[THEME_COLORS['success']],
-            title=f"Distribution des notes - {selected_discipline}"
+        fig = plot_distribution_moyennes(
+            df_discipline,
+            f"Distribution des notes - {selected_discipline}",
+            column="moy_d",
+            couleur=THEME_COLORS['success']
         )
         
         fig.update_layout(
@@ -1286,8 +1189,8 @@ def show_disciplines_analysis():
     # Créer un graphique comparatif
     fig = go.Figure()
     
-    # Trier par rang général pour une meilleure visualisation
-    df_tri = df_discipline.sort_values('rang_general')
+    # Trier par rang général pour une meilleure visualisation (au plus MAX_POINTS_NUAGE élèves)
+    df_tri = echantillonner(df_discipline.sort_values('rang_general'))
     
     # Ajouter les deux courbes
     fig.add_trace(go.Scatter(
@@ -1370,6 +1273,7 @@ def show_disciplines_analysis():
         )
 
 
+@profiler
 def show_reports():
     """Affiche la page de génération de rapports du semestre 1 avec design amélioré"""
     
@@ -1441,6 +1345,14 @@ def show_reports():
         "Rapport statistique global": {
             "icon": "fas fa-chart-pie",
             "description": "Statistiques générales pour l'ensemble de l'établissement"
+        },
+        "Bulletins": {
+            "icon": "fas fa-file-alt",
+            "description": "Bulletins individuels d'une classe ou d'un niveau, regroupés dans une archive ZIP"
+        },
+        "Mes rapports": {
+            "icon": "fas fa-inbox",
+            "description": "Rapports générés en arrière-plan : suivi et téléchargement"
         }
     }
     
@@ -1515,6 +1427,10 @@ def show_reports():
         generate_honor_roll(conn, annee_scolaire)
     elif selected_report == "Rapport statistique global":
         generate_global_stats(conn, annee_scolaire)
+    elif selected_report == "Bulletins":
+        generate_bulletins(conn, annee_scolaire)
+    elif selected_report == "Mes rapports":
+        show_background_reports()
     
     conn.close()
     
@@ -1527,6 +1443,7 @@ def show_reports():
     )
 
 
+@profiler
 def generate_class_report(conn, annee_scolaire):
     """Génère un rapport de classe avec design amélioré"""
     
@@ -1536,9 +1453,9 @@ def generate_class_report(conn, annee_scolaire):
         SELECT DISTINCT n.id, n.libelle
         FROM Niveaux n
         JOIN Classes c ON n.id = c.id_niveau
-        JOIN Eleves e ON c.id = e.id_classe
-        JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-        WHERE mg.annee_scolaire = ? AND n.etat = 'actif'
+        JOIN Inscriptions i ON c.id = i.id_classe
+        JOIN Moyennes_Generales_S1 mg ON i.ien = mg.ien AND mg.annee_scolaire = i.annee_scolaire
+        WHERE i.annee_scolaire = ? AND n.etat = 'actif'
         ORDER BY n.libelle
     """, (annee_scolaire,))
     
@@ -1574,9 +1491,9 @@ def generate_class_report(conn, annee_scolaire):
     cursor.execute("""
         SELECT DISTINCT c.id, c.libelle
         FROM Classes c
-        JOIN Eleves e ON c.id = e.id_classe
-        JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-        WHERE c.id_niveau = ? AND mg.annee_scolaire = ? AND c.etat = 'actif'
+        JOIN Inscriptions i ON c.id = i.id_classe
+        JOIN Moyennes_Generales_S1 mg ON i.ien = mg.ien AND mg.annee_scolaire = i.annee_scolaire
+        WHERE c.id_niveau = ? AND i.annee_scolaire = ? AND c.etat = 'actif'
         ORDER BY c.libelle
     """, (niveau_id, annee_scolaire))
     
@@ -1637,34 +1554,16 @@ def generate_class_report(conn, annee_scolaire):
                 unsafe_allow_html=True
             )
         
-        # Récupérer les données de la classe
-        query = """
-            SELECT e.ien, e.prenom, e.nom, e.sexe, mg.moyenne, mg.rang, 
-                mg.retard, mg.absence, mg.conseil_discipline, mg.appreciation
-            FROM Eleves e
-            JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-            WHERE e.id_classe = ? AND mg.annee_scolaire = ?
-            ORDER BY mg.rang
-        """
-        
-        df_classe = pd.read_sql_query(query, conn, params=(classe_id, annee_scolaire))
+        # Récupérer en une fois toutes les données du rapport (affichage et export)
+        rapport = construire_rapport_classe(conn, 1, annee_scolaire, classe_id)
+        df_classe = rapport['eleves']
         
         if df_classe.empty:
             st.info(f"Aucune donnée disponible pour la classe {selected_classe}.")
             return
         
         # Statistiques de la classe
-        stats = {
-            'effectif': len(df_classe),
-            'moyenne_classe': round(df_classe['moyenne'].mean(), 2),
-            'mediane': round(df_classe['moyenne'].median(), 2),
-            'ecart_type': round(df_classe['moyenne'].std(), 2),
-            'min': round(df_classe['moyenne'].min(), 2),
-            'max': round(df_classe['moyenne'].max(), 2),
-            'nb_moyenne': (df_classe['moyenne'] >= 10).sum(),
-        }
-        
-        stats['taux_reussite'] = round((stats['nb_moyenne'] / stats['effectif']) * 100, 2) if stats['effectif'] > 0 else 0
+        stats = rapport['stats']
         
         # Afficher les statistiques avec un design amélioré
         st.markdown(
@@ -1696,7 +1595,7 @@ def generate_class_report(conn, annee_scolaire):
                 f"""
                 <div style="background-color: white; padding: 1rem; border-radius: 5px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
                     <div style="font-size: 2rem; color: {THEME_COLORS['info']}; margin-bottom: 0.5rem;">
-                        {stats['moyenne_classe']}
+                        {stats['moyenne']}
                     </div>
                     <p style="font-size: 0.9rem; color: #2c3e50; margin: 0;">Moyenne de classe</p>
                 </div>
@@ -1833,39 +1732,29 @@ def generate_class_report(conn, annee_scolaire):
                 unsafe_allow_html=True
             )
             
-            # Récupérer les disciplines disponibles
-            cursor.execute("""
-                SELECT DISTINCT d.id, d.libelle
-                FROM Disciplines d
-                JOIN Notes_S1 notes ON d.id = notes.id_discipline
-                JOIN Eleves e ON notes.ien = e.ien
-                WHERE e.id_classe = ? AND notes.annee_scolaire = ?
-                ORDER BY d.libelle
-            """, (classe_id, annee_scolaire))
-            
-            disciplines = cursor.fetchall()
+            # Statistiques de toutes les disciplines de la classe
+            st.dataframe(
+                tableau_statistiques(rapport['stats_disciplines'], 'discipline'),
+                column_config={
+                    "discipline": "Discipline",
+                    "nb_eleves": st.column_config.NumberColumn("Nombre d'élèves", format="%d"),
+                    "moyenne": st.column_config.NumberColumn("Moyenne", format="%.2f"),
+                    "nb_moyenne": st.column_config.NumberColumn("Élèves ≥ 10", format="%d"),
+                    "taux_reussite": st.column_config.NumberColumn("Taux de réussite (%)", format="%.2f")
+                },
+                hide_index=True,
+                use_container_width=True
+            )
             
-            for discipline in disciplines:
-                st.markdown(f"<h4 style='margin: 1.5rem 0 1rem;'>{discipline['libelle']}</h4>", unsafe_allow_html=True)
-                
-                # Récupérer les notes de cette discipline
-                query = """
-                    SELECT e.prenom, e.nom, notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d
-                    FROM Eleves e
-                    JOIN Notes_S1 notes ON e.ien = notes.ien
-                    WHERE e.id_classe = ? AND notes.id_discipline = ? AND notes.annee_scolaire = ?
-                    ORDER BY notes.rang_d
-                """
-                
-                df_disc = pd.read_sql_query(query, conn, params=(classe_id, discipline['id'], annee_scolaire))
+            for discipline, df_disc in rapport['disciplines']:
+                st.markdown(f"<h4 style='margin: 1.5rem 0 1rem;'>{discipline}</h4>", unsafe_allow_html=True)
                 
                 if not df_disc.empty:
-                    moyenne_disc = round(df_disc['moy_d'].mean(), 2)
-                    taux_reussite_disc = round((df_disc[df_disc['moy_d'] >= 10].shape[0] / df_disc.shape[0]) * 100, 2)
+                    stats_disc = rapport['stats_disciplines'].loc[discipline]
                     
                     col1, col2 = st.columns(2)
-                    col1.metric("Moyenne", moyenne_disc)
-                    col2.metric("Taux de réussite", f"{taux_reussite_disc}%")
+                    col1.metric("Moyenne", stats_disc['moyenne'])
+                    col2.metric("Taux de réussite", f"{stats_disc['taux_reussite']}%")
                     
                     st.dataframe(
                         df_disc,
@@ -1948,53 +1837,24 @@ def generate_class_report(conn, annee_scolaire):
             unsafe_allow_html=True
         )
         
-        # Préparer les données pour le fichier Excel
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Feuille des moyennes générales
-            df_classe.to_excel(writer, sheet_name='Moyennes_Generales', index=False)
-            
-            # Feuille des statistiques
-            stats_df = pd.DataFrame({
-                'Métrique': ['Effectif', 'Moyenne de classe', 'Élèves ≥ 10', 'Taux de réussite', 
-                             'Médiane', 'Écart-type', 'Min', 'Max'],
-                'Valeur': [stats['effectif'], stats['moyenne_classe'], stats['nb_moyenne'], f"{stats['taux_reussite']}%",
-                          stats['mediane'], stats['ecart_type'], stats['min'], stats['max']]
-            })
-            stats_df.to_excel(writer, sheet_name='Statistiques', index=False)
-            
-            # Feuilles des disciplines
-            if include_disciplines:
-                for discipline in disciplines:
-                    query = """
-                        SELECT e.prenom, e.nom, notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d
-                        FROM Eleves e
-                        JOIN Notes_S1 notes ON e.ien = notes.ien
-                        WHERE e.id_classe = ? AND notes.id_discipline = ? AND notes.annee_scolaire = ?
-                        ORDER BY notes.rang_d
-                    """
-                    
-                    df_disc = pd.read_sql_query(query, conn, params=(classe_id, discipline['id'], annee_scolaire))
-                    
-                    if not df_disc.empty:
-                        # Limiter le nom de la feuille à 31 caractères (limite Excel)
-                        sheet_name = discipline['libelle']
-                        if len(sheet_name) > 31:
-                            sheet_name = sheet_name[:28] + "..."
-                        
-                        df_disc.to_excel(writer, sheet_name=sheet_name, index=False)
+        # Le classeur est construit à partir des mêmes données que l'affichage
+        excel_data = artefact_rapport(
+            "rapport_classe",
+            {'semestre': 1, 'annee_scolaire': annee_scolaire, 'id_classe': classe_id, 'disciplines': include_disciplines},
+            lambda: classeur_rapport_classe(rapport, inclure_disciplines=include_disciplines)
+        )
         
         # Proposer le téléchargement
         st.download_button(
             label="📥 Télécharger le rapport Excel",
-            data=output.getvalue(),
+            data=excel_data,
             file_name=f"Rapport_{selected_niveau}_{selected_classe}_S1.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             use_container_width=True
         )
 
 
+@profiler
 def generate_discipline_report(conn, annee_scolaire):
     """Génère un rapport par discipline avec design amélioré"""
     
@@ -2046,8 +1906,26 @@ def generate_discipline_report(conn, annee_scolaire):
     with col3:
         include_charts = st.checkbox("Inclure les graphiques", value=True)
     
+    format_export = st.selectbox(
+        "Format du fichier",
+        options=list(FORMATS_EXPORT.keys()),
+        format_func=lambda x: LIBELLES_FORMATS[x],
+        key="format_discipline_report"
+    )
+    
     st.markdown("</div>", unsafe_allow_html=True)
     
+    # Production du fichier en arrière-plan : la page reste utilisable pendant le calcul
+    if st.button("⏳ Générer le fichier en arrière-plan", use_container_width=True, key="job_discipline_report"):
+        soumettre_rapport(
+            "rapport_discipline",
+            {'semestre': 1, 'annee_scolaire': annee_scolaire, 'id_discipline': discipline_id,
+             'discipline': selected_discipline, 'par_niveau': analyze_by_level,
+             'par_sexe': analyze_by_gender, 'format': format_export},
+            f"Rapport {selected_discipline} - S1 ({LIBELLES_FORMATS[format_export]})"
+        )
+        st.success("Rapport ajouté à la file. Suivez son avancement dans « Mes rapports ».")
+    
     # Bouton pour générer le rapport
     if st.button("Générer le rapport", use_container_width=True, type="primary"):
         st.markdown(
@@ -2075,23 +1953,15 @@ def generate_discipline_report(conn, annee_scolaire):
                 unsafe_allow_html=True
             )
         
-        # Récupérer les statistiques globales de la discipline
-        cursor.execute("""
-            SELECT COUNT(DISTINCT notes.ien) as nb_eleves,
-                   AVG(notes.moy_d) as moyenne,
-                   COUNT(CASE WHEN notes.moy_d >= 10 THEN 1 END) as nb_moyenne
-            FROM Notes_S1 notes
-            WHERE notes.id_discipline = ? AND notes.annee_scolaire = ?
-        """, (discipline_id, annee_scolaire))
+        # Statistiques globales, par niveau et par sexe (noyau commun, résultat mis en cache)
+        stats_discipline = statistiques_discipline(1, annee_scolaire, discipline_id, get_version_donnees(conn))
+        stats_global = stats_discipline['global']
         
-        stats_global = cursor.fetchone()
-        
-        if not stats_global or stats_global['nb_eleves'] == 0:
+        if stats_global['effectif'] == 0:
             st.info(f"Aucune donnée disponible pour la discipline {selected_discipline}.")
             return
         
-        # Calculer le taux de réussite
-        taux_reussite = (stats_global['nb_moyenne'] / stats_global['nb_eleves']) * 100
+        taux_reussite = stats_global['taux_reussite']
         
         # Afficher les statistiques globales avec un design amélioré
         st.markdown(
@@ -2110,7 +1980,7 @@ def generate_discipline_report(conn, annee_scolaire):
                 f"""
                 <div style="background-color: white; padding: 1rem; border-radius: 5px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
                     <div style="font-size: 2rem; color: {THEME_COLORS['primary']}; margin-bottom: 0.5rem;">
-                        {stats_global['nb_eleves']}
+                        {stats_global['effectif']}
                     </div>
                     <p style="font-size: 0.9rem; color: #2c3e50; margin: 0;">Nombre d'élèves</p>
                 </div>
@@ -2155,25 +2025,8 @@ def generate_discipline_report(conn, annee_scolaire):
                 unsafe_allow_html=True
             )
             
-            # Récupérer les données par niveau
-            query = """
-                SELECT n.libelle as niveau, COUNT(DISTINCT notes.ien) as nb_eleves,
-                       AVG(notes.moy_d) as moyenne,
-                       COUNT(CASE WHEN notes.moy_d >= 10 THEN 1 END) as nb_moyenne
-                FROM Notes_S1 notes
-                JOIN Eleves e ON notes.ien = e.ien
-                JOIN Classes c ON e.id_classe = c.id
-                JOIN Niveaux n ON c.id_niveau = n.id
-                WHERE notes.id_discipline = ? AND notes.annee_scolaire = ?
-                GROUP BY n.libelle
-                ORDER BY n.libelle
-            """
-            
-            df_niveaux = pd.read_sql_query(query, conn, params=(discipline_id, annee_scolaire))
-            
-            # Calculer le taux de réussite
-            df_niveaux['taux_reussite'] = (df_niveaux['nb_moyenne'] / df_niveaux['nb_eleves'] * 100).round(2)
-            df_niveaux['moyenne'] = df_niveaux['moyenne'].round(2)
+            # Données par niveau
+            df_niveaux = tableau_statistiques(stats_discipline['niveau'], 'niveau')
             
             # Afficher le tableau
             st.dataframe(
@@ -2231,23 +2084,8 @@ def generate_discipline_report(conn, annee_scolaire):
                 unsafe_allow_html=True
             )
             
-            # Récupérer les données par sexe
-            query = """
-                SELECT e.sexe, COUNT(DISTINCT notes.ien) as nb_eleves,
-                       AVG(notes.moy_d) as moyenne,
-                       COUNT(CASE WHEN notes.moy_d >= 10 THEN 1 END) as nb_moyenne
-                FROM Notes_S1 notes
-                JOIN Eleves e ON notes.ien = e.ien
-                WHERE notes.id_discipline = ? AND notes.annee_scolaire = ?
-                GROUP BY e.sexe
-                ORDER BY e.sexe
-            """
-            
-            df_sexe = pd.read_sql_query(query, conn, params=(discipline_id, annee_scolaire))
-            
-            # Calculer le taux de réussite
-            df_sexe['taux_reussite'] = (df_sexe['nb_moyenne'] / df_sexe['nb_eleves'] * 100).round(2)
-            df_sexe['moyenne'] = df_sexe['moyenne'].round(2)
+            # Données par sexe
+            df_sexe = tableau_statistiques(stats_discipline['sexe'], 'sexe')
             
             # Remplacer les codes de sexe pour plus de clarté
             df_sexe['sexe'] = df_sexe['sexe'].replace({'M': 'Garçons', 'F': 'Filles'})
@@ -2313,51 +2151,141 @@ def generate_discipline_report(conn, annee_scolaire):
             unsafe_allow_html=True
         )
         
-        # Préparer les données pour le fichier Excel
-        output = BytesIO()
+        # Feuilles du rapport (le détail des élèves est lu par lots et écrit en flux)
+        feuilles = feuilles_rapport_discipline(
+            conn, 1, annee_scolaire, discipline_id, stats_discipline,
+            par_niveau=analyze_by_level, par_sexe=analyze_by_gender
+        )
         
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Feuille des statistiques globales
-            stats_global_df = pd.DataFrame({
-                'Métrique': ['Nombre d\'élèves', 'Moyenne générale', 'Taux de réussite'],
-                'Valeur': [stats_global['nb_eleves'], round(stats_global['moyenne'], 2), f"{round(taux_reussite, 2)}%"]
-            })
-            stats_global_df.to_excel(writer, sheet_name='Stats_Globales', index=False)
-            
-            # Feuille par niveau si demandée
-            if analyze_by_level:
-                df_niveaux.to_excel(writer, sheet_name='Stats_Par_Niveau', index=False)
-            
-            # Feuille par sexe si demandée
-            if analyze_by_gender:
-                df_sexe.to_excel(writer, sheet_name='Stats_Par_Sexe', index=False)
-            
-            # Récupérer les données détaillées de tous les élèves
-            query = """
-                SELECT n.libelle as niveau, c.libelle as classe,
-                       e.ien, e.prenom, e.nom, e.sexe,
-                       notes.moy_dd, notes.comp_d, notes.moy_d, notes.rang_d
-                FROM Notes_S1 notes
-                JOIN Eleves e ON notes.ien = e.ien
-                JOIN Classes c ON e.id_classe = c.id
-                JOIN Niveaux n ON c.id_niveau = n.id
-                WHERE notes.id_discipline = ? AND notes.annee_scolaire = ?
-                ORDER BY n.libelle, c.libelle, notes.rang_d
-            """
-            
-            df_details = pd.read_sql_query(query, conn, params=(discipline_id, annee_scolaire))
-            df_details.to_excel(writer, sheet_name='Détails_Élèves', index=False)
+        # Le fichier n'est régénéré que si les données ou les options ont changé
+        contenu = artefact_rapport(
+            "rapport_discipline",
+            {'semestre': 1, 'annee_scolaire': annee_scolaire, 'id_discipline': discipline_id,
+             'par_niveau': analyze_by_level, 'par_sexe': analyze_by_gender, 'format': format_export},
+            lambda: lire_export(feuilles, format_export)
+        )
+        nom_fichier, mime = nom_export(f"Rapport_{selected_discipline}_S1", format_export, len(feuilles))
         
         # Proposer le téléchargement
         st.download_button(
-            label="📥 Télécharger le rapport Excel",
-            data=output.getvalue(),
-            file_name=f"Rapport_{selected_discipline}_S1.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            label=f"📥 Télécharger le rapport ({LIBELLES_FORMATS[format_export]})",
+            data=contenu,
+            file_name=nom_fichier,
+            mime=mime,
             use_container_width=True
         )
 
 
+@profiler
+def generate_bulletins(conn, annee_scolaire):
+    """Génère les bulletins d'une classe ou d'un niveau dans une archive ZIP"""
+    
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT DISTINCT n.id, n.libelle
+        FROM Niveaux n
+        JOIN Classes c ON n.id = c.id_niveau
+        JOIN Inscriptions i ON c.id = i.id_classe
+        JOIN Moyennes_Generales_S1 mg ON i.ien = mg.ien AND mg.annee_scolaire = i.annee_scolaire
+        WHERE i.annee_scolaire = ? AND n.etat = 'actif'
+        ORDER BY n.libelle
+    """, (annee_scolaire,))
+    
+    niveaux = cursor.fetchall()
+    
+    if not niveaux:
+        st.info(f"Aucune donnée disponible pour l'année scolaire {annee_scolaire}.")
+        return
+    
+    niveau_options = {niveau['libelle']: niveau['id'] for niveau in niveaux}
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        selected_niveau = st.selectbox("Niveau", options=list(niveau_options.keys()), key="niveau_select_bulletins")
+    
+    niveau_id = niveau_options[selected_niveau]
+    
+    cursor.execute("""
+        SELECT DISTINCT c.id, c.libelle
+        FROM Classes c
+        JOIN Inscriptions i ON c.id = i.id_classe
+        JOIN Moyennes_Generales_S1 mg ON i.ien = mg.ien AND mg.annee_scolaire = i.annee_scolaire
+        WHERE c.id_niveau = ? AND i.annee_scolaire = ? AND c.etat = 'actif'
+        ORDER BY c.libelle
+    """, (niveau_id, annee_scolaire))
+    
+    classe_options = {"Toutes les classes du niveau": None}
+    classe_options.update({classe['libelle']: classe['id'] for classe in cursor.fetchall()})
+    
+    with col2:
+        selected_classe = st.selectbox("Classe", options=list(classe_options.keys()), key="classe_select_bulletins")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        format_fichier = st.selectbox(
+            "Format",
+            options=FORMATS_BULLETIN,
+            format_func=lambda x: x.upper(),
+            key="format_bulletins"
+        )
+    
+    with col2:
+        nb_processus = st.slider("Processus de rendu", min_value=1, max_value=max(os.cpu_count() or 1, 2),
+                                 value=os.cpu_count() or 1, key="processus_bulletins")
+    
+    if "pdf" not in FORMATS_BULLETIN:
+        st.caption("Installez le module reportlab pour produire des bulletins PDF.")
+    
+    if st.button("⏳ Générer en arrière-plan", use_container_width=True, key="job_bulletins"):
+        classe_id = classe_options[selected_classe]
+        libelle = selected_niveau if classe_id is None else f"{selected_niveau}_{selected_classe}"
+        soumettre_rapport(
+            "bulletins",
+            {'semestre': 1, 'annee_scolaire': annee_scolaire, 'id_classe': classe_id,
+             'id_niveau': niveau_id if classe_id is None else None, 'libelle': libelle,
+             'format': format_fichier, 'nb_processus': nb_processus},
+            f"Bulletins {libelle} - S1 ({format_fichier.upper()})"
+        )
+        st.success("Bulletins ajoutés à la file. Suivez leur avancement dans « Mes rapports ».")
+    
+    if st.button("Générer les bulletins", use_container_width=True, type="primary"):
+        classe_id = classe_options[selected_classe]
+        bulletins = charger_bulletins(
+            conn, 1, annee_scolaire,
+            id_classe=classe_id,
+            id_niveau=niveau_id if classe_id is None else None
+        )
+        
+        if not bulletins:
+            st.info("Aucun élève à traiter pour cette sélection.")
+            return
+        
+        barre = st.progress(0.0, text=f"0 / {len(bulletins)} bulletins")
+        
+        def progression(traites, total):
+            barre.progress(traites / total, text=f"{traites} / {total} bulletins")
+        
+        chemin = generer_archive_bulletins(bulletins, format_fichier, nb_processus=nb_processus, progression=progression)
+        
+        try:
+            with open(chemin, "rb") as f:
+                archive = f.read()
+        finally:
+            os.remove(chemin)
+        
+        libelle = selected_niveau if classe_id is None else f"{selected_niveau}_{selected_classe}"
+        st.success(f"✅ {len(bulletins)} bulletins générés")
+        st.download_button(
+            label="📥 Télécharger les bulletins (ZIP)",
+            data=archive,
+            file_name=f"Bulletins_{libelle}_S1.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
+
+
+@profiler
 def generate_honor_roll(conn, annee_scolaire):
     """Génère un tableau d'honneur avec design amélioré"""
     
@@ -2411,38 +2339,30 @@ def generate_honor_roll(conn, annee_scolaire):
                 unsafe_allow_html=True
             )
         
+        # Un seul parcours des moyennes pour tous les tableaux (affichage et export)
+        df_honneur = calculer_tableaux_honneur(conn, annee_scolaire, top_n)
+        
+        if df_honneur.empty:
+            st.info(f"Aucune donnée disponible pour l'année scolaire {annee_scolaire}.")
+            return
+        
         if filter_type == "Global":
             # Tableau d'honneur global
-            generate_global_honor_roll(conn, annee_scolaire, top_n)
+            generate_global_honor_roll(df_honneur, top_n, annee_scolaire)
         elif filter_type == "Par niveau":
             # Tableau d'honneur par niveau
-            generate_level_honor_roll(conn, annee_scolaire, top_n)
+            generate_level_honor_roll(df_honneur, top_n, annee_scolaire)
         elif filter_type == "Par classe":
             # Tableau d'honneur par classe
-            generate_class_honor_roll(conn, annee_scolaire, top_n)
+            generate_class_honor_roll(df_honneur, top_n, annee_scolaire)
 
 
-def generate_global_honor_roll(conn, annee_scolaire, top_n):
+@profiler
+def generate_global_honor_roll(df_honneur, top_n, annee_scolaire):
     """Génère un tableau d'honneur global avec design amélioré"""
     
-    # Récupérer les meilleurs élèves
-    query = """
-        SELECT e.ien, e.prenom, e.nom, e.sexe, n.libelle as niveau, c.libelle as classe,
-               mg.moyenne, mg.rang
-        FROM Moyennes_Generales_S1 mg
-        JOIN Eleves e ON mg.ien = e.ien
-        JOIN Classes c ON e.id_classe = c.id
-        JOIN Niveaux n ON c.id_niveau = n.id
-        WHERE mg.annee_scolaire = ?
-        ORDER BY mg.moyenne DESC
-        LIMIT ?
-    """
-    
-    df_honor = pd.read_sql_query(query, conn, params=(annee_scolaire, top_n))
-    
-    if df_honor.empty:
-        st.info(f"Aucune donnée disponible pour l'année scolaire {annee_scolaire}.")
-        return
+    # Extraire les meilleurs élèves (ex aequo inclus)
+    df_honor = tableau_global(df_honneur, top_n)
     
     # Ajouter une colonne pour la mention
     df_honor['mention'] = df_honor['moyenne'].apply(lambda x: 
@@ -2453,9 +2373,6 @@ def generate_global_honor_roll(conn, annee_scolaire, top_n):
         "Insuffisant"
     )
     
-    # Ajouter le rang dans le tableau d'honneur
-    df_honor.insert(0, 'rang_honneur', range(1, len(df_honor) + 1))
-    
     # Afficher le tableau
     st.markdown(
         """
@@ -2534,69 +2451,40 @@ def generate_global_honor_roll(conn, annee_scolaire, top_n):
         unsafe_allow_html=True
     )
     
-    output = BytesIO()
-    
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_honor.to_excel(writer, sheet_name='Tableau_Honneur', index=False)
-    
     # Proposer le téléchargement
     st.download_button(
         label="📥 Télécharger le tableau d'honneur",
-        data=output.getvalue(),
+        data=artefact_rapport(
+            "tableau_honneur_global",
+            {'semestre': 1, 'annee_scolaire': annee_scolaire, 'top_n': top_n},
+            lambda: classeur_tableaux_honneur([('Tableau_Honneur', df_honor)])
+        ),
         file_name=f"Tableau_Honneur_Global_S1.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         use_container_width=True
     )
-def generate_level_honor_roll(conn, annee_scolaire, top_n):
+@profiler
+def generate_level_honor_roll(df_honneur, top_n, annee_scolaire):
     """Génère un tableau d'honneur par niveau avec design amélioré"""
     
-    # Récupérer les niveaux disponibles
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT DISTINCT n.id, n.libelle
-        FROM Niveaux n
-        JOIN Classes c ON n.id = c.id_niveau
-        JOIN Eleves e ON c.id = e.id_classe
-        JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-        WHERE mg.annee_scolaire = ? AND n.etat = 'actif'
-        ORDER BY n.libelle
-    """, (annee_scolaire,))
-    
-    niveaux = cursor.fetchall()
+    # Découper le classement par niveau
+    tableaux = tableaux_par_niveau(df_honneur, top_n)
     
-    if not niveaux:
-        st.info(f"Aucune donnée disponible pour l'année scolaire {annee_scolaire}.")
+    if not tableaux:
+        st.info("Aucun niveau actif dans le classement.")
         return
     
     # Pour chaque niveau
-    for niveau in niveaux:
+    for niveau, df_honor in tableaux:
         st.markdown(
             f"""
             <div style="background-color: white; padding: 1.2rem; border-radius: 5px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); margin: 1.5rem 0;">
-                <h3 style="margin-top: 0; margin-bottom: 1rem;">Meilleurs élèves de {niveau['libelle']}</h3>
+                <h3 style="margin-top: 0; margin-bottom: 1rem;">Meilleurs élèves de {niveau}</h3>
             </div>
             """,
             unsafe_allow_html=True
         )
         
-        # Récupérer les meilleurs élèves du niveau
-        query = """
-            SELECT e.ien, e.prenom, e.nom, e.sexe, c.libelle as classe,
-                mg.moyenne, mg.rang
-            FROM Moyennes_Generales_S1 mg
-            JOIN Eleves e ON mg.ien = e.ien
-            JOIN Classes c ON e.id_classe = c.id
-            WHERE c.id_niveau = ? AND mg.annee_scolaire = ?
-            ORDER BY mg.moyenne DESC
-            LIMIT ?
-        """
-        
-        df_honor = pd.read_sql_query(query, conn, params=(niveau['id'], annee_scolaire, top_n))
-        
-        if df_honor.empty:
-            st.info(f"Aucune donnée disponible pour le niveau {niveau['libelle']}.")
-            continue
-        
         # Ajouter une colonne pour la mention
         df_honor['mention'] = df_honor['moyenne'].apply(lambda x: 
             "Excellent" if x >= 16 else
@@ -2606,9 +2494,6 @@ def generate_level_honor_roll(conn, annee_scolaire, top_n):
             "Insuffisant"
         )
         
-        # Ajouter le rang dans le tableau d'honneur
-        df_honor.insert(0, 'rang_honneur', range(1, len(df_honor) + 1))
-        
         # Afficher le tableau
         st.dataframe(
             df_honor,
@@ -2640,7 +2525,7 @@ def generate_level_honor_roll(conn, annee_scolaire, top_n):
                 color='classe',
                 text='moyenne',
                 labels={"eleve": "Élève", "moyenne": "Moyenne"},
-                title=f"Top élèves - {niveau['libelle']}",
+                title=f"Top élèves - {niveau}",
                 color_discrete_sequence=px.colors.qualitative.Bold
             )
             
@@ -2675,93 +2560,42 @@ def generate_level_honor_roll(conn, annee_scolaire, top_n):
         unsafe_allow_html=True
     )
     
-    output = BytesIO()
-    
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        for niveau in niveaux:
-            # Récupérer les meilleurs élèves du niveau
-            query = """
-                SELECT e.ien, e.prenom, e.nom, e.sexe, c.libelle as classe,
-                    mg.moyenne, mg.rang
-                FROM Moyennes_Generales_S1 mg
-                JOIN Eleves e ON mg.ien = e.ien
-                JOIN Classes c ON e.id_classe = c.id
-                WHERE c.id_niveau = ? AND mg.annee_scolaire = ?
-                ORDER BY mg.moyenne DESC
-                LIMIT ?
-            """
-            
-            df_honor = pd.read_sql_query(query, conn, params=(niveau['id'], annee_scolaire, top_n))
-            
-            if not df_honor.empty:
-                # Ajouter le rang dans le tableau d'honneur
-                df_honor.insert(0, 'rang_honneur', range(1, len(df_honor) + 1))
-                
-                # Limiter le nom de la feuille à 31 caractères (limite Excel)
-                sheet_name = f"Niveau_{niveau['libelle']}"
-                if len(sheet_name) > 31:
-                    sheet_name = sheet_name[:28] + "..."
-                
-                df_honor.to_excel(writer, sheet_name=sheet_name, index=False)
-    
     # Proposer le téléchargement
     st.download_button(
         label="📥 Télécharger tous les tableaux d'honneur",
-        data=output.getvalue(),
+        data=artefact_rapport(
+            "tableau_honneur_niveaux",
+            {'semestre': 1, 'annee_scolaire': annee_scolaire, 'top_n': top_n},
+            lambda: classeur_tableaux_honneur([(f"Niveau_{niveau}", df_honor) for niveau, df_honor in tableaux])
+        ),
         file_name=f"Tableaux_Honneur_Par_Niveau_S1.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         use_container_width=True
     )
 
 
-def generate_class_honor_roll(conn, annee_scolaire, top_n):
+@profiler
+def generate_class_honor_roll(df_honneur, top_n, annee_scolaire):
     """Génère un tableau d'honneur par classe avec design amélioré"""
     
-    # Récupérer les classes disponibles
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT DISTINCT c.id, c.libelle, n.libelle as niveau
-        FROM Classes c
-        JOIN Niveaux n ON c.id_niveau = n.id
-        JOIN Eleves e ON c.id = e.id_classe
-        JOIN Moyennes_Generales_S1 mg ON e.ien = mg.ien
-        WHERE mg.annee_scolaire = ? AND c.etat = 'actif'
-        ORDER BY n.libelle, c.libelle
-    """, (annee_scolaire,))
-    
-    classes = cursor.fetchall()
+    # Découper le classement par classe
+    tableaux = tableaux_par_classe(df_honneur, top_n)
     
-    if not classes:
-        st.info(f"Aucune donnée disponible pour l'année scolaire {annee_scolaire}.")
+    if not tableaux:
+        st.info("Aucune classe active dans le classement.")
         return
     
     # Pour chaque classe
-    for classe in classes:
+    for (niveau, classe), df_honor in tableaux:
         st.markdown(
             f"""
             <div style="background-color: white; padding: 1.2rem; border-radius: 5px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); margin: 1.5rem 0;">
-                <h3 style="margin-top: 0; margin-bottom: 1rem;">Meilleurs élèves de {classe['niveau']} {classe['libelle']}</h3>
+                <h3 style="margin-top: 0; margin-bottom: 1rem;">Meilleurs élèves de {niveau} {classe}</h3>
             </div>
             """,
             unsafe_allow_html=True
         )
         
-        # Récupérer les meilleurs élèves de la classe
-        query = """
-            SELECT e.ien, e.prenom, e.nom, e.sexe, mg.moyenne, mg.rang
-            FROM Moyennes_Generales_S1 mg
-            JOIN Eleves e ON mg.ien = e.ien
-            WHERE e.id_classe = ? AND mg.annee_scolaire = ?
-            ORDER BY mg.moyenne DESC
-            LIMIT ?
-        """
-        
-        df_honor = pd.read_sql_query(query, conn, params=(classe['id'], annee_scolaire, top_n))
-        
-        if df_honor.empty:
-            st.info(f"Aucune donnée disponible pour la classe {classe['niveau']} {classe['libelle']}.")
-            continue
-        
         # Ajouter une colonne pour la mention
         df_honor['mention'] = df_honor['moyenne'].apply(lambda x: 
             "Excellent" if x >= 16 else
@@ -2771,9 +2605,6 @@ def generate_class_honor_roll(conn, annee_scolaire, top_n):
             "Insuffisant"
         )
         
-        # Ajouter le rang dans le tableau d'honneur
-        df_honor.insert(0, 'rang_honneur', range(1, len(df_honor) + 1))
-        
         # Afficher le tableau
         st.dataframe(
             df_honor,
@@ -2803,7 +2634,7 @@ def generate_class_honor_roll(conn, annee_scolaire, top_n):
                 y='moyenne',
                 text='moyenne',
                 labels={"eleve": "Élève", "moyenne": "Moyenne"},
-                title=f"Top élèves - {classe['niveau']} {classe['libelle']}",
+                title=f"Top élèves - {niveau} {classe}",
                 color_discrete_sequence=[THEME_COLORS['primary']]
             )
             
@@ -2838,43 +2669,21 @@ def generate_class_honor_roll(conn, annee_scolaire, top_n):
         unsafe_allow_html=True
     )
     
-    output = BytesIO()
-    
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        for classe in classes:
-            # Récupérer les meilleurs élèves de la classe
-            query = """
-                SELECT e.ien, e.prenom, e.nom, e.sexe, mg.moyenne, mg.rang
-                FROM Moyennes_Generales_S1 mg
-                JOIN Eleves e ON mg.ien = e.ien
-                WHERE e.id_classe = ? AND mg.annee_scolaire = ?
-                ORDER BY mg.moyenne DESC
-                LIMIT ?
-            """
-            
-            df_honor = pd.read_sql_query(query, conn, params=(classe['id'], annee_scolaire, top_n))
-            
-            if not df_honor.empty:
-                # Ajouter le rang dans le tableau d'honneur
-                df_honor.insert(0, 'rang_honneur', range(1, len(df_honor) + 1))
-                
-                # Limiter le nom de la feuille à 31 caractères (limite Excel)
-                sheet_name = f"{classe['niveau']}_{classe['libelle']}"
-                if len(sheet_name) > 31:
-                    sheet_name = sheet_name[:28] + "..."
-                
-                df_honor.to_excel(writer, sheet_name=sheet_name, index=False)
-    
     # Proposer le téléchargement
     st.download_button(
         label="📥 Télécharger tous les tableaux d'honneur",
-        data=output.getvalue(),
+        data=artefact_rapport(
+            "tableau_honneur_classes",
+            {'semestre': 1, 'annee_scolaire': annee_scolaire, 'top_n': top_n},
+            lambda: classeur_tableaux_honneur([(f"{niveau}_{classe}", df_honor) for (niveau, classe), df_honor in tableaux])
+        ),
         file_name=f"Tableaux_Honneur_Par_Classe_S1.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         use_container_width=True
     )
 
 
+@profiler
 def generate_global_stats(conn, annee_scolaire):
     """Génère un rapport statistique global avec design amélioré"""
     
@@ -2904,23 +2713,15 @@ def generate_global_stats(conn, annee_scolaire):
             unsafe_allow_html=True
         )
     
-    # Statistiques générales
-    cursor.execute("""
-        SELECT COUNT(DISTINCT mg.ien) as nb_eleves,
-               AVG(mg.moyenne) as moyenne_generale,
-               COUNT(CASE WHEN mg.moyenne >= 10 THEN 1 END) as nb_moyenne
-        FROM Moyennes_Generales_S1 mg
-        WHERE mg.annee_scolaire = ?
-    """, (annee_scolaire,))
-    
-    stats_global = cursor.fetchone()
+    # Statistiques générales, par niveau, par classe et par discipline (noyau commun)
+    statistiques = construire_statistiques_globales(conn, 1, annee_scolaire)
+    stats_global = statistiques['global']
     
-    if not stats_global or stats_global['nb_eleves'] == 0:
+    if stats_global['effectif'] == 0:
         st.info(f"Aucune donnée disponible pour l'année scolaire {annee_scolaire}.")
         return
     
-    # Calculer le taux de réussite
-    taux_reussite = (stats_global['nb_moyenne'] / stats_global['nb_eleves']) * 100
+    taux_reussite = stats_global['taux_reussite']
     
     # Afficher les statistiques globales
     st.markdown(
@@ -2939,7 +2740,7 @@ def generate_global_stats(conn, annee_scolaire):
             f"""
             <div style="background-color: white; padding: 1rem; border-radius: 5px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
                 <div style="font-size: 2rem; color: {THEME_COLORS['primary']}; margin-bottom: 0.5rem;">
-                    {stats_global['nb_eleves']}
+                    {stats_global['effectif']}
                 </div>
                 <p style="font-size: 0.9rem; color: #2c3e50; margin: 0;">Nombre d'élèves</p>
             </div>
@@ -2952,7 +2753,7 @@ def generate_global_stats(conn, annee_scolaire):
             f"""
             <div style="background-color: white; padding: 1rem; border-radius: 5px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
                 <div style="font-size: 2rem; color: {THEME_COLORS['info']}; margin-bottom: 0.5rem;">
-                    {round(stats_global['moyenne_generale'], 2)}
+                    {round(stats_global['moyenne'], 2)}
                 </div>
                 <p style="font-size: 0.9rem; color: #2c3e50; margin: 0;">Moyenne générale</p>
             </div>
@@ -2983,26 +2784,9 @@ def generate_global_stats(conn, annee_scolaire):
         unsafe_allow_html=True
     )
     
-    query = """
-        SELECT n.libelle as niveau, COUNT(DISTINCT mg.ien) as nb_eleves,
-               AVG(mg.moyenne) as moyenne,
-               COUNT(CASE WHEN mg.moyenne >= 10 THEN 1 END) as nb_moyenne
-        FROM Moyennes_Generales_S1 mg
-        JOIN Eleves e ON mg.ien = e.ien
-        JOIN Classes c ON e.id_classe = c.id
-        JOIN Niveaux n ON c.id_niveau = n.id
-        WHERE mg.annee_scolaire = ?
-        GROUP BY n.libelle
-        ORDER BY n.libelle
-    """
-    
-    df_niveaux = pd.read_sql_query(query, conn, params=(annee_scolaire,))
+    df_niveaux = statistiques['niveaux']
     
     if not df_niveaux.empty:
-        # Calculer le taux de réussite
-        df_niveaux['taux_reussite'] = (df_niveaux['nb_moyenne'] / df_niveaux['nb_eleves'] * 100).round(2)
-        df_niveaux['moyenne'] = df_niveaux['moyenne'].round(2)
-        
         # Afficher le tableau des niveaux
         st.dataframe(
             df_niveaux,
@@ -3021,59 +2805,22 @@ def generate_global_stats(conn, annee_scolaire):
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = px.bar(
-                df_niveaux,
-                x="niveau",
-                y="moyenne",
-                color="niveau",
-                title="Moyenne par niveau",
-                labels={"niveau": "Niveau", "moyenne": "Moyenne"},
-                color_discrete_sequence=px.colors.qualitative.Bold
-            )
-            
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(family="Arial", size=12),
-                margin=dict(l=20, r=20, t=40, b=20),
-                xaxis=dict(
-                    title=dict(font=dict(size=14)),
-                    tickfont=dict(size=12)
-                ),
-                yaxis=dict(
-                    title=dict(font=dict(size=14)),
-                    tickfont=dict(size=12),
-                    range=[0, 20]
-                )
+            fig = figure_barres(
+                df_niveaux, "niveau", "moyenne",
+                "Moyenne par niveau",
+                {"niveau": "Niveau", "moyenne": "Moyenne"},
+                (0, 20)
             )
             
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
-            fig = px.bar(
-                df_niveaux,
-                x="niveau",
-                y="taux_reussite",
-                color="niveau",
-                title="Taux de réussite par niveau",
-                labels={"niveau": "Niveau", "taux_reussite": "Taux de réussite (%)"},
-                color_discrete_sequence=px.colors.qualitative.Pastel
-            )
-            
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(family="Arial", size=12),
-                margin=dict(l=20, r=20, t=40, b=20),
-                xaxis=dict(
-                    title=dict(font=dict(size=14)),
-                    tickfont=dict(size=12)
-                ),
-                yaxis=dict(
-                    title=dict(font=dict(size=14)),
-                    tickfont=dict(size=12),
-                    range=[0, 100]
-                )
+            fig = figure_barres(
+                df_niveaux, "niveau", "taux_reussite",
+                "Taux de réussite par niveau",
+                {"niveau": "Niveau", "taux_reussite": "Taux de réussite (%)"},
+                (0, 100),
+                palette="Pastel"
             )
             
             st.plotly_chart(fig, use_container_width=True)
@@ -3088,27 +2835,9 @@ def generate_global_stats(conn, annee_scolaire):
         unsafe_allow_html=True
     )
     
-    query = """
-        SELECT n.libelle as niveau, c.libelle as classe, 
-               COUNT(DISTINCT mg.ien) as nb_eleves,
-               AVG(mg.moyenne) as moyenne,
-               COUNT(CASE WHEN mg.moyenne >= 10 THEN 1 END) as nb_moyenne
-        FROM Moyennes_Generales_S1 mg
-        JOIN Eleves e ON mg.ien = e.ien
-        JOIN Classes c ON e.id_classe = c.id
-        JOIN Niveaux n ON c.id_niveau = n.id
-        WHERE mg.annee_scolaire = ?
-        GROUP BY n.libelle, c.libelle
-        ORDER BY n.libelle, c.libelle
-    """
-    
-    df_classes = pd.read_sql_query(query, conn, params=(annee_scolaire,))
+    df_classes = statistiques['classes']
     
     if not df_classes.empty:
-        # Calculer le taux de réussite
-        df_classes['taux_reussite'] = (df_classes['nb_moyenne'] / df_classes['nb_eleves'] * 100).round(2)
-        df_classes['moyenne'] = df_classes['moyenne'].round(2)
-        
         # Afficher le tableau des classes
         st.dataframe(
             df_classes,
@@ -3134,24 +2863,9 @@ def generate_global_stats(conn, annee_scolaire):
         unsafe_allow_html=True
     )
     
-    query = """
-        SELECT d.libelle as discipline, COUNT(DISTINCT notes.ien) as nb_eleves,
-               AVG(notes.moy_d) as moyenne,
-               COUNT(CASE WHEN notes.moy_d >= 10 THEN 1 END) as nb_moyenne
-        FROM Notes_S1 notes
-        JOIN Disciplines d ON notes.id_discipline = d.id
-        WHERE notes.annee_scolaire = ?
-        GROUP BY d.libelle
-        ORDER BY d.libelle
-    """
-    
-    df_disciplines = pd.read_sql_query(query, conn, params=(annee_scolaire,))
+    df_disciplines = statistiques['disciplines']
     
     if not df_disciplines.empty:
-        # Calculer le taux de réussite
-        df_disciplines['taux_reussite'] = (df_disciplines['nb_moyenne'] / df_disciplines['nb_eleves'] * 100).round(2)
-        df_disciplines['moyenne'] = df_disciplines['moyenne'].round(2)
-        
         # Afficher le tableau des disciplines
         st.dataframe(
             df_disciplines,
@@ -3167,33 +2881,13 @@ def generate_global_stats(conn, annee_scolaire):
         )
         
         # Graphique des moyennes par discipline
-        fig = px.bar(
-            df_disciplines,
-            x="discipline",
-            y="moyenne",
-            color="discipline",
-            title="Moyenne par discipline",
-            labels={"discipline": "Discipline", "moyenne": "Moyenne"},
-            color_discrete_sequence=px.colors.qualitative.Bold
-        )
-        
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Arial", size=12),
-            margin=dict(l=20, r=20, t=40, b=20),
-            xaxis=dict(
-                title="Discipline",
-                titlefont=dict(size=14),
-                tickfont=dict(size=10),
-                tickangle=45
-            ),
-            yaxis=dict(
-                title="Moyenne",
-                titlefont=dict(size=14),
-                tickfont=dict(size=12),
-                range=[0, 20]
-            )
+        fig = figure_barres(
+            df_disciplines, "discipline", "moyenne",
+            "Moyenne par discipline",
+            {"discipline": "Discipline", "moyenne": "Moyenne"},
+            (0, 20),
+            inclinaison_x=45,
+            taille_graduations_x=10
         )
         
         st.plotly_chart(fig, use_container_width=True)
@@ -3208,43 +2902,94 @@ def generate_global_stats(conn, annee_scolaire):
         unsafe_allow_html=True
     )
     
-    output = BytesIO()
+    format_export = st.selectbox(
+        "Format du fichier",
+        options=list(FORMATS_EXPORT.keys()),
+        format_func=lambda x: LIBELLES_FORMATS[x],
+        key="format_global_stats"
+    )
     
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        # Feuille des statistiques globales
-        stats_global_df = pd.DataFrame({
-            'Métrique': ['Nombre d\'élèves', 'Moyenne générale', 'Élèves ≥ 10', 'Taux de réussite'],
-            'Valeur': [
-                stats_global['nb_eleves'], 
-                round(stats_global['moyenne_generale'], 2), 
-                stats_global['nb_moyenne'],
-                f"{round(taux_reussite, 2)}%"
-            ]
-        })
-        stats_global_df.to_excel(writer, sheet_name='Stats_Globales', index=False)
-        
-        # Feuille des statistiques par niveau
-        if not df_niveaux.empty:
-            df_niveaux.to_excel(writer, sheet_name='Stats_Par_Niveau', index=False)
-        
-        # Feuille des statistiques par classe
-        if not df_classes.empty:
-            df_classes.to_excel(writer, sheet_name='Stats_Par_Classe', index=False)
-        
-        # Feuille des statistiques par discipline
-        if not df_disciplines.empty:
-            df_disciplines.to_excel(writer, sheet_name='Stats_Par_Discipline', index=False)
+    if st.button("⏳ Générer en arrière-plan", use_container_width=True, key="job_global_stats"):
+        soumettre_rapport(
+            "statistiques_globales",
+            {'semestre': 1, 'annee_scolaire': annee_scolaire, 'format': format_export},
+            f"Rapport statistique global - S1 ({LIBELLES_FORMATS[format_export]})"
+        )
+        st.success("Rapport ajouté à la file. Suivez son avancement dans « Mes rapports ».")
+    
+    feuilles = feuilles_statistiques_globales(statistiques)
+    
+    # Le fichier n'est régénéré que si les données ou le format ont changé
+    contenu = artefact_rapport(
+        "statistiques_globales",
+        {'semestre': 1, 'annee_scolaire': annee_scolaire, 'format': format_export},
+        lambda: lire_export(feuilles, format_export)
+    )
+    nom_fichier, mime = nom_export("Rapport_Statistique_Global_S1", format_export, len(feuilles))
     
     # Proposer le téléchargement
     st.download_button(
-        label="📥 Télécharger le rapport statistique",
-        data=output.getvalue(),
-        file_name=f"Rapport_Statistique_Global_S1.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        label=f"📥 Télécharger le rapport statistique ({LIBELLES_FORMATS[format_export]})",
+        data=contenu,
+        file_name=nom_fichier,
+        mime=mime,
         use_container_width=True
     )
 
 
+@profiler
+def show_background_reports():
+    """Affiche les rapports produits en arrière-plan, leur état et leur téléchargement"""
+    
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        if st.button("🔄 Actualiser", use_container_width=True, key="actualiser_mes_rapports"):
+            st.experimental_rerun()
+    
+    df_jobs = lister_rapports()
+    
+    if df_jobs.empty:
+        st.info("Aucun rapport en arrière-plan. Utilisez les boutons « Générer en arrière-plan » des autres rapports.")
+        return
+    
+    with col1:
+        en_cours = df_jobs['statut'].isin(['en_attente', 'en_cours']).sum()
+        st.caption(f"{len(df_jobs)} rapport(s), dont {en_cours} en attente ou en cours")
+    
+    for job in df_jobs.itertuples(index=False):
+        with st.container():
+            col1, col2, col3 = st.columns([4, 2, 1])
+            
+            with col1:
+                st.markdown(f"**{job.libelle}**  \n<small>Demandé le {job.date_creation}</small>", unsafe_allow_html=True)
+                if job.statut == 'en_cours' and job.progression:
+                    st.progress(min(float(job.progression), 1.0))
+                elif job.statut == 'erreur':
+                    st.caption(f"Erreur : {job.message}")
+            
+            with col2:
+                st.markdown(LIBELLES_STATUTS.get(job.statut, job.statut))
+                if job.statut == 'termine':
+                    contenu = lire_rapport(job.id)
+                    if contenu is not None:
+                        st.download_button(
+                            label="📥 Télécharger",
+                            data=contenu,
+                            file_name=job.nom_fichier,
+                            mime=job.mime,
+                            key=f"telecharger_rapport_{job.id}",
+                            use_container_width=True
+                        )
+            
+            with col3:
+                if job.statut in ('termine', 'erreur'):
+                    if st.button("🗑️", key=f"supprimer_rapport_{job.id}", help="Supprimer ce rapport"):
+                        supprimer_rapport(job.id)
+                        st.experimental_rerun()
+            
+            st.markdown("<hr style='margin: 0.5rem 0;'>", unsafe_allow_html=True)
+
+@profiler
 def show_import_interface():
     """Affiche l'interface d'importation des données avec design amélioré"""
     
@@ -3345,11 +3090,10 @@ def show_import_interface():
             submitted = st.form_submit_button("Créer la classe")
             
             if submitted and nouvelle_classe:
-                cursor.execute(
+                ecrire(lambda conn_ecriture: conn_ecriture.execute(
                     "INSERT INTO Classes (id_niveau, libelle, effectif) VALUES (?, ?, ?)",
                     (niveau_id, nouvelle_classe, effectif)
-                )
-                conn.commit()
+                ))
                 st.success(f"✅ Classe {nouvelle_classe} créée avec succès")
                 st.experimental_rerun()
         
@@ -3412,11 +3156,19 @@ def show_import_interface():
     conn.close()
     
     if fichier:
+        profil = None
         try:
             # Afficher message de traitement
             with st.spinner("Traitement du fichier en cours..."):
+                # Un import confirmé est profilé dès la lecture du classeur (relue à chaque exécution)
+                profil = ProfilImport() if st.session_state.get("confirmer_import_s1") else None
+                if profil is not None:
+                    profil.marquer("lecture")
+                
                 # Charger et nettoyer le fichier
                 df_moyennes, df_final, _ = charger_et_nettoyer(fichier)
+                if profil is not None:
+                    profil.definir_lignes(len(df_moyennes) + len(df_final))
 
                 # Forcer la présence des colonnes obligatoires et remplir les vides
                 for col in ["Prenom", "Nom", "IEN"]:
@@ -3444,7 +3196,7 @@ def show_import_interface():
                 )
                 
                 st.markdown("<h4 style='margin: 1rem 0;'>📋 Aperçu des moyennes générales</h4>", unsafe_allow_html=True)
-                st.dataframe(df_moyennes, use_container_width=True)
+                apercu_pagine("apercu_import_s1", df_moyennes)
                 
                 # Afficher des statistiques de base
                 nb_eleves = len(df_moyennes)
@@ -3466,17 +3218,24 @@ def show_import_interface():
                     unsafe_allow_html=True
                 )
                 
-                if st.button("✅ Confirmer et importer les données", use_container_width=True, type="primary"):
+                if st.button("✅ Confirmer et importer les données", use_container_width=True, type="primary",
+                             key="confirmer_import_s1"):
                     with st.spinner("Importation des données..."):
                         # Sécuriser à nouveau juste avant l'import
                         df_moyennes["Prenom"] = df_moyennes["Prenom"].fillna("Non défini").replace("", "Non défini")
                         df_moyennes["Nom"] = df_moyennes["Nom"].fillna("Non défini").replace("", "Non défini")
                         df_moyennes["IEN"] = df_moyennes["IEN"].fillna("").replace("", "")
+                        contexte_import = (profil, selected_niveau, selected_classe, annee_scolaire, fichier.name, nb_eleves)
                         try:
-                            sauvegarder_dans_fichier_central(df_moyennes, df_final, selected_niveau, selected_classe, 1)  # 1 pour semestre 1
-                        except PermissionError:
+                            sauvegarder_dans_fichier_central(df_moyennes, df_final, selected_niveau, selected_classe, 1, profil=profil)  # 1 pour semestre 1
+                        except PermissionError as e:
+                            _historiser_import(*contexte_import, erreur=e)
                             st.error("Impossible d'écrire dans le fichier central. Veuillez fermer 'fichier_central.xlsx' et réessayer.")
                             return
+                        except Exception as e:
+                            _historiser_import(*contexte_import, erreur=e)
+                            raise
+                        _historiser_import(*contexte_import)
                         
                         st.success(f"✅ Données importées avec succès pour la classe {selected_niveau} {selected_classe}")
                         
@@ -3490,6 +3249,10 @@ def show_import_interface():
                         )
         except Exception as e:
             st.error(f"❌ Erreur lors du traitement du fichier: {str(e)}")
+        finally:
+            # Fichier invalide, erreur de lecture... : tracemalloc ne doit pas rester actif
+            if profil is not None:
+                profil.terminer()
     
     # Section de suppression
     st.markdown(
@@ -3564,3 +3327,77 @@ def show_import_interface():
             st.warning("Impossible de lire l'historique des imports.")
     else:
         st.info("Aucun fichier centralisé trouvé.")
+    
+    show_import_profiles()
+
+def _historiser_import(profil, niveau, classe, annee_scolaire, fichier, nb_eleves, erreur=None):
+    """Clôt le profil d'un import et l'enregistre dans l'historique des imports"""
+    if profil is None:
+        return
+    profil.terminer()
+    ecrire(
+        enregistrer_import, profil, 1, niveau, classe, annee_scolaire, fichier, nb_eleves,
+        statut="echec" if erreur else "termine", message=str(erreur) if erreur else None
+    )
+
+def show_import_profiles():
+    """Affiche les derniers imports avec la durée et la mémoire de chacune de leurs étapes"""
+    conn = get_db_connection()
+    try:
+        imports = lister_imports(conn, 1)
+    finally:
+        conn.close()
+    
+    if not imports:
+        return
+    
+    st.markdown("<h4 style='margin: 1rem 0;'>⏱️ Profil des derniers imports</h4>", unsafe_allow_html=True)
+    
+    df_imports = pd.DataFrame(imports)
+    df_imports['statut'] = df_imports['statut'].replace({'termine': "Terminé", 'echec': "Échec"})
+    st.dataframe(
+        df_imports[['date_import', 'niveau', 'classe', 'fichier', 'nb_eleves', 'statut', 'duree_ms', 'pic_rss_mo', 'alloc_pic_mo']],
+        column_config={
+            "date_import": "Date",
+            "niveau": "Niveau",
+            "classe": "Classe",
+            "fichier": "Fichier",
+            "nb_eleves": st.column_config.NumberColumn("Élèves", format="%d"),
+            "statut": "Statut",
+            "duree_ms": st.column_config.NumberColumn("Durée (ms)", format="%.0f"),
+            "pic_rss_mo": st.column_config.NumberColumn("Pic mémoire (Mo)", format="%.1f"),
+            "alloc_pic_mo": st.column_config.NumberColumn("Pic allocations Python (Mo)", format="%.1f"),
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    index = st.selectbox(
+        "Détail des étapes",
+        options=range(len(imports)),
+        format_func=lambda i: f"{imports[i]['date_import']} - {imports[i]['niveau']} {imports[i]['classe']}",
+        key="detail_import_s1"
+    )
+    selection = imports[index]
+    if selection['message']:
+        st.warning(selection['message'])
+    if selection['etapes']:
+        df_etapes = pd.DataFrame(selection['etapes'])
+        df_etapes['etape'] = df_etapes['etape'].map(lambda etape: LIBELLES_ETAPES.get(etape, etape))
+        st.dataframe(
+            df_etapes[['etape', 'duree_ms', 'lignes', 'lignes_par_s', 'rss_fin_mo', 'rss_delta_mo',
+                       'hausse_pic_rss_mo', 'alloc_delta_mo', 'alloc_pic_mo']],
+            column_config={
+                "etape": "Étape",
+                "duree_ms": st.column_config.NumberColumn("Durée (ms)", format="%.0f"),
+                "lignes": st.column_config.NumberColumn("Lignes", format="%d"),
+                "lignes_par_s": st.column_config.NumberColumn("Lignes/s", format="%.0f"),
+                "rss_fin_mo": st.column_config.NumberColumn("RSS (Mo)", format="%.1f"),
+                "rss_delta_mo": st.column_config.NumberColumn("Δ RSS (Mo)", format="%+.1f"),
+                "hausse_pic_rss_mo": st.column_config.NumberColumn("Hausse du pic RSS (Mo)", format="%.1f"),
+                "alloc_delta_mo": st.column_config.NumberColumn("Δ allocations (Mo)", format="%+.1f"),
+                "alloc_pic_mo": st.column_config.NumberColumn("Pic allocations (Mo)", format="%.1f"),
+            },
+            hide_index=True,
+            use_container_width=True
+        )